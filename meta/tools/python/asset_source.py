@@ -0,0 +1,194 @@
+"""
+Bronnen van de afbeeldingen voor de labelscripts: Cloudinary of de MinIO
+object store waar de collectie naartoe gemigreerd is
+(meta/tools/cloudinary_to_minio/migration-map.json).
+
+Een bron levert drie dingen:
+- iter_resources: de afbeeldingen als resource-dicts in de vorm van de
+  Cloudinary Admin API (public_id, secure_url, context), pagina voor pagina
+- handlers: URL-schema's die image_fetcher via de bron moet ophalen
+- writer: een object met add(public_id, context) en flush() om gevonden
+  labels terug te schrijven
+
+Bij MinIO is public_id de bestandsnaam zonder extensie (gelijk aan publicId
+in de galerijdatabase), staat de ETag van het object in de minio://-URL (zodat
+de afbeeldingscache een vervangen object niet voor het oude aanziet, zoals de
+versie in een Cloudinary-URL), worden de afbeeldingen met gestreamde GET's over het
+lokale netwerk opgehaald en gaan de labels naar de galerijdatabase die de
+Nuxt-server leest, in plaats van naar de Cloudinary-context. Cloudinary en
+zijn quota zitten dan niet meer in het pad.
+"""
+
+import os
+import posixpath
+
+import cloudinary.api
+
+import cloudinary_listing
+from metadata_writer import MetadataWriter
+from gallery_db import GalleryDatabase, GalleryLabelWriter, DEFAULT_DB_PATH
+
+try:
+    from convert_heic_to_jpg import get_minio_client, MINIO_BUCKET, CHUNK_SIZE
+    has_minio = True
+except ImportError:
+    has_minio = False
+
+SOURCES = ('cloudinary', 'minio')
+
+# Afbeeldingen in MinIO; staat er van één foto zowel een HEIC als de JPEG van
+# convert_heic_to_jpg.py, dan wordt de eerste extensie uit deze lijst gebruikt
+# (een JPEG decodeert sneller en kan verkleind gedecodeerd worden)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.heic', '.heif')
+
+
+class CloudinarySource:
+    """
+    Afbeeldingen en context uit Cloudinary.
+
+    Args:
+        listing: 'folders' of 'search' (zie cloudinary_listing)
+        search_expression: Eigen Search API-expressie bij listing='search'
+        throttle: Optionele functie die vóór elke API-aanroep wordt aangeroepen (rate limiting)
+        log: Functie voor voortgangsberichten, bijvoorbeeld print of logger.info
+    """
+
+    name = 'cloudinary'
+    handlers = {}
+
+    def __init__(self, listing='folders', search_expression=None, throttle=None, log=print):
+        self.listing = listing
+        self.search_expression = search_expression
+        self.throttle = throttle
+        self.log = log
+
+    def iter_resources(self, folder, limit_per_folder=None):
+        return cloudinary_listing.iter_tree_resources(folder, self.listing, self.search_expression,
+                                                      limit_per_folder, self.throttle, self.log)
+
+    def get_resource(self, public_id, folder=None):
+        return cloudinary.api.resource(public_id, context=True)
+
+    def writer(self, current=None, max_workers=None, throttle=None, flush_every=None, overwrite=False):
+        """MetadataWriter die de labels in de Cloudinary-context zet (overwrite doet hier niets; zie current)."""
+        kwargs = {'max_workers': max_workers} if max_workers else {}
+        return MetadataWriter(current, throttle=throttle, log=self.log, flush_every=flush_every, **kwargs)
+
+
+class MinioSource:
+    """
+    Afbeeldingen uit de MinIO-bucket, labels in de galerijdatabase.
+
+    Args:
+        client: Minio-client (standaard get_minio_client() uit convert_heic_to_jpg)
+        bucket: Bucket met de collectie
+        db_path: SQLite-bestand van de galerij
+        log: Functie voor voortgangsberichten, bijvoorbeeld print of logger.info
+    """
+
+    name = 'minio'
+
+    def __init__(self, client=None, bucket=None, db_path=DEFAULT_DB_PATH, log=print):
+        if not has_minio:
+            raise RuntimeError("De MinIO-bron heeft de minio package nodig (pip install minio)")
+        self.client = client or get_minio_client()
+        self.bucket = bucket or MINIO_BUCKET
+        self.database = GalleryDatabase(db_path)
+        self.log = log
+        self.handlers = {'minio': self.fetch}
+        self._labels = None
+
+    def url_for(self, object_name, etag=None):
+        """minio://-URL van een object, met de ETag als ?etag= zodat de cachesleutel meeverandert met de inhoud."""
+        url = f"minio://{self.bucket}/{object_name}"
+        return f"{url}?etag={etag}" if etag else url
+
+    def fetch(self, url):
+        """Haal een minio://-URL gestreamd op; geeft (content, content_type)."""
+        object_name = url[len(f"minio://{self.bucket}/"):].rsplit('?etag=', 1)[0]
+        response = self.client.get_object(self.bucket, object_name)
+        try:
+            content = b''.join(response.stream(CHUNK_SIZE))
+            return content, response.headers.get('Content-Type', 'Niet beschikbaar')
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _resource(self, object_name, etag=None):
+        public_id = posixpath.splitext(posixpath.basename(object_name))[0]
+        if self._labels is None:
+            self._labels = self.database.labels()
+        label_number = self._labels.get(public_id)
+        # Bestaande labels uit de galerijdatabase in dezelfde vorm als de Cloudinary-context
+        custom = {'label_number': label_number, 'caption': label_number} if label_number else {}
+        return {
+            'public_id': public_id,
+            'secure_url': self.url_for(object_name, etag),
+            'asset_folder': posixpath.dirname(object_name),
+            'context': {'custom': custom},
+        }
+
+    def _iter_objects(self, prefix):
+        """
+        Geef per foto (naam, ETag) van het object met de voorkeursextensie, in de volgorde van de listing.
+
+        De bestanden van één foto (zoals IMG_1.heic en IMG_1.jpg) worden gegroepeerd op hun volledige pad
+        zonder extensie. De public_id is de bestandsnaam zonder extensie (zoals publicId in de
+        galerijdatabase); komt dezelfde naam in een andere map nog eens voor, dan wordt alleen de eerste
+        gebruikt en de rest met een foutmelding overgeslagen.
+        """
+        def preference(entry):
+            return IMAGE_EXTENSIONS.index(os.path.splitext(entry[0])[1].lower())
+
+        # Niet op volgorde groeperen: IMG_1.edited.jpg staat in de listing tussen IMG_1.heic en IMG_1.jpg
+        groups = {}
+        for obj in self.client.list_objects(self.bucket, prefix=prefix, recursive=True):
+            if obj.is_dir or os.path.splitext(obj.object_name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            stem = os.path.splitext(obj.object_name)[0]
+            groups.setdefault(stem, []).append((obj.object_name, (obj.etag or '').strip('"') or None))
+
+        seen = {}
+        for stem, group in groups.items():
+            public_id = posixpath.basename(stem)
+            if public_id in seen:
+                self.log(f"Fout: {stem} heeft dezelfde public_id als {seen[public_id]}, overgeslagen")
+                continue
+            seen[public_id] = stem
+            yield min(group, key=preference)
+
+    def iter_resources(self, folder, limit_per_folder=None):
+        """Geef alle afbeeldingen onder de map (als prefix in de bucket), tot elke diepte."""
+        prefix = folder.rstrip('/') + '/'
+        self.log(f"Objecten ophalen uit {self.bucket}/{prefix}")
+        counts = {}
+        for object_name, etag in self._iter_objects(prefix):
+            resource = self._resource(object_name, etag)
+            if limit_per_folder:
+                counts[resource['asset_folder']] = counts.get(resource['asset_folder'], 0) + 1
+                if counts[resource['asset_folder']] > limit_per_folder:
+                    continue
+            yield resource
+
+    def get_resource(self, public_id, folder=None):
+        """Zoek een afbeelding op public_id; met folder wordt alleen onder die map gezocht."""
+        for object_name, etag in self._iter_objects(folder.rstrip('/') + '/' if folder else ''):
+            if posixpath.splitext(posixpath.basename(object_name))[0] == public_id:
+                return self._resource(object_name, etag)
+        raise KeyError(f"{public_id} niet gevonden in {self.bucket}")
+
+    def writer(self, current=None, max_workers=None, throttle=None, flush_every=None, overwrite=False):
+        """
+        GalleryLabelWriter die de labels in de galerijdatabase zet (current, max_workers en throttle doen
+        hier niets). Zonder overwrite worden alleen lege labels gevuld, zodat met de hand verbeterde
+        labels blijven staan.
+        """
+        return GalleryLabelWriter(self.database, log=self.log, flush_every=flush_every, overwrite=overwrite)
+
+
+def create_source(name, db_path=DEFAULT_DB_PATH, listing='folders', search_expression=None, throttle=None,
+                  log=print):
+    """Maak de bron voor --source aan."""
+    if name == 'minio':
+        return MinioSource(db_path=db_path, log=log)
+    return CloudinarySource(listing, search_expression, throttle, log)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark voor --pack van extract_labels_claude.py: één label per request
+tegenover K labels per request.
+
+Als referentie dienen de succesvolle labels uit label_extraction_results.json,
+net als bij bench_label_decode.py. Elke afbeelding wordt één keer gedownload
+en uitgesneden; daarna worden dezelfde labels per modus naar Claude gestuurd.
+Per modus worden afbeeldingen per seconde, tokens per afbeelding, het aantal
+los opnieuw gevraagde labels en de nauwkeurigheid getoond.
+
+Let op: dit kost API-tegoed. Met --api-base-url kan tegen mock_anthropic_api.py
+getest worden.
+
+Gebruik:
+    python bench_claude_packing.py --limit 40 --pack 4 --pack 8
+"""
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import claude_client
+import extract_labels_claude as labels
+from bench_label_decode import load_labelled_images, DEFAULT_MAP
+
+
+def run_single(blocks, api_key):
+    client = claude_client.get_client(api_key)
+
+    def ask(block):
+        return labels.parse_label_response(client.create_message(labels.build_block_request(block)))
+
+    with ThreadPoolExecutor(max_workers=labels.api_concurrency) as executor:
+        numbers = list(executor.map(ask, [block for _, block in blocks]))
+    return dict(zip([public_id for public_id, _ in blocks], numbers)), 0
+
+
+def run_packed(blocks, api_key, size):
+    labels.pack_size = size
+    labels.pack_requests = list(blocks)
+    pending = [{"public_id": public_id, "source": "pack_pending"} for public_id, _ in blocks]
+    results = labels.resolve_packed(pending, api_key)
+    reasked = sum(1 for r in results if r.get('source') == 'claude_api')
+    return {r['public_id']: r['label_number'] for r in results}, reasked
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vergelijk één label per Claude-request met meerdere labels per request')
+    parser.add_argument('--results', default='label_extraction_results.json', help='Bestand met bekende labels')
+    parser.add_argument('--map', default=DEFAULT_MAP, help='migration-map.json met de afbeeldings-URL\'s')
+    parser.add_argument('--limit', type=int, default=40, help='Aantal afbeeldingen')
+    parser.add_argument('--pack', type=int, action='append', default=[],
+                        help='Test ook K labels per request (meerdere keren mogelijk, standaard 4 en 8)')
+    parser.add_argument('--concurrency', type=int, default=claude_client.DEFAULT_CONCURRENCY,
+                        help='Aantal gelijktijdige requests')
+    parser.add_argument('--api-base-url', help='Basis-URL van de Anthropic API, bijvoorbeeld een lokale mock')
+    parser.add_argument('--max-long-edge', type=int, default=labels.DEFAULT_MAX_LONG_EDGE,
+                        help='Lange zijde van de afbeeldingen voor Claude (zoals in extract_labels_claude.py)')
+    parser.add_argument('--token-budget', type=int, help='Tokenbudget per afbeelding (zoals in extract_labels_claude.py)')
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv('ANTHROPIC_API_KEY')
+    if not api_key:
+        print("Fout: ANTHROPIC_API_KEY omgevingsvariabele ontbreekt.")
+        return
+    labels.api_concurrency = args.concurrency
+    labels.max_long_edge = args.max_long_edge
+    labels.token_budget = args.token_budget
+    claude_client.configure(base_url=args.api_base_url, concurrency=args.concurrency)
+
+    blocks, expected = [], {}
+    for public_id, url, label in load_labelled_images(args.results, args.map, args.limit):
+        content = labels.download_image_content(url)
+        image = labels.convert_image_content(content, url) if content is not None else None
+        if image is not None:
+            blocks.append((public_id, labels.label_image_block(image)))
+            expected[public_id] = label
+    print(f"{len(blocks)} labels")
+    if not blocks:
+        return
+
+    modes = [('los', None)] + [(f"pack {size}", size) for size in (args.pack or [4, 8])]
+    rows = []
+    for name, size in modes:
+        client = claude_client.get_client(api_key)
+        before = dict(client.usage)
+        started = time.perf_counter()
+        if size is None:
+            numbers, reasked = run_single(blocks, api_key)
+        else:
+            numbers, reasked = run_packed(blocks, api_key, size)
+        elapsed = time.perf_counter() - started
+
+        n = len(blocks)
+        used = {key: client.usage[key] - before[key] for key in before}
+        correct = sum(1 for public_id, number in numbers.items() if number == expected.get(public_id))
+        rows.append((name, n / elapsed, used['requests'], used['input_tokens'] / n, used['output_tokens'] / n,
+                     reasked, correct / n))
+
+    print()
+    print(f"{'modus':<10} {'afb/s':>7} {'requests':>9} {'in-tok/afb':>11} {'uit-tok/afb':>12} {'opnieuw':>8} {'correct':>8}")
+    for name, rate, requests, input_tokens, output_tokens, reasked, accuracy in rows:
+        print(f"{name:<10} {rate:>7.2f} {requests:>9} {input_tokens:>11.0f} {output_tokens:>12.1f} "
+              f"{reasked:>8} {accuracy:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
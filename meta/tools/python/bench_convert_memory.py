@@ -0,0 +1,193 @@
+"""Memory benchmark for convert_heic_to_jpg: whole-buffer vs streamed conversion.
+
+Runs both code paths against a local directory standing in for the MinIO
+bucket, for a range of image sizes. Every measurement runs in a fresh
+process and records peak Python-heap allocations with tracemalloc:
+
+  - buffered: the old converter, which holds the HEIC bytes and the JPEG
+    buffer for the whole conversion
+  - streamed I/O: download and upload, i.e. what the pipeline's I/O threads
+    hold per image; this should stay flat at a few chunks
+  - streamed decode: the process-pool step; libheif needs the whole
+    compressed container, so this follows the HEIC size, not the bitmap size
+
+The decoded bitmap lives in the C heap and is the same for both paths, so it
+is reported separately as maxrss of the measuring process.
+
+Usage:
+    python bench_convert_memory.py [--sizes 4 12 24] [--chunk-size-kb 1024]
+"""
+
+import io
+import os
+import sys
+import shutil
+import hashlib
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import multiprocessing
+from types import SimpleNamespace
+
+from PIL import Image
+
+import convert_heic_to_jpg as converter
+
+
+class LocalResponse:
+    """Minimal stand-in for the urllib3 response returned by Minio.get_object."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+
+    def read(self):
+        return self._file.read()
+
+    def stream(self, amt):
+        while True:
+            chunk = self._file.read(amt)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+    def release_conn(self):
+        pass
+
+
+class LocalBucketClient:
+    """Directory-backed client with the get_object/put_object subset the converter uses.
+
+    put_object reads its input the way minio-py does: everything at once for a
+    single PUT, or one part_size slice at a time for a multipart upload.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def get_object(self, bucket, name):
+        return LocalResponse(self._path(name))
+
+    def put_object(self, bucket, name, data, length, part_size=None, content_type=None):
+        step = part_size if part_size and length > part_size else length
+        digest = hashlib.md5()
+        with open(self._path(name), 'wb') as f:
+            remaining = length
+            while remaining > 0:
+                part = data.read(min(step, remaining))
+                if not part:
+                    break
+                digest.update(part)
+                f.write(part)
+                remaining -= len(part)
+        return SimpleNamespace(etag=digest.hexdigest())
+
+
+def convert_buffered(client, heic_path, jpg_path):
+    """The converter as it was before streaming: everything held in memory at once."""
+    response = client.get_object(converter.MINIO_BUCKET, heic_path)
+    heic_data = response.read()
+    response.close()
+
+    heic_image = Image.open(io.BytesIO(heic_data))
+    jpg_buffer = io.BytesIO()
+    heic_image.convert('RGB').save(jpg_buffer, 'JPEG', quality=converter.JPEG_QUALITY)
+    jpg_buffer.seek(0)
+
+    client.put_object(
+        converter.MINIO_BUCKET,
+        jpg_path,
+        jpg_buffer,
+        length=jpg_buffer.getbuffer().nbytes,
+        content_type='image/jpeg'
+    )
+
+
+def make_source_image(path, megapixels):
+    """Write a synthetic photo-like HEIC (needs a pillow-heif build with an encoder)."""
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    size = (width, int(width * 3 / 4))
+    image = Image.merge('RGB', [
+        Image.effect_noise(size, 24),
+        Image.linear_gradient('L').resize(size),
+        Image.radial_gradient('L').resize(size),
+    ])
+    image.save(path, 'HEIF', quality=80)
+    return os.path.getsize(path)
+
+
+def traced_peak(fn, *args):
+    tracemalloc.reset_peak()
+    result = fn(*args)
+    return result, tracemalloc.get_traced_memory()[1]
+
+
+def measure(mode, root, heic_path, chunk_size, queue):
+    client = LocalBucketClient(root)
+    tracemalloc.start()
+    if mode == 'buffered':
+        _, peak = traced_peak(convert_buffered, client, heic_path, 'buffered.jpg')
+        peaks = {'total': peak}
+    else:
+        (heic_spool, _), download_peak = traced_peak(converter.download_heic, client, heic_path, None, chunk_size)
+        outputs = [('streamed.jpg', converter.FULL_JPEG)]
+        (spools, _), decode_peak = traced_peak(converter.encode_outputs, heic_spool, [converter.FULL_JPEG])
+        _, upload_peak = traced_peak(converter.upload_outputs, client, outputs, spools, chunk_size)
+        peaks = {'io': max(download_peak, upload_peak), 'decode': decode_peak}
+    tracemalloc.stop()
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        maxrss *= 1024  # Linux reports KiB, macOS bytes
+    peaks['maxrss'] = maxrss
+    queue.put(peaks)
+
+
+def run_isolated(ctx, mode, root, heic_path, chunk_size):
+    queue = ctx.Queue()
+    process = ctx.Process(target=measure, args=(mode, root, heic_path, chunk_size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare converter memory use, buffered vs streamed.')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[4, 12, 24],
+                        help='Source image sizes in megapixels')
+    parser.add_argument('--chunk-size-kb', type=int, default=1024,
+                        help='Streaming chunk size in KiB (MinIO itself requires parts >= 5 MiB)')
+    args = parser.parse_args()
+
+    chunk_size = args.chunk_size_kb * 1024
+    ctx = multiprocessing.get_context('spawn')
+    root = tempfile.mkdtemp(prefix='heic-bench-')
+    mib = 1024 * 1024
+
+    try:
+        print(f"chunk size: {chunk_size / mib:.2f} MiB")
+        print(f"{'MP':>5} {'source':>9} | {'buffered':>9} | {'streamed I/O':>12} {'decode':>8} | {'maxrss':>7}")
+        for megapixels in args.sizes:
+            heic_path = f"source-{megapixels:g}mp.heic"
+            source_size = make_source_image(os.path.join(root, heic_path), megapixels)
+
+            buffered = run_isolated(ctx, 'buffered', root, heic_path, chunk_size)
+            streamed = run_isolated(ctx, 'streamed', root, heic_path, chunk_size)
+
+            print(
+                f"{megapixels:>5g} {source_size / mib:>7.1f}MB | {buffered['total'] / mib:>7.1f}MB | "
+                f"{streamed['io'] / mib:>10.1f}MB {streamed['decode'] / mib:>6.1f}MB | "
+                f"{streamed['maxrss'] / mib:>5.0f}MB"
+            )
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark voor de decodeermodi van de OCR-labeldetectie: 'full' tegenover
+'reduced' (met en zonder terugval op 'full').
+
+Als referentie dienen de succesvolle labels uit label_extraction_results.json;
+de afbeeldings-URL's komen uit de migration-map van de Cloudinary-naar-MinIO
+migratie. Elke afbeelding wordt één keer gedownload, daarna wordt per modus
+de tijd voor decoderen en OCR gemeten en het resultaat met het label vergeleken.
+
+Gebruik:
+    python bench_label_decode.py --limit 50
+"""
+
+import json
+import time
+import argparse
+
+from extract_numbers_and_update_captions import (
+    fetch_image_content,
+    decode_image_content,
+    extract_number_from_image,
+)
+
+DEFAULT_MAP = '../cloudinary_to_minio/migration-map.json'
+
+
+def load_labelled_images(results_file, map_file, limit=None):
+    """Geef (public_id, url, verwacht label) terug voor alle gelabelde afbeeldingen."""
+    with open(results_file, 'r', encoding='utf-8') as f:
+        labels = {r['public_id']: r['label_number'] for r in json.load(f)
+                  if r.get('success') and r.get('label_number')}
+    with open(map_file, 'r', encoding='utf-8') as f:
+        urls = {m['publicId']: m['oldUrl'] for m in json.load(f)}
+
+    images = [(public_id, urls[public_id], label) for public_id, label in labels.items() if public_id in urls]
+    return images[:limit] if limit else images
+
+
+def run_mode(content, url, content_type, decode_mode):
+    started = time.perf_counter()
+    image = decode_image_content(content, url, content_type, decode_mode)
+    if image is not None:
+        image.load()
+    decoded = time.perf_counter()
+    number, _ = extract_number_from_image(image) if image is not None else (None, 0.0)
+    return number, decoded - started, time.perf_counter() - decoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vergelijk nauwkeurigheid en snelheid van de decodeermodi')
+    parser.add_argument('--results', default='label_extraction_results.json', help='Bestand met bekende labels')
+    parser.add_argument('--map', default=DEFAULT_MAP, help='migration-map.json met de afbeeldings-URL\'s')
+    parser.add_argument('--limit', type=int, default=50, help='Aantal afbeeldingen')
+    args = parser.parse_args()
+
+    images = load_labelled_images(args.results, args.map, args.limit)
+    print(f"{len(images)} gelabelde afbeeldingen")
+
+    modes = ['full', 'reduced', 'reduced+fallback']
+    totals = {mode: {'correct': 0, 'found': 0, 'decode': 0.0, 'ocr': 0.0, 'n': 0} for mode in modes}
+
+    for public_id, url, expected in images:
+        content, content_type = fetch_image_content(url)
+        if content is None:
+            continue
+
+        full = run_mode(content, url, content_type, 'full')
+        reduced = run_mode(content, url, content_type, 'reduced')
+        # De scripts vallen alleen terug op 'full' als 'reduced' niets vindt
+        fallback = reduced if reduced[0] else (full[0], reduced[1] + full[1], reduced[2] + full[2])
+
+        for mode, (number, decode_time, ocr_time) in zip(modes, (full, reduced, fallback)):
+            t = totals[mode]
+            t['n'] += 1
+            t['found'] += number is not None
+            t['correct'] += number == expected
+            t['decode'] += decode_time
+            t['ocr'] += ocr_time
+
+        print(f"{public_id}: verwacht {expected}, full {full[0]}, reduced {reduced[0]}")
+
+    print()
+    print(f"{'modus':<18} {'correct':>8} {'gevonden':>9} {'decode ms':>10} {'ocr ms':>8} {'totaal ms':>10}")
+    for mode in modes:
+        t = totals[mode]
+        if not t['n']:
+            continue
+        n = t['n']
+        print(
+            f"{mode:<18} {t['correct'] / n:>7.1%} {t['found'] / n:>8.1%} "
+            f"{t['decode'] / n * 1000:>10.0f} {t['ocr'] / n * 1000:>8.0f} "
+            f"{(t['decode'] + t['ocr']) / n * 1000:>10.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark voor de voorbewerking van de OCR-labeldetectie: vergelijkt de
+ruisonderdrukkingsmethodes (en het overslaan ervan bij hoog contrast) op
+snelheid per stap en op nauwkeurigheid.
+
+Als referentie dienen de succesvolle labels uit label_extraction_results.json,
+net als bij bench_label_decode.py. Elke afbeelding wordt één keer gedownload,
+gedecodeerd en bijgesneden; daarna wordt elke voorbewerkingsketen op dezelfde
+labelgebieden uitgevoerd.
+
+Gebruik:
+    python bench_preprocessing.py --limit 50 --skip-denoise-contrast 60
+"""
+
+import time
+import argparse
+
+from bench_label_decode import load_labelled_images, DEFAULT_MAP
+from extract_numbers_and_update_captions import (
+    DENOISE_METHODS,
+    PreprocessConfig,
+    crop_label_region,
+    fetch_image_content,
+    decode_image_content,
+    preprocess_image_for_ocr,
+    read_number_from_processed,
+)
+
+STAGES = ['convert', 'clahe', 'denoise', 'threshold', 'morph']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vergelijk voorbewerkingsketens op snelheid en nauwkeurigheid')
+    parser.add_argument('--results', default='label_extraction_results.json', help='Bestand met bekende labels')
+    parser.add_argument('--map', default=DEFAULT_MAP, help='migration-map.json met de afbeeldings-URL\'s')
+    parser.add_argument('--limit', type=int, default=50, help='Aantal afbeeldingen')
+    parser.add_argument('--skip-denoise-contrast', type=float, action='append', default=[],
+                        help='Test ook elke methode met deze drempel voor het overslaan (meerdere keren mogelijk)')
+    args = parser.parse_args()
+
+    crops = []
+    for public_id, url, expected in load_labelled_images(args.results, args.map, args.limit):
+        content, content_type = fetch_image_content(url)
+        image = decode_image_content(content, url, content_type) if content is not None else None
+        if image is not None:
+            crops.append((crop_label_region(image), expected))
+    print(f"{len(crops)} labelgebieden")
+
+    configs = [PreprocessConfig(method, None) for method in DENOISE_METHODS]
+    configs += [PreprocessConfig(method, threshold)
+                for threshold in args.skip_denoise_contrast
+                for method in DENOISE_METHODS if method != 'none']
+
+    print()
+    header = ' '.join(f"{stage:>9}" for stage in STAGES)
+    print(f"{'keten':<28} {header} {'totaal ms':>10} {'ocr ms':>8} {'correct':>8}")
+    for config in configs:
+        timings = {}
+        ocr_time = 0.0
+        correct = 0
+        for crop, expected in crops:
+            processed = preprocess_image_for_ocr(crop, crop_percentage=1.0, config=config, timings=timings)
+            started = time.perf_counter()
+            number, _ = read_number_from_processed(processed) if processed is not None else (None, 0.0)
+            ocr_time += time.perf_counter() - started
+            correct += number == expected
+
+        n = max(1, len(crops))
+        name = config.denoise if config.skip_denoise_contrast is None else f"{config.denoise} (skip >= {config.skip_denoise_contrast:g})"
+        stage_ms = ' '.join(f"{timings.get(stage, 0.0) / n * 1000:>9.1f}" for stage in STAGES)
+        print(f"{name:<28} {stage_ms} {sum(timings.values()) / n * 1000:>10.1f} "
+              f"{ocr_time / n * 1000:>8.0f} {correct / n:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""
+Client voor de Anthropic API, gedeeld door de Claude-labelscripts.
+
+Ondersteunt losse berichten (/v1/messages) en de Message Batches API
+(/v1/messages/batches). De basis-URL is in te stellen met ANTHROPIC_BASE_URL
+of configure(base_url=...), zodat de scripts ook tegen een lokale mock
+(mock_anthropic_api.py) getest kunnen worden.
+
+Requests lopen via een gepoolde sessie die meerdere threads tegelijk kunnen
+gebruiken. Een adaptieve rate limiter remt af op 429/529-antwoorden,
+retry-after en de anthropic-ratelimit-* headers, en tijdelijke fouten worden
+met exponentiële backoff opnieuw geprobeerd. Pas als dat niet lukt volgt een
+ClaudeAPIError, zodat een tijdelijke fout nooit als 'geen label' eindigt. Het
+aanmaken van een batch wordt na een time-out niet herhaald, om geen dubbele
+(betaalde) batch te starten.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import TokenBucket
+
+DEFAULT_BASE_URL = 'https://api.anthropic.com'
+API_VERSION = '2023-06-01'
+DEFAULT_TIMEOUT = 60
+DEFAULT_POLL_INTERVAL = 30
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 2.0
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+
+# Statuscodes die op een tijdelijk probleem wijzen (529 = overloaded)
+TRANSIENT_STATUS = frozenset([408, 409, 429, 500, 502, 503, 504, 529])
+THROTTLE_STATUS = frozenset([429, 529])
+
+
+class ClaudeAPIError(Exception):
+    """
+    Fout-antwoord van de API; status_code is None bij verbindingsfouten.
+    transient is True als de fout tijdelijk was maar de retries op zijn.
+    """
+
+    def __init__(self, message, status_code=None, transient=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = transient
+
+
+def seconds_until(reset):
+    """Seconden tot een RFC 3339 tijdstip uit een anthropic-ratelimit-*-reset header."""
+    try:
+        moment = datetime.fromisoformat(reset.replace('Z', '+00:00'))
+    except ValueError:
+        return 0.0
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_after_seconds(headers):
+    value = headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Rate limiter die zich aanpast aan de API.
+
+    Na een 429/529 wordt de snelheid gehalveerd en pauzeren alle threads tot
+    retry-after verstreken is; na elk geslaagd request gaat de snelheid weer
+    langzaam omhoog, tot de ingestelde of door de API gemelde limiet. Geven de
+    headers aan dat er geen requests meer over zijn, dan wordt gewacht tot de
+    reset.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=0.05):
+        self.max_rate = float(rate)
+        self.min_rate = min_rate
+        self.bucket = TokenBucket(rate)
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                wait = self._pause_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self.bucket.acquire()
+
+    def pause(self, seconds):
+        with self._lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def on_success(self, headers):
+        limit = headers.get('anthropic-ratelimit-requests-limit')
+        remaining = headers.get('anthropic-ratelimit-requests-remaining')
+        reset = headers.get('anthropic-ratelimit-requests-reset')
+
+        with self._lock:
+            if limit is not None and limit.isdigit():
+                # De limiet geldt per minuut
+                self.max_rate = min(self.max_rate, int(limit) / 60)
+            rate = min(self.max_rate, self.bucket.rate + self.max_rate * 0.05)
+        self.bucket.set_rate(rate)
+
+        if remaining is not None and remaining.isdigit() and int(remaining) == 0 and reset:
+            self.pause(seconds_until(reset))
+
+    def on_throttled(self, retry_after):
+        self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+        self.pause(retry_after)
+
+
+class ClaudeClient:
+    """
+    Client voor de Anthropic API met een gedeelde requests.Session.
+
+    Args:
+        api_key: Anthropic API sleutel
+        base_url: Basis-URL van de API (standaard ANTHROPIC_BASE_URL of api.anthropic.com)
+        timeout: Timeout per request in seconden
+        concurrency: Aantal threads dat tegelijk requests kan doen (grootte van de connection pool)
+        rate: Maximaal aantal requests per seconde
+        retries: Aantal herhaalpogingen bij tijdelijke fouten
+        backoff: Wachttijd in seconden voor de eerste herhaalpoging (verdubbelt daarna)
+    """
+
+    def __init__(self, api_key, base_url=None, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY,
+                 rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv('ANTHROPIC_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = AdaptiveRateLimiter(rate)
+
+        # Opgetelde tokens en aantal berichten van create_message, voor de samenvatting en benchmarks
+        self.usage = {'requests': 0, 'input_tokens': 0, 'output_tokens': 0}
+        self._usage_lock = threading.Lock()
+
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=concurrency)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "x-api-key": api_key,
+            "anthropic-version": API_VERSION,
+            "content-type": "application/json",
+        })
+
+    def _request(self, method, url, idempotent=True, **kwargs):
+        """
+        Doe een request met retries bij tijdelijke fouten.
+
+        Bij idempotent=False (een POST die iets aanmaakt) wordt alleen opnieuw
+        geprobeerd als zeker is dat de API het request niet verwerkt heeft: bij
+        429/529 of als de verbinding niet eens tot stand kwam. Na een time-out,
+        verbroken verbinding of 5xx is dat onbekend en volgt direct een
+        ClaudeAPIError met transient=True.
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                error = ClaudeAPIError(str(e), transient=True)
+                if not idempotent and not isinstance(e, requests.ConnectTimeout):
+                    raise error
+            else:
+                if response.status_code == 200:
+                    self.limiter.on_success(response.headers)
+                    return response
+
+                status = response.status_code
+                error = ClaudeAPIError(f"{status} {response.text}", status, transient=status in TRANSIENT_STATUS)
+                if not error.transient or (not idempotent and status not in THROTTLE_STATUS):
+                    raise error
+                retry_after = retry_after_seconds(response.headers)
+                if status in THROTTLE_STATUS:
+                    self.limiter.on_throttled(retry_after or self.backoff * 2 ** attempt)
+
+            if attempt == self.retries:
+                raise error
+            # Exponentiële backoff met jitter, tenzij de API zelf een wachttijd opgeeft
+            delay = retry_after if retry_after is not None else self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+            print(f"Tijdelijke fout bij Claude API ({error}), opnieuw over {delay:.1f}s")
+            time.sleep(delay)
+
+    def create_message(self, params):
+        """Verstuur één bericht; params is de request body van /v1/messages."""
+        message = self._request('POST', f"{self.base_url}/v1/messages", json=params).json()
+        usage = message.get('usage', {})
+        with self._usage_lock:
+            self.usage['requests'] += 1
+            self.usage['input_tokens'] += usage.get('input_tokens', 0)
+            self.usage['output_tokens'] += usage.get('output_tokens', 0)
+        return message
+
+    def create_batch(self, batch_requests):
+        """
+        Start een batch.
+
+        Args:
+            batch_requests: Lijst van {"custom_id": ..., "params": <body van /v1/messages>}
+
+        Returns:
+            Het batch-object van de API (met 'id' en 'processing_status')
+
+        Raises:
+            ClaudeAPIError: met transient=True als onbekend is of de batch is
+                aangemaakt; zoek hem dan op met list_batches in plaats van
+                opnieuw te versturen (elke batch wordt betaald)
+        """
+        return self._request('POST', f"{self.base_url}/v1/messages/batches",
+                             idempotent=False, json={"requests": batch_requests}).json()
+
+    def list_batches(self, limit=20):
+        """De meest recente batches van het account, nieuwste eerst."""
+        return self._request('GET', f"{self.base_url}/v1/messages/batches", params={"limit": limit}).json().get('data', [])
+
+    def get_batch(self, batch_id):
+        return self._request('GET', f"{self.base_url}/v1/messages/batches/{batch_id}").json()
+
+    def wait_for_batch(self, batch_id, poll_interval=DEFAULT_POLL_INTERVAL):
+        """Poll tot de batch klaar is en geef het uiteindelijke batch-object terug."""
+        while True:
+            batch = self.get_batch(batch_id)
+            if batch.get('processing_status') == 'ended':
+                return batch
+            counts = batch.get('request_counts', {})
+            print(f"Batch {batch_id}: {batch.get('processing_status')}, "
+                  f"{counts.get('processing', '?')} in behandeling, {counts.get('succeeded', '?')} klaar")
+            time.sleep(poll_interval)
+
+    def iter_batch_results(self, batch):
+        """
+        Haal de resultaten van een afgeronde batch op.
+
+        Yields:
+            Per request een dict met 'custom_id' en 'result' (type 'succeeded',
+            'errored', 'canceled' of 'expired'; bij 'succeeded' met 'message')
+        """
+        response = self._request('GET', batch['results_url'], stream=True)
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+_default_client = None
+_client_options = {}
+_client_lock = threading.Lock()
+
+
+def configure(**kwargs):
+    """Stel de gedeelde client in (zie ClaudeClient voor de opties, behalve api_key)."""
+    global _default_client, _client_options
+    with _client_lock:
+        _client_options = kwargs
+        _default_client = None
+
+
+def get_client(api_key):
+    """Geef de gedeelde client terug en maak hem aan bij het eerste gebruik."""
+    global _default_client
+    with _client_lock:
+        if _default_client is None or _default_client.api_key != api_key:
+            _default_client = ClaudeClient(api_key, **_client_options)
+        return _default_client
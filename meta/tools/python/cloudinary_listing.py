@@ -0,0 +1,129 @@
+"""
+Opsommen van de resources in een Cloudinary-map, gedeeld door de OCR- en
+Claude-labelscripts.
+
+De Admin API geeft per aanroep hoogstens 500 resources (en standaard maar 10
+submappen) terug, met een next_cursor voor de volgende pagina. De functies
+hier volgen die cursor tot het einde, zodat grote mappen niet stilzwijgend
+worden afgekapt, en zijn generators: elke pagina wordt doorgegeven zodra hij
+binnen is, zodat de verwerking van de eerste afbeeldingen al begint terwijl
+de rest nog wordt opgehaald.
+
+Met mode 'search' wordt de hele boom met één Search API-expressie
+opgevraagd in plaats van map voor map.
+"""
+
+import cloudinary
+import cloudinary.api
+
+LISTING_MODES = ('folders', 'search')
+PAGE_SIZE = 500
+
+
+def search_expression(folder):
+    """Search API-expressie voor alle resources in een map en al zijn submappen."""
+    return f'asset_folder="{folder}" OR asset_folder:"{folder}/*"'
+
+
+def _pages(list_page, throttle):
+    """Roep list_page(next_cursor) aan tot er geen next_cursor meer is en geef elke pagina terug."""
+    cursor = None
+    while True:
+        if throttle is not None:
+            throttle()
+        page = list_page(cursor)
+        yield page
+        cursor = page.get('next_cursor')
+        if not cursor:
+            return
+
+
+def iter_subfolders(folder, throttle=None):
+    """Geef de paden van alle submappen van een map, tot elke diepte."""
+    stack = [folder]
+    while stack:
+        parent = stack.pop()
+        for page in _pages(lambda cursor: cloudinary.api.subfolders(parent, max_results=PAGE_SIZE, next_cursor=cursor),
+                           throttle):
+            for subfolder in page.get('folders', []):
+                yield subfolder['path']
+                stack.append(subfolder['path'])
+
+
+def iter_folder_resources(folder, throttle=None):
+    """Geef alle resources direct in een map (zonder submappen), met hun context."""
+    for page in _pages(lambda cursor: cloudinary.api.resources_by_asset_folder(
+            folder, max_results=PAGE_SIZE, next_cursor=cursor, context=True), throttle):
+        yield from page.get('resources', [])
+
+
+def iter_search_resources(expression, throttle=None):
+    """
+    Geef alle resources die aan een Search API-expressie voldoen, met hun context.
+
+    De Search API geeft de context zonder de 'custom'-laag van de Admin API;
+    die wordt hier toegevoegd zodat beide bronnen dezelfde vorm hebben.
+    """
+    def list_page(cursor):
+        search = cloudinary.Search().expression(expression).with_field('context').max_results(PAGE_SIZE)
+        if cursor:
+            search = search.next_cursor(cursor)
+        return search.execute()
+
+    for page in _pages(list_page, throttle):
+        for resource in page.get('resources', []):
+            context = resource.get('context')
+            if context and 'custom' not in context:
+                resource['context'] = {'custom': context}
+            yield resource
+
+
+def iter_tree_resources(folder, mode='folders', expression=None, limit_per_folder=None, throttle=None, log=print):
+    """
+    Geef alle resources in een map en al zijn submappen, pagina voor pagina.
+
+    Args:
+        folder: Hoofdmap in Cloudinary
+        mode: 'folders' om map voor map op te vragen, 'search' voor één Search API-expressie
+        expression: Eigen Search API-expressie (alleen bij 'search'; standaard search_expression(folder))
+        limit_per_folder: Optioneel maximum aantal resources per map
+        throttle: Optionele functie die vóór elke API-aanroep wordt aangeroepen (rate limiting)
+        log: Functie voor voortgangsberichten, bijvoorbeeld print of logger.info
+
+    Yields:
+        Resource-dicts zoals de Admin API ze teruggeeft, met context
+    """
+    if mode == 'search':
+        expression = expression or search_expression(folder)
+        log(f"Resources zoeken met: {expression}")
+        counts = {}
+        for resource in iter_search_resources(expression, throttle):
+            if limit_per_folder:
+                resource_folder = resource.get('asset_folder', folder)
+                counts[resource_folder] = counts.get(resource_folder, 0) + 1
+                if counts[resource_folder] > limit_per_folder:
+                    continue
+            yield resource
+        return
+
+    # Lukt het ophalen van (een deel van) de submappen niet, ga dan door met de mappen die wel bekend zijn
+    folders = []
+    try:
+        for subfolder in iter_subfolders(folder, throttle):
+            folders.append(subfolder)
+    except Exception as e:
+        log(f"Fout bij ophalen van submappen van {folder}: {e}")
+    folders.append(folder)
+
+    for folder_path in folders:
+        log(f"Resources ophalen uit map: {folder_path}")
+        count = 0
+        try:
+            for resource in iter_folder_resources(folder_path, throttle):
+                yield resource
+                count += 1
+                if limit_per_folder and count >= limit_per_folder:
+                    break
+        except Exception as e:
+            log(f"Fout bij ophalen van resources in map {folder_path}: {e}")
+        log(f"Aantal resources uit {folder_path}: {count}")
@@ -1,8 +1,14 @@
-import io
 import os
+import json
+import time
+import sqlite3
+import tempfile
+import argparse
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from minio import Minio
-from minio.error import S3Error
-from pillow_heif import register_heif_opener
+from pillow_heif import register_heif_opener, open_heif
 from PIL import Image
 
 # Register the HEIF opener to work with HEIC files
@@ -15,86 +21,582 @@ MINIO_SECRET_KEY = 'minio-root-password'  # Replace with your actual secret key
 MINIO_BUCKET = 'tomvanas-kunst'     # Replace with your actual bucket name
 USE_SSL = False                       # Set to True if your Minio uses HTTPS
 
-def convert_heic_to_jpg(override=False):
-    # Initialize Minio client
-    client = Minio(
+# Base prefix for the directory structure
+BASE_PREFIX = 'Tom van As Kunst/'
+
+# JPEG settings used for every conversion
+JPEG_QUALITY = 90
+
+# Pre-built sizes for the gallery, written under DERIVATIVES_PREFIX as
+# derivatives/<width>/<original path without extension>.<ext>
+DERIVATIVES_PREFIX = 'derivatives/'
+DEFAULT_DERIVATIVE_WIDTHS = (320, 800, 1600)
+DEFAULT_DERIVATIVE_FORMATS = ('WEBP', 'JPEG')
+DERIVATIVE_QUALITY = 80  # Same default quality the Imagor provider uses
+
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+# Objects are streamed through local spool files in chunks of this size, which
+# is also the multipart part size (S3 requires parts of at least 5 MiB)
+CHUNK_SIZE = 5 * 1024 * 1024
+
+# Local record of what was converted, so reruns only touch what changed
+MANIFEST_PATH = 'heic_conversion_manifest.sqlite'
+
+# One entry of the bucket listing, keyed by object name in the index
+ListedObject = namedtuple('ListedObject', ['size', 'etag'])
+
+# One output image; width None means full size
+Rendition = namedtuple('Rendition', ['width', 'format', 'quality'])
+FULL_JPEG = Rendition(None, 'JPEG', JPEG_QUALITY)
+
+# One HEIC that needs converting; reason is one of 'missing', 'changed',
+# 'settings', 'stale', 'override' or 'renditions'. outputs is a list of
+# (key, Rendition), starting with the full-size JPEG at jpg_path, except for
+# 'renditions', where the full-size JPEG is up to date and only the derivatives
+# are written; jpg_etag is then the ETag of the existing JPEG.
+PlannedConversion = namedtuple('PlannedConversion',
+                               ['heic_path', 'jpg_path', 'reason', 'heic', 'outputs', 'jpg_etag'])
+
+
+class StageStats:
+    """Thread-safe counters for one pipeline stage (download, convert, upload)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, started, elapsed, nbytes):
+        with self._lock:
+            self.count += 1
+            self.bytes += nbytes
+            self.busy += elapsed
+            if self.first_start is None or started < self.first_start:
+                self.first_start = started
+            ended = started + elapsed
+            if self.last_end is None or ended > self.last_end:
+                self.last_end = ended
+
+    def summary(self):
+        if not self.count:
+            return f"{self.name:<9} no items"
+        wall = max(self.last_end - self.first_start, 1e-9)
+        return (
+            f"{self.name:<9} {self.count} items, {self.bytes / 1024 / 1024:.1f} MB in {wall:.1f}s wall "
+            f"({self.count / wall:.2f} items/s, {self.bytes / 1024 / 1024 / wall:.2f} MB/s, "
+            f"{self.busy / self.count:.2f}s avg per item)"
+        )
+
+
+def encode_settings():
+    """Canonical description of the full-size JPEG settings, stored with every manifest row."""
+    return json.dumps({'format': 'JPEG', 'quality': JPEG_QUALITY}, sort_keys=True)
+
+
+def rendition_settings(renditions=()):
+    """Canonical description of the derivatives, stored separately so changing them leaves the JPEG alone."""
+    return json.dumps([list(r) for r in renditions]) if renditions else ''
+
+
+def derivative_renditions(widths=DEFAULT_DERIVATIVE_WIDTHS, formats=DEFAULT_DERIVATIVE_FORMATS):
+    return [Rendition(width, fmt, DERIVATIVE_QUALITY) for width in widths for fmt in formats]
+
+
+class ConversionManifest:
+    """SQLite manifest mapping each HEIC (key + ETag) to the JPEG it produced.
+
+    A row is written as soon as its upload finishes, so an interrupted run
+    resumes where it stopped. Safe to use from the upload threads.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversions (
+                heic_path TEXT PRIMARY KEY,
+                heic_etag TEXT NOT NULL,
+                jpg_path TEXT NOT NULL,
+                jpg_etag TEXT,
+                settings TEXT NOT NULL,
+                renditions TEXT NOT NULL DEFAULT '',
+                converted_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(conversions)')]
+        if 'renditions' not in columns:
+            self._conn.execute("ALTER TABLE conversions ADD COLUMN renditions TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def load(self):
+        """Return {heic_path: (heic_etag, jpg_path, jpg_etag, settings, renditions)}."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT heic_path, heic_etag, jpg_path, jpg_etag, settings, renditions FROM conversions'
+            ).fetchall()
+        entries = {}
+        for heic_path, heic_etag, jpg_path, jpg_etag, settings, renditions in rows:
+            # Older manifests kept the renditions inside the JPEG settings
+            parsed = json.loads(settings)
+            if 'renditions' in parsed:
+                renditions = json.dumps(parsed.pop('renditions'))
+                settings = json.dumps(parsed, sort_keys=True)
+            entries[heic_path] = (heic_etag, jpg_path, jpg_etag, settings, renditions)
+        return entries
+
+    def record(self, heic_path, heic_etag, jpg_path, jpg_etag, settings, renditions=''):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO conversions
+                    (heic_path, heic_etag, jpg_path, jpg_etag, settings, renditions, converted_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (heic_path, heic_etag, jpg_path, jpg_etag, settings, renditions)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_minio_client():
+    return Minio(
         MINIO_ENDPOINT,
         access_key=MINIO_ACCESS_KEY,
         secret_key=MINIO_SECRET_KEY,
         secure=USE_SSL
     )
 
-    # Base prefix for the directory structure
-    base_prefix = 'Tom van As Kunst/'
 
-    # Get all objects with the base prefix
-    objects = client.list_objects(MINIO_BUCKET, prefix=base_prefix, recursive=True)
+def build_listing_index(client, prefix=BASE_PREFIX):
+    """List the bucket once and index every object name with its size and ETag."""
+    index = {}
+    for obj in client.list_objects(MINIO_BUCKET, prefix=prefix, recursive=True):
+        if obj.is_dir:
+            continue
+        index[obj.object_name] = ListedObject(obj.size, (obj.etag or '').strip('"'))
+    return index
 
-    # Filter for HEIC files
-    heic_objects = [obj for obj in objects if obj.object_name.lower().endswith('.heic')]
 
-    print(f"Found {len(list(heic_objects))} HEIC files to convert")
+def jpg_path_for(heic_path):
+    return os.path.splitext(heic_path)[0] + '.jpg'
 
-    # Process each HEIC file
-    for obj in heic_objects:
-        try:
-            heic_path = obj.object_name
-            jpg_path = os.path.splitext(heic_path)[0] + '.jpg'
-
-            # Check if JPG already exists
-            try:
-                client.stat_object(MINIO_BUCKET, jpg_path)
-                if not override:
-                    print(f"Skipping {heic_path} - JPG already exists")
-                    continue
-                print(f"Overriding existing JPG: {jpg_path}")
-            except S3Error as err:
-                if err.code == 'NoSuchKey':
-                    # JPG doesn't exist, proceed with conversion
-                    pass
-                else:
-                    raise
-
-            # # Check if JPG already exists
-            # try:
-            #     client.stat_object(MINIO_BUCKET, jpg_path)
-            #     print(f"Skipping {heic_path} - JPG already exists")
-            #     continue
-            # except S3Error as err:
-            #     if err.code == 'NoSuchKey':
-            #         # JPG doesn't exist, proceed with conversion
-            #         pass
-            #     else:
-            #         raise
 
-            print(f"Processing: {heic_path}")
+def output_key(heic_path, rendition):
+    stem = os.path.splitext(heic_path)[0]
+    if rendition.width is None:
+        return stem + EXTENSIONS[rendition.format]
+    return f"{DERIVATIVES_PREFIX}{rendition.width}/{stem}{EXTENSIONS[rendition.format]}"
+
+
+def conversion_reason(heic_path, heic, jpg_path, outputs, index, manifest_entries, settings, override,
+                      derivatives=''):
+    """Why heic_path must be converted, or None when all its outputs are up to date.
+
+    'renditions' means the full-size JPEG is up to date and only the
+    derivatives (outputs after the first) are missing or were made with
+    other settings.
+    """
+    if jpg_path not in index:
+        return 'missing'
+    if override:
+        return 'override'
+
+    derivatives_missing = any(key not in index for key, _ in outputs[1:])
+    entry = manifest_entries.get(heic_path)
+    if entry is None:
+        # Converted before the manifest existed; trust it unless overridden
+        return 'renditions' if derivatives_missing else None
+
+    heic_etag, recorded_jpg_path, jpg_etag, recorded_settings, recorded_derivatives = entry
+    if heic_etag != heic.etag:
+        return 'changed'
+    if recorded_settings != settings:
+        return 'settings'
+    if recorded_jpg_path != jpg_path or (jpg_etag and jpg_etag != index[jpg_path].etag):
+        return 'stale'
+    if derivatives and (derivatives_missing or recorded_derivatives != derivatives):
+        return 'renditions'
+    return None
+
+
+def plan_conversions(index, override=False, manifest_entries=None, renditions=()):
+    """Diff the listing and the manifest against each other.
+
+    Returns the conversions to run and the number of HEICs that are skipped.
+    """
+    manifest_entries = manifest_entries or {}
+    settings = encode_settings()
+    derivatives = rendition_settings(renditions)
+    planned = []
+    skipped = 0
+
+    for name in sorted(index):
+        if not name.lower().endswith('.heic'):
+            continue
+
+        jpg_path = jpg_path_for(name)
+        outputs = [(output_key(name, r), r) for r in [FULL_JPEG, *renditions]]
+        reason = conversion_reason(name, index[name], jpg_path, outputs, index, manifest_entries, settings, override,
+                                   derivatives)
+        if reason == 'renditions':
+            planned.append(PlannedConversion(name, jpg_path, reason, index[name], outputs[1:], index[jpg_path].etag))
+        elif reason:
+            planned.append(PlannedConversion(name, jpg_path, reason, index[name], outputs, None))
+        else:
+            skipped += 1
+
+    return planned, skipped
+
+
+def print_plan(planned, skipped, verbose=False):
+    reasons = {}
+    for p in planned:
+        reasons[p.reason] = reasons.get(p.reason, 0) + 1
+    breakdown = ', '.join(f"{count} {reason}" for reason, count in sorted(reasons.items())) or 'nothing'
+    total_bytes = sum(p.heic.size for p in planned)
+
+    if verbose:
+        for p in planned:
+            derivative_count = len(p.outputs) if p.reason == 'renditions' else len(p.outputs) - 1
+            extra = f" (+{derivative_count} derivatives)" if derivative_count else ''
+            print(f"  {p.reason:<8} {p.heic_path} -> {p.jpg_path}{extra}")
+    print(
+        f"Plan: {len(planned)} to convert ({breakdown}), "
+        f"{skipped} up to date, {total_bytes / 1024 / 1024:.1f} MB to download"
+    )
+
+
+def download_heic(client, heic_path, spool_dir=None, chunk_size=CHUNK_SIZE):
+    """Stream a HEIC from MinIO into a spool file, one chunk at a time.
+
+    Returns the spool file path and the number of bytes downloaded.
+    """
+    response = client.get_object(MINIO_BUCKET, heic_path)
+    fd, spool_path = tempfile.mkstemp(suffix='.heic', dir=spool_dir)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            for chunk in response.stream(chunk_size):
+                spool.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(spool_path)
+        raise
+    finally:
+        response.close()
+        response.release_conn()
+    return spool_path, size
+
 
-            # Download the HEIC file
-            response = client.get_object(MINIO_BUCKET, heic_path)
-            heic_data = response.read()
-            response.close()
+def encode_outputs(heic_spool_path, renditions):
+    """Decode a spooled HEIC once and encode every rendition. Runs inside the process pool.
 
-            # Convert HEIC to JPG
-            heic_image = Image.open(io.BytesIO(heic_data))
-            jpg_buffer = io.BytesIO()
-            heic_image.convert('RGB').save(jpg_buffer, 'JPEG', quality=90)
-            jpg_buffer.seek(0)
+    The HEIC spool file is removed afterwards. Only paths cross the process
+    boundary, the decoded image never leaves the worker. libheif needs the
+    whole container to decode, so the compressed HEIC is read once (open_heif
+    avoids the extra copy Image.open makes); the encoders write straight to
+    spool files without an in-memory buffer. Renditions are produced largest
+    first, so each smaller size is resampled from the previous one instead of
+    from the full 12 MP image.
 
-            # Upload the JPG file
-            client.put_object(
+    Returns a (spool path, size) pair per rendition, in the given order, and
+    the CPU time spent, so the parent can account for it without timing
+    queueing delays.
+    """
+    started = time.perf_counter()
+    base = os.path.splitext(heic_spool_path)[0]
+    results = [None] * len(renditions)
+    try:
+        image = open_heif(heic_spool_path, convert_hdr_to_8bit=True).to_pillow().convert('RGB')
+        full_width, full_height = image.size
+        current = image
+        order = sorted(range(len(renditions)), key=lambda i: renditions[i].width or full_width, reverse=True)
+        for i in order:
+            rendition = renditions[i]
+            if rendition.width and rendition.width < current.width:
+                size = (rendition.width, max(1, round(full_height * rendition.width / full_width)))
+                current = current.resize(size, Image.LANCZOS, reducing_gap=3.0)
+            spool_path = f"{base}.{i}{EXTENSIONS[rendition.format]}"
+            current.save(spool_path, rendition.format, quality=rendition.quality)
+            results[i] = (spool_path, os.path.getsize(spool_path))
+    except Exception:
+        for result in results:
+            if result and os.path.exists(result[0]):
+                os.remove(result[0])
+        raise
+    finally:
+        os.remove(heic_spool_path)
+    return results, time.perf_counter() - started
+
+
+def upload_output(client, key, spool_path, size, content_type, chunk_size=CHUNK_SIZE):
+    """Stream a spooled output file to MinIO and return the ETag MinIO assigned to it.
+
+    Files larger than chunk_size go up as a multipart upload, so at most one
+    part is held in memory. The spool file is removed afterwards.
+    """
+    try:
+        with open(spool_path, 'rb') as spool:
+            result = client.put_object(
                 MINIO_BUCKET,
-                jpg_path,
-                jpg_buffer,
-                length=jpg_buffer.getbuffer().nbytes,
-                content_type='image/jpeg'
+                key,
+                spool,
+                length=size,
+                part_size=chunk_size,
+                content_type=content_type
             )
+    finally:
+        os.remove(spool_path)
+    return (result.etag or '').strip('"')
+
+
+def upload_outputs(client, outputs, spools, chunk_size=CHUNK_SIZE):
+    """Upload every encoded rendition; returns their ETags in the same order."""
+    etags = []
+    try:
+        for (key, rendition), (spool_path, size) in zip(outputs, spools):
+            etags.append(upload_output(client, key, spool_path, size, CONTENT_TYPES[rendition.format], chunk_size))
+    finally:
+        for spool_path, _ in spools:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+    return etags
+
+
+def uploaded_jpg_etag(conversion, etags):
+    """ETag of the full-size JPEG after uploading a conversion's outputs."""
+    return conversion.jpg_etag if conversion.reason == 'renditions' else etags[0]
+
+
+class ConversionPipeline:
+    """Overlaps MinIO downloads, HEIC decoding and JPEG uploads.
+
+    Downloads and uploads run in thread pools, decoding/encoding runs in a
+    process pool. Stages hand each other spool file paths rather than bytes.
+    At most ``max_in_flight`` objects are between "download started" and
+    "upload finished" at any time, which bounds memory and spool disk use no
+    matter how far the listing runs ahead of the slowest stage.
+    """
+
+    def __init__(self, client, workers, io_threads, max_in_flight, manifest,
+                 spool_dir=None, chunk_size=CHUNK_SIZE, renditions=()):
+        self.client = client
+        self.manifest = manifest
+        self.spool_dir = spool_dir
+        self.chunk_size = chunk_size
+        self.settings = encode_settings()
+        self.derivatives = rendition_settings(renditions)
+        self.stats = {
+            'download': StageStats('download'),
+            'convert': StageStats('convert'),
+            'upload': StageStats('upload'),
+        }
+        self.converted = 0
+        self.failed = 0
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+        self._downloads = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='download')
+        self._uploads = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='upload')
+        self._converters = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, conversion):
+        # Blocks while max_in_flight objects are being processed (backpressure)
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+        self._downloads.submit(self._download_stage, conversion)
+
+    def join(self):
+        with self._idle:
+            while self._pending:
+                self._idle.wait()
+        self._downloads.shutdown()
+        self._uploads.shutdown()
+        self._converters.shutdown()
+
+    def _finish(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+        self._slots.release()
+
+    def _fail(self, heic_path, error):
+        print(f"Error processing {heic_path}: {error}")
+        self._finish('failed')
+
+    def _download_stage(self, conversion):
+        heic_path = conversion.heic_path
+        try:
+            print(f"Processing: {heic_path}")
+            started = time.perf_counter()
+            heic_spool, heic_size = download_heic(self.client, heic_path, self.spool_dir, self.chunk_size)
+            self.stats['download'].record(started, time.perf_counter() - started, heic_size)
+
+            future = self._converters.submit(encode_outputs, heic_spool, [r for _, r in conversion.outputs])
+            future.add_done_callback(
+                lambda f: self._convert_done(f, conversion, heic_size)
+            )
+        except Exception as e:
+            self._fail(heic_path, e)
+
+    def _convert_done(self, future, conversion, nbytes):
+        try:
+            spools, cpu_time = future.result()
+            # Attribute only the encode time, the start is when the worker picked it up
+            self.stats['convert'].record(time.perf_counter() - cpu_time, cpu_time, nbytes)
+            self._uploads.submit(self._upload_stage, conversion, spools)
+        except Exception as e:
+            self._fail(conversion.heic_path, e)
+
+    def _upload_stage(self, conversion, spools):
+        heic_path, jpg_path = conversion.heic_path, conversion.jpg_path
+        try:
+            started = time.perf_counter()
+            etags = upload_outputs(self.client, conversion.outputs, spools, self.chunk_size)
+            self.stats['upload'].record(started, time.perf_counter() - started, sum(size for _, size in spools))
+            self.manifest.record(heic_path, conversion.heic.etag, jpg_path, uploaded_jpg_etag(conversion, etags),
+                                 self.settings, self.derivatives)
+            print(f"Converted: {heic_path} -> {jpg_path}")
+            self._finish('converted')
+        except Exception as e:
+            self._fail(heic_path, e)
+
+
+def convert_sequential(client, planned, stats, manifest, spool_dir=None, chunk_size=CHUNK_SIZE, renditions=()):
+    converted = failed = 0
+    settings = encode_settings()
+    derivatives = rendition_settings(renditions)
+
+    for conversion in planned:
+        heic_path, jpg_path, _, heic, outputs, _ = conversion
+        try:
+            print(f"Processing: {heic_path}")
+
+            started = time.perf_counter()
+            heic_spool, heic_size = download_heic(client, heic_path, spool_dir, chunk_size)
+            stats['download'].record(started, time.perf_counter() - started, heic_size)
+
+            started = time.perf_counter()
+            spools, _ = encode_outputs(heic_spool, [r for _, r in outputs])
+            stats['convert'].record(started, time.perf_counter() - started, heic_size)
+
+            started = time.perf_counter()
+            etags = upload_outputs(client, outputs, spools, chunk_size)
+            stats['upload'].record(started, time.perf_counter() - started, sum(size for _, size in spools))
+            manifest.record(heic_path, heic.etag, jpg_path, uploaded_jpg_etag(conversion, etags), settings, derivatives)
 
+            converted += 1
             print(f"Converted: {heic_path} -> {jpg_path}")
 
         except Exception as e:
-            print(f"Error processing {obj.object_name}: {e}")
+            failed += 1
+            print(f"Error processing {heic_path}: {e}")
+
+    return converted, failed
+
+
+def convert_heic_to_jpg(override=False, workers=1, io_threads=4, max_in_flight=None, plan_only=False,
+                        manifest_path=MANIFEST_PATH, spool_dir=None, chunk_size=CHUNK_SIZE, renditions=()):
+    client = get_minio_client()
+    manifest = ConversionManifest(manifest_path)
+
+    # A single listing replaces a stat_object round trip per HEIC
+    index = build_listing_index(client)
+    if renditions:
+        index.update(build_listing_index(client, DERIVATIVES_PREFIX))
+    planned, skipped = plan_conversions(index, override, manifest.load(), renditions)
+    print_plan(planned, skipped, verbose=plan_only)
+
+    if plan_only:
+        manifest.close()
+        return
+
+    started = time.perf_counter()
+
+    if workers > 1:
+        pipeline = ConversionPipeline(
+            client,
+            workers=workers,
+            io_threads=io_threads,
+            max_in_flight=max_in_flight or workers * 2,
+            manifest=manifest,
+            spool_dir=spool_dir,
+            chunk_size=chunk_size,
+            renditions=renditions
+        )
+        for conversion in planned:
+            pipeline.submit(conversion)
+        pipeline.join()
+        stats = pipeline.stats
+        converted, failed = pipeline.converted, pipeline.failed
+    else:
+        stats = {name: StageStats(name) for name in ('download', 'convert', 'upload')}
+        converted, failed = convert_sequential(client, planned, stats, manifest, spool_dir, chunk_size, renditions)
+    manifest.close()
+
+    elapsed = time.perf_counter() - started
 
     print("Conversion complete!")
+    print(f"Converted: {converted}, skipped: {skipped}, failed: {failed} in {elapsed:.1f}s")
+    for stage in stats.values():
+        print(f"  {stage.summary()}")
+
 
 if __name__ == "__main__":
-    convert_heic_to_jpg(override=False)
+    parser = argparse.ArgumentParser(description='Convert HEIC images in MinIO to JPEG.')
+    parser.add_argument('--override', action='store_true', help='Overwrite JPGs that already exist')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of decode/encode processes (1 = convert one image at a time)')
+    parser.add_argument('--io-threads', type=int, default=4,
+                        help='Threads per download/upload pool when --workers > 1')
+    parser.add_argument('--max-in-flight', type=int,
+                        help='Maximum images held in memory at once (default: 2 x workers)')
+    parser.add_argument('--manifest', default=MANIFEST_PATH,
+                        help='SQLite file recording converted HEICs and their ETags')
+    parser.add_argument('--spool-dir',
+                        help='Directory for temporary HEIC/JPEG files (default: system temp dir)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE // (1024 * 1024),
+                        help='Streaming chunk and multipart part size in MiB (minimum 5)')
+    parser.add_argument('--derivatives', action='store_true',
+                        help=f'Also write resized renditions under {DERIVATIVES_PREFIX} from the same decode')
+    parser.add_argument('--widths', type=int, nargs='+', default=list(DEFAULT_DERIVATIVE_WIDTHS),
+                        help='Rendition widths in pixels for --derivatives')
+    parser.add_argument('--formats', nargs='+', default=list(DEFAULT_DERIVATIVE_FORMATS),
+                        type=str.upper, choices=sorted(EXTENSIONS),
+                        help='Rendition formats for --derivatives')
+    parser.add_argument('--plan-only', action='store_true',
+                        help='Only print which HEICs would be converted, do not convert anything')
+    args = parser.parse_args()
+
+    if args.chunk_size < 5:
+        parser.error('--chunk-size must be at least 5 MiB')
+
+    convert_heic_to_jpg(
+        override=args.override,
+        workers=args.workers,
+        io_threads=args.io_threads,
+        max_in_flight=args.max_in_flight,
+        plan_only=args.plan_only,
+        manifest_path=args.manifest,
+        spool_dir=args.spool_dir,
+        chunk_size=args.chunk_size * 1024 * 1024,
+        renditions=derivative_renditions(args.widths, args.formats) if args.derivatives else ()
+    )
@@ -2,19 +2,134 @@
 # coding: utf-8
 
 import os
+import re
 import sys
 import json
 import argparse
-import requests
 import time
 import base64
+import threading
 from io import BytesIO
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image, UnidentifiedImageError
 import cloudinary
 import cloudinary.api
 import cloudinary.uploader
 from dotenv import load_dotenv
 import magic  # pip install python-magic
+from image_decoding import open_image, DECODE_MODES
+from image_cache import ImageCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+import image_fetcher
+import asset_source
+import cloudinary_listing
+import label_detector
+import perceptual_hash
+from result_store import ResultStore, DEFAULT_STORE_FILE, FINAL_SOURCES
+from metadata_writer import DEFAULT_WORKERS as DEFAULT_WRITE_WORKERS
+from gallery_db import DEFAULT_DB_PATH
+import extract_numbers_and_update_captions as local_ocr
+import claude_client
+from claude_client import ClaudeAPIError
+
+CLAUDE_MODEL = "claude-3-opus-20240229"
+
+# Bestand waarin de lopende batch (zie --batch) wordt bijgehouden
+BATCH_STATE_FILE = 'label_batch_state.json'
+
+# In batchmodus worden de requests hier verzameld in plaats van direct verstuurd
+batch_requests = None
+
+# Zoek het label met label_detector in plaats van de vaste uitsnede bovenaan (zie --no-label-detection)
+locate_label = True
+
+# 'claude' stuurt elke afbeelding naar Claude; 'hybrid' leest eerst met lokale OCR
+# en stuurt alleen mislukte of onzekere afbeeldingen naar Claude (zie --engine)
+ENGINES = ('claude', 'hybrid')
+engine = 'claude'
+
+# Minimale OCR-betrouwbaarheid (0-100) waarmee de hybride engine Claude overslaat
+DEFAULT_OCR_CONFIDENCE = 80
+ocr_confidence_threshold = DEFAULT_OCR_CONFIDENCE
+
+# Aantal afbeeldingen dat tegelijk bij Claude in behandeling is (zie --concurrency)
+api_concurrency = claude_client.DEFAULT_CONCURRENCY
+
+# Aantal labels per request (zie --pack); met --pack worden de uitgesneden labels
+# in pack_requests verzameld en daarna in groepen van pack_size naar Claude gestuurd
+pack_size = 1
+pack_requests = None
+
+# Afmetingen van de afbeeldingen voor Claude (zie --max-long-edge en --token-budget).
+# Grotere afbeeldingen dan 1568 px verkleint de API zelf, dus meer opsturen heeft geen zin.
+DEFAULT_MAX_LONG_EDGE = 1568
+max_long_edge = DEFAULT_MAX_LONG_EDGE
+token_budget = None
+
+# JPEG-kwaliteiten van laag naar hoog; de laagste waarbij de gedecodeerde afbeelding
+# een PSNR van minstens MIN_JPEG_PSNR dB heeft (dus weinig van het origineel afwijkt) wint
+JPEG_QUALITIES = (40, 55, 70, 85)
+MIN_JPEG_PSNR = 34.0
+
+# Herken bijna-identieke foto's aan hun perceptuele hash (zie --dedupe): 'candidate'
+# vraagt Claude toch en gebruikt het label van de gelijkende foto alleen als Claude
+# niets vindt, 'skip' neemt dat label direct over
+DEDUPE_MODES = ('off', 'candidate', 'skip')
+HASH_INDEX_FILE = 'label_hashes.json'
+dedupe_mode = 'off'
+dedupe_distance = perceptual_hash.DEFAULT_MAX_DISTANCE
+hash_index = None
+
+# Resultaten worden direct na binnenkomst in deze opslag geschreven (zie --store);
+# voorlopige en overgenomen resultaten niet
+result_store = None
+UNSTORED_SOURCES = ('previous_run', 'pack_pending', 'batch_pending')
+
+# Custom context (label_number, caption, ...) per public_id, opgehaald met de
+# resourcelijsten (met context), zodat er per afbeelding geen losse Admin API-aanroep nodig is
+context_index = {}
+
+# Bron van de afbeeldingen en bestemming van de labels (zie --source)
+image_source = None
+
+LABEL_PROMPT = (
+    "Zoek en identificeer een labelnummer in deze afbeelding. "
+    "Het label is waarschijnlijk een klein wit kaartje of een stukje schilderstape met een zwart handgeschreven nummer. "
+    "Geef alleen het nummer terug (bijv. '123'). Als je geen label of nummer kunt vinden, "
+    "zeg dan 'Geen label gevonden'."
+)
+
+PACKED_PROMPT = (
+    "Hierboven staan {count} uitsneden van foto's van schilderijen, genummerd Label 1 tot en met Label {count}. "
+    "Op elke uitsnede staat waarschijnlijk een klein wit kaartje of een stukje schilderstape met een zwart "
+    "handgeschreven nummer. Antwoord alleen met een JSON-object met voor elk volgnummer het gevonden nummer "
+    "als string, of null als je op die uitsnede geen label of nummer kunt vinden, "
+    "bijvoorbeeld {{\"1\": \"123\", \"2\": null}}."
+)
+
+class RouteStats:
+    """Houdt per route (lokale OCR, Claude) het aantal afbeeldingen en de verwerkingstijd bij."""
+
+    def __init__(self):
+        self.counts = {}
+        self.seconds = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds):
+        with self._lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+            self.seconds[route] = self.seconds.get(route, 0.0) + seconds
+
+    def print_summary(self):
+        if not self.counts:
+            return
+        print("Routes:")
+        for route, count in sorted(self.counts.items()):
+            total = self.seconds[route]
+            print(f"  - {route}: {count} afbeeldingen, gemiddeld {total / count:.2f}s, totaal {total:.1f}s")
+
+route_stats = RouteStats()
 
 def setup_cloudinary():
     """Configureer Cloudinary met de omgevingsvariabelen."""
@@ -59,110 +174,266 @@ def crop_top_area(image, percentage=30):
     top_height = int(height * percentage / 100)
     return image.crop((0, 0, width, top_height))
 
+def estimate_image_tokens(width, height):
+    """Schatting van het aantal input-tokens voor een afbeelding (breedte x hoogte / 750, volgens Anthropic)."""
+    return max(1, int(width * height / 750))
+
+def fit_image_for_claude(image):
+    """
+    Verklein een afbeelding tot de lange zijde hoogstens max_long_edge is en,
+    als token_budget gezet is, de tokenschatting binnen het budget blijft.
+    """
+    width, height = image.size
+    scale = min(1.0, max_long_edge / max(width, height))
+    if token_budget:
+        scale = min(scale, (token_budget * 750 / (width * height)) ** 0.5)
+    if scale >= 1.0:
+        return image
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    # reducing_gap laat Pillow eerst snel verkleinen met reduce() en pas daarna precies resamplen
+    return image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+def jpeg_psnr(reference, buffered):
+    """PSNR in dB tussen een grijswaardenreferentie en de JPEG in buffered."""
+    buffered.seek(0)
+    decoded = np.asarray(Image.open(buffered).convert('L'), dtype=np.float32)
+    mse = float(np.mean((reference - decoded) ** 2))
+    return float('inf') if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+def encode_jpeg(image):
+    """
+    Sla een afbeelding op als JPEG met de laagste kwaliteit uit JPEG_QUALITIES
+    waarbij het label leesbaar blijft (PSNR ten opzichte van het origineel).
+
+    De PSNR stijgt met de kwaliteit, dus de kwaliteit wordt gehalveerd in
+    plaats van van laag naar hoog geprobeerd; de hoogste kwaliteit is de
+    terugval en hoeft niet gecontroleerd te worden.
+
+    Returns:
+        Tuple (BytesIO met de JPEG, gekozen kwaliteit)
+    """
+    reference = np.asarray(image.convert('L'), dtype=np.float32)
+
+    def save(quality):
+        buffered = BytesIO()
+        image.save(buffered, format="JPEG", quality=quality, optimize=True)
+        return buffered
+
+    low, high, best = 0, len(JPEG_QUALITIES) - 1, None
+    while low < high:
+        middle = (low + high) // 2
+        buffered = save(JPEG_QUALITIES[middle])
+        if jpeg_psnr(reference, buffered) >= MIN_JPEG_PSNR:
+            high, best = middle, buffered
+        else:
+            low = middle + 1
+    # best hoort bij high, tenzij geen enkele lagere kwaliteit voldeed
+    return best if best is not None else save(JPEG_QUALITIES[-1]), JPEG_QUALITIES[high]
+
 def encode_image_base64(image):
     """
     Converteert een PIL Image naar een base64 string voor gebruik in de API.
 
+    De afbeelding wordt eerst verkleind (zie fit_image_for_claude) en met de
+    laagst bruikbare JPEG-kwaliteit opgeslagen.
+
     Args:
         image: PIL Image object
 
     Returns:
         base64 encoded string van de afbeelding
     """
-    buffered = BytesIO()
-    image.save(buffered, format="JPEG")
-    img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    original_size = image.size
+    image = fit_image_for_claude(image)
+    buffered, quality = encode_jpeg(image)
+
+    img_str = base64.b64encode(buffered.getvalue()).decode('ascii')
+    print(f"Afbeelding voor Claude: {original_size[0]}x{original_size[1]} -> {image.size[0]}x{image.size[1]}, "
+          f"JPEG-kwaliteit {quality}, {buffered.getbuffer().nbytes} bytes, "
+          f"~{estimate_image_tokens(*image.size)} tokens")
     return img_str
 
-def analyze_image_with_claude(image, api_key):
+def crop_label_area(image):
     """
-    Gebruik Claude API om een afbeelding te analyseren en het labelnummer te extraheren.
-
-    Args:
-        image: PIL Image object
-        api_key: Anthropic API sleutel
+    Snijd het label uit met de labeldetector, of val terug op het bovenste
+    deel van de afbeelding als er geen label gevonden wordt.
+    """
+    if locate_label:
+        cropped_image = label_detector.crop_label(image)
+        if cropped_image is not None:
+            print(f"Label gevonden: {cropped_image.size[0]}x{cropped_image.size[1]} van {image.size[0]}x{image.size[1]}")
+            return cropped_image
+    return crop_top_area(image)
+
+def read_label_locally(image):
+    """
+    Lees het labelnummer met de lokale OCR van extract_numbers_and_update_captions.
 
     Returns:
-        Het gedetecteerde labelnummer of None
+        Tuple (nummer of None, betrouwbaarheid 0-100)
     """
-    # Crop het bovenste deel van de afbeelding
-    cropped_image = crop_top_area(image)
+    crop = local_ocr.locate_label_region(image)
+    return local_ocr.extract_number_from_image(crop, crop_percentage=1.0)
 
-    # Converteer naar base64
-    base64_image = encode_image_base64(cropped_image)
+def label_image_block(image):
+    """
+    Snijd het label uit en geef het als image-blok voor /v1/messages terug.
 
-    headers = {
-        "x-api-key": api_key,
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json"
+    Args:
+        image: PIL Image object (volledige afbeelding)
+    """
+    # Crop het label, of anders het bovenste deel van de afbeelding
+    cropped_image = crop_label_area(image)
+
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": "image/jpeg",
+            "data": encode_image_base64(cropped_image)
+        }
     }
 
-    data = {
-        "model": "claude-3-opus-20240229",
-        "max_tokens": 1000,
+def build_block_request(block):
+    """Stel de request body voor /v1/messages samen voor één image-blok uit label_image_block."""
+    return {
+        "model": CLAUDE_MODEL,
+        # Het antwoord is één nummer of 'Geen label gevonden'
+        "max_tokens": 100,
         "messages": [
             {
                 "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "image/jpeg",
-                            "data": base64_image
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": "Zoek en identificeer een labelnummer in deze afbeelding. "
-                               "Het label is waarschijnlijk een klein wit kaartje of een stukje schilderstape met een zwart handgeschreven nummer. "
-                               "Geef alleen het nummer terug (bijv. '123'). Als je geen label of nummer kunt vinden, "
-                               "zeg dan 'Geen label gevonden'."
-                    }
-                ]
+                "content": [block, {"type": "text", "text": LABEL_PROMPT}]
             }
         ]
     }
 
-    try:
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers=headers,
-            json=data
-        )
-
-        if response.status_code != 200:
-            print(f"Fout bij API aanroep: {response.status_code} {response.text}")
-            return None
+def build_label_request(image):
+    """
+    Stel de request body voor /v1/messages samen voor één afbeelding.
 
-        result = response.json()
-        response_text = result["content"][0]["text"]
+    Args:
+        image: PIL Image object (volledige afbeelding; het label wordt hier uitgesneden)
 
-        # Eenvoudige parsing van het antwoord
-        if "geen label gevonden" in response_text.lower():
-            return None
+    Returns:
+        Dict met model, max_tokens en messages
+    """
+    return build_block_request(label_image_block(image))
 
-        # Extract nummer met regex
-        import re
-        numbers = re.findall(r'\d+', response_text)
-        if numbers:
-            return numbers[0]
+def build_packed_request(blocks):
+    """
+    Stel één request samen voor meerdere labels.
 
+    Elk image-blok krijgt een volgnummer ('Label 1', 'Label 2', ...) in een
+    tekstblok ervoor; Claude antwoordt met een JSON-object van volgnummer naar
+    labelnummer (zie parse_packed_response).
+    """
+    content = []
+    for i, block in enumerate(blocks, 1):
+        content.append({"type": "text", "text": f"Label {i}:"})
+        content.append(block)
+    content.append({"type": "text", "text": PACKED_PROMPT.format(count=len(blocks))})
+
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 50 + 15 * len(blocks),
+        "messages": [{"role": "user", "content": content}]
+    }
+
+def parse_label_response(message):
+    """
+    Haal het labelnummer uit een antwoord van /v1/messages.
+
+    Returns:
+        Het labelnummer als string, of None als Claude geen label vond
+    """
+    response_text = message["content"][0]["text"]
+
+    # Eenvoudige parsing van het antwoord
+    if "geen label gevonden" in response_text.lower():
         return None
-    except Exception as e:
-        print(f"Fout bij het aanroepen van Claude API: {str(e)}")
-        return None
+
+    # Extract nummer met regex
+    numbers = re.findall(r'\d+', response_text)
+    if numbers:
+        return numbers[0]
+
+    return None
+
+def parse_packed_response(message, count):
+    """
+    Haal de labelnummers uit het antwoord op een request van build_packed_request.
+
+    Volgnummers waarvoor het antwoord onduidelijk is ontbreken in het resultaat:
+    geen geldig JSON, een ontbrekend volgnummer of een waarde die geen nummer
+    of null is. Hetzelfde nummer bij meerdere labels is wel geldig: foto's uit
+    een serie van hetzelfde schilderij hebben hetzelfde label.
+
+    Returns:
+        Dict van volgnummer (1..count) naar labelnummer, of None voor 'geen label'
+    """
+    response_text = message["content"][0]["text"]
+    match = re.search(r'\{.*\}', response_text, re.DOTALL)
+    try:
+        mapping = json.loads(match.group(0)) if match else None
+    except ValueError:
+        mapping = None
+    if not isinstance(mapping, dict):
+        return {}
+
+    answers = {}
+    for key, value in mapping.items():
+        key = str(key).strip()
+        if not key.isdigit() or not 1 <= int(key) <= count:
+            continue
+        if value is None:
+            answers[int(key)] = None
+        elif re.fullmatch(r'\d+', str(value).strip()):
+            answers[int(key)] = str(value).strip()
+    return answers
+
+def analyze_image_with_claude(image, api_key):
+    """
+    Gebruik Claude API om een afbeelding te analyseren en het labelnummer te extraheren.
+
+    Args:
+        image: PIL Image object
+        api_key: Anthropic API sleutel
+
+    Returns:
+        Het gedetecteerde labelnummer of None als Claude geen label zag
+
+    Raises:
+        ClaudeAPIError: als de API (na herhaalpogingen) geen antwoord gaf; dat
+            is geen 'geen label' en mag de afbeelding dus niet als mislukt markeren
+    """
+    message = claude_client.get_client(api_key).create_message(build_label_request(image))
+    return parse_label_response(message)
+
+def index_context(resources):
+    """Neem de custom context van resources die met context=True zijn opgehaald op in context_index."""
+    for resource in resources:
+        context_index[resource['public_id']] = resource.get('context', {}).get('custom', {})
 
 def get_existing_label_number(public_id):
     """
     Haal een bestaand labelnummer op uit Cloudinary metadata.
 
+    Voor afbeeldingen uit een folderlijst staat de context al in context_index;
+    alleen voor andere afbeeldingen wordt de resource los opgevraagd.
+
     Args:
         public_id: Cloudinary public_id van de afbeelding
 
     Returns:
         Het bestaande labelnummer als string of None als het niet bestaat
     """
+    custom = context_index.get(public_id)
+    if custom is not None:
+        return custom.get('label_number')
+
     try:
         resource = cloudinary.api.resource(public_id, context=True)
         context = resource.get('context', {})
@@ -177,59 +448,88 @@ def get_existing_label_number(public_id):
         print(f"Fout bij ophalen van metadata voor {public_id}: {str(e)}")
         return None
 
-def load_previous_results(output_file):
+def load_previous_results(store):
     """
-    Laad resultaten van eerdere runs uit een JSON-bestand.
+    Laad de gevonden labels van eerdere runs uit de resultatenopslag.
+
+    Alleen labels van Claude, van bijna-identieke foto's, uit de bestaande
+    metadata, uit het geïmporteerde resultatenbestand en van lokale OCR met
+    minstens ocr_confidence_threshold tellen;
+    onzekere OCR-resultaten van extract_numbers_and_update_captions.py gaan
+    alsnog naar Claude.
 
     Args:
-        output_file: Pad naar het JSON-bestand
+        store: ResultStore
 
     Returns:
         Dictionary met public_ids als sleutels en labelnummers als waarden
     """
-    previous_results = {}
+    previous_results = store.labels(sources=FINAL_SOURCES, min_ocr_confidence=ocr_confidence_threshold)
+    print(f"Geladen resultaten uit vorige run: {len(previous_results)} items")
+    return previous_results
 
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                results = json.load(f)
-                for result in results:
-                    if result.get('success') and result.get('label_number'):
-                        previous_results[result['public_id']] = result['label_number']
-            print(f"Geladen resultaten uit vorige run: {len(previous_results)} items")
-        except Exception as e:
-            print(f"Fout bij laden van vorige resultaten: {str(e)}")
+def store_result(result):
+    """Schrijf een nieuw resultaat direct weg in de resultatenopslag en geef het terug."""
+    source = result.get('source')
+    if result_store is not None and source not in UNSTORED_SOURCES:
+        model = 'tesseract' if source == 'local_ocr' else CLAUDE_MODEL if source.startswith('claude') else None
+        result_store.record(result, model, 'extract_labels_claude')
+    return result
 
-    return previous_results
+def download_image_content(url):
+    """
+    Download een afbeelding.
 
-def download_and_convert_image(url):
+    Args:
+        url: URL van de afbeelding
+
+    Returns:
+        De binaire inhoud van de afbeelding of None bij fout
+    """
+    result = image_fetcher.get_fetcher().fetch(url)
+    if result.error:
+        print(f"Fout bij downloaden van afbeelding: {result.error}")
+        return None
+    return result.content
+
+def download_and_convert_image(url, decode_mode='full'):
     """
     Download een afbeelding en converteer deze naar een PIL Image object.
     Deze functie probeert meerdere formaten als het eerste niet lukt.
 
     Args:
         url: URL van de afbeelding
+        decode_mode: 'full' of 'reduced' (zie image_decoding)
 
     Returns:
         PIL Image object of None bij fout
     """
-    try:
-        # Download de afbeelding eerst
-        response = requests.get(url)
-        if response.status_code != 200:
-            print(f"Fout bij downloaden van afbeelding: status code {response.status_code}")
-            return None
+    content = download_image_content(url)
+    if content is None:
+        return None
+    return convert_image_content(content, url, decode_mode)
 
-        image_data = BytesIO(response.content)
+def convert_image_content(content, url, decode_mode='full'):
+    """
+    Converteer gedownloade afbeeldingsgegevens naar een PIL Image object.
 
+    Args:
+        content: Binaire inhoud van de afbeelding
+        url: URL van de afbeelding, voor de JPEG-fallback via Cloudinary
+        decode_mode: 'full' of 'reduced' (zie image_decoding)
+
+    Returns:
+        PIL Image object of None bij fout
+    """
+    try:
         # Controleer het bestandstype met python-magic
         mime = magic.Magic(mime=True)
-        file_type = mime.from_buffer(response.content)
+        file_type = mime.from_buffer(content)
         print(f"Gedetecteerd bestandstype: {file_type}")
 
         # Probeer als normale afbeelding
         try:
-            return Image.open(image_data)
+            return open_image(content, decode_mode)
         except UnidentifiedImageError:
             print(f"Kan bestandsformaat niet identificeren, probeer conversie...")
 
@@ -248,8 +548,7 @@ def download_and_convert_image(url):
                     register_heif_opener()
 
                     # Probeer opnieuw te openen als HEIC
-                    image_data.seek(0)
-                    return Image.open(image_data)
+                    return open_image(content, decode_mode)
                 except Exception as heic_err:
                     print(f"Fout bij het converteren van HEIC: {str(heic_err)}")
 
@@ -258,19 +557,25 @@ def download_and_convert_image(url):
                 print("Proberen om via Cloudinary een JPEG-versie te krijgen...")
                 # Voeg .jpg transformatie toe aan de URL
                 jpg_url = url.replace("/upload/", "/upload/f_jpg/")
-                jpg_response = requests.get(jpg_url)
-                jpg_data = BytesIO(jpg_response.content)
-                return Image.open(jpg_data)
+                jpg_content = download_image_content(jpg_url)
+                return open_image(jpg_content, decode_mode)
             except Exception as jpg_err:
                 print(f"Fout bij het downloaden als JPEG: {str(jpg_err)}")
 
             return None
 
     except Exception as e:
-        print(f"Onverwachte fout bij het downloaden/converteren van afbeelding: {str(e)}")
+        print(f"Onverwachte fout bij het converteren van afbeelding: {str(e)}")
         return None
 
-def process_image(image_url, public_id, api_key, previous_results):
+def index_result(result):
+    """Neem een nieuw gevonden label met zijn image_hash op in de hash-index."""
+    if (hash_index is not None and result.get('success') and result.get('image_hash')
+            and result.get('source') != 'duplicate'):
+        hash_index.add(int(result['image_hash'], 16), result['public_id'], result['label_number'])
+    return result
+
+def process_image(image_url, public_id, api_key, previous_results, decode_mode='full', content=None):
     """
     Verwerk een enkele afbeelding met Claude, tenzij deze al succesvol verwerkt is.
 
@@ -279,6 +584,9 @@ def process_image(image_url, public_id, api_key, previous_results):
         public_id: Cloudinary public_id van de afbeelding
         api_key: Anthropic API sleutel
         previous_results: Dictionary met eerder gevonden labelnummers
+        decode_mode: 'reduced' om eerst een verkleinde afbeelding te sturen,
+            met terugval op 'full' als er geen label gevonden wordt
+        content: Optioneel de al gedownloade afbeelding; anders wordt deze hier gedownload
 
     Returns:
         Dict met resultaten
@@ -286,6 +594,18 @@ def process_image(image_url, public_id, api_key, previous_results):
     try:
         print(f"Verwerken van afbeelding: {public_id}")
 
+        # Een label dat al in de bron staat (Cloudinary-context of galerijdatabase) gaat
+        # voor, zodat een resultaat uit een vorige run nooit een bestaand label overschrijft
+        existing_label = get_existing_label_number(public_id)
+        if existing_label:
+            print(f"Gebruikt bestaand label uit {image_source.name}: {existing_label}")
+            return {
+                "public_id": public_id,
+                "label_number": existing_label,
+                "success": True,
+                "source": "cloudinary_metadata"
+            }
+
         # Controleer of we al een eerder resultaat hebben
         if public_id in previous_results:
             label_number = previous_results[public_id]
@@ -297,19 +617,10 @@ def process_image(image_url, public_id, api_key, previous_results):
                 "source": "previous_run"
             }
 
-        # Controleer of er al een labelnummer in Cloudinary staat
-        existing_label = get_existing_label_number(public_id)
-        if existing_label:
-            print(f"Gebruikt bestaand label uit Cloudinary: {existing_label}")
-            return {
-                "public_id": public_id,
-                "label_number": existing_label,
-                "success": True,
-                "source": "cloudinary_metadata"
-            }
-
         # Download en converteer de afbeelding met verbeterde foutafhandeling
-        img = download_and_convert_image(image_url)
+        if content is None:
+            content = download_image_content(image_url)
+        img = convert_image_content(content, image_url, decode_mode) if content is not None else None
 
         if img is None:
             print(f"Kon de afbeelding niet verwerken: {public_id}")
@@ -321,23 +632,111 @@ def process_image(image_url, public_id, api_key, previous_results):
                 "source": "error"
             }
 
+        # Zoek een eerder gelabelde, bijna identieke foto
+        dedupe = {}
+        duplicate = None
+        if hash_index is not None:
+            image_hash = hash_index.hash(img)
+            dedupe["image_hash"] = f"{image_hash:016x}"
+            # Wacht op een bijna-identieke foto die nu verwerkt wordt, in plaats van ook Claude te vragen
+            duplicate = hash_index.nearest_or_claim(image_hash, public_id, dedupe_distance)
+        if duplicate is not None:
+            duplicate_id, duplicate_label, distance = duplicate
+            dedupe.update({"duplicate_of": duplicate_id, "candidate_label": duplicate_label, "hash_distance": distance})
+            print(f"Bijna gelijk aan {duplicate_id} (afstand {distance}, label {duplicate_label})")
+            if dedupe_mode == 'skip':
+                return {
+                    "public_id": public_id,
+                    "label_number": duplicate_label,
+                    "success": True,
+                    "source": "duplicate",
+                    **dedupe
+                }
+
+        started = time.perf_counter()
+        route = 'claude'
+
+        # Probeer eerst lokale OCR; alleen mislukte of onzekere afbeeldingen gaan naar Claude
+        if engine == 'hybrid':
+            ocr_number, ocr_confidence = read_label_locally(img)
+            if ocr_number and ocr_confidence >= ocr_confidence_threshold:
+                route_stats.record('ocr', time.perf_counter() - started)
+                print(f"Label nummer gevonden met lokale OCR: {ocr_number} (betrouwbaarheid {ocr_confidence:.0f})")
+                return index_result({
+                    "public_id": public_id,
+                    "label_number": ocr_number,
+                    "success": True,
+                    "source": "local_ocr",
+                    "ocr_confidence": ocr_confidence,
+                    **dedupe
+                })
+            print(f"Lokale OCR onzeker ({ocr_number}, betrouwbaarheid {ocr_confidence:.0f}), door naar Claude")
+            route = 'ocr+claude'
+
+        # Met --pack wordt het uitgesneden label bewaard en later met andere labels samen verstuurd
+        if pack_requests is not None:
+            pack_requests.append((public_id, label_image_block(img)))
+            return {
+                "public_id": public_id,
+                "label_number": None,
+                "success": False,
+                "source": "pack_pending",
+                **dedupe
+            }
+
+        # In batchmodus wordt het request bewaard en later in één batch verstuurd
+        if batch_requests is not None:
+            batch_requests.append((public_id, build_label_request(img)))
+            print(f"Toegevoegd aan batch: {public_id}")
+            return {
+                "public_id": public_id,
+                "label_number": None,
+                "success": False,
+                "source": "batch_pending",
+                **dedupe
+            }
+
         # Gebruik Claude om het label te analyseren
         label_number = analyze_image_with_claude(img, api_key)
 
+        if label_number is None and decode_mode != 'full':
+            print("Geen label in gereduceerde afbeelding, opnieuw met volledige resolutie")
+            full_img = convert_image_content(content, image_url, 'full')
+            if full_img is not None:
+                label_number = analyze_image_with_claude(full_img, api_key)
+
+        route_stats.record(route, time.perf_counter() - started)
+
+        source = "claude_api"
+        if duplicate is not None and label_number != duplicate_label:
+            if label_number is None:
+                print(f"Claude vond geen label, label {duplicate_label} van {duplicate_id} overgenomen")
+                label_number, source = duplicate_label, "duplicate"
+            else:
+                print(f"Let op: Claude las {label_number}, de gelijkende foto {duplicate_id} heeft {duplicate_label}")
+
         success = label_number is not None
         if success:
             print(f"Label nummer gevonden: {label_number}")
         else:
             print("Geen label nummer gevonden")
 
-        # Even wachten tussen API calls om rate limits te respecteren
-        time.sleep(1)
-
-        return {
+        return index_result({
             "public_id": public_id,
             "label_number": label_number,
             "success": success,
-            "source": "claude_api"
+            "source": source,
+            **dedupe
+        })
+    except ClaudeAPIError as e:
+        # Geen antwoord van de API: niet als 'geen label' opslaan, zodat een volgende run het opnieuw probeert
+        print(f"Fout bij API aanroep voor {public_id}: {str(e)}")
+        return {
+            "public_id": public_id,
+            "label_number": None,
+            "success": False,
+            "error": str(e),
+            "source": "error"
         }
     except Exception as e:
         print(f"Fout bij verwerken van afbeelding {public_id}: {str(e)}")
@@ -348,146 +747,352 @@ def process_image(image_url, public_id, api_key, previous_results):
             "error": str(e),
             "source": "error"
         }
+    finally:
+        # Pas na index_result: wachtende buren vinden het label dan direct
+        if hash_index is not None:
+            hash_index.release(public_id)
 
-def process_folder(folder_path, api_key, previous_results, limit=None):
+def process_resources(resources, api_key, previous_results, decode_mode='full'):
     """
-    Verwerk alle afbeeldingen in een specifieke folder.
+    Verwerk een stroom resources (zoals asset_source ze geeft) zodra ze binnenkomen.
 
     Args:
-        folder_path: Pad naar de Cloudinary folder
+        resources: Iterable van resources in de vorm van de Cloudinary Admin API, met context
         api_key: Anthropic API sleutel
         previous_results: Dictionary met eerder gevonden labelnummers
-        limit: Optionele limiet voor het aantal te verwerken afbeeldingen
+        decode_mode: 'full' of 'reduced' (zie process_image)
 
     Returns:
         Lijst met resultaten per afbeelding
     """
-    print(f"Verwerken van folder: {folder_path}")
     results = []
 
-    try:
-        # Haal alle resources op uit de folder
-        response = cloudinary.api.resources_by_asset_folder(folder_path, max_results=500)
+    # Download alvast gelijktijdig de afbeeldingen die nog geen resultaat of label in Cloudinary hebben.
+    # De context van elke resource wordt bij binnenkomst in context_index opgenomen.
+    def url_to_fetch(resource):
+        index_context([resource])
+        public_id = resource['public_id']
+        if public_id in previous_results or context_index.get(public_id, {}).get('label_number'):
+            return None
+        return resource['secure_url']
+
+    fetcher = image_fetcher.get_fetcher()
+    prefetched = fetcher.fetch_many(resources, url_of=url_to_fetch)
+
+    # Verwerk de afbeeldingen met meerdere Claude-requests tegelijk; de client
+    # bewaakt de rate limit. Er staan nooit meer dan 2x --concurrency afbeeldingen
+    # klaar, zodat niet alle downloads tegelijk in het geheugen staan.
+    with ThreadPoolExecutor(max_workers=api_concurrency) as executor:
+        pending = []
+        for resource, fetched in prefetched:
+            pending.append(executor.submit(process_image, resource['secure_url'], resource['public_id'], api_key,
+                                           previous_results, decode_mode, content=fetched.content))
+            if len(pending) >= 2 * api_concurrency:
+                results.append(store_result(pending.pop(0).result()))
+        results.extend(store_result(future.result()) for future in pending)
+
+    return results
+
+def process_all_folders(main_folder="Tom van As Kunst", api_key=None, previous_results=None, limit_per_folder=None,
+                        decode_mode='full'):
+    """
+    Verwerk de hoofdfolder en al zijn subfolders.
 
-        # Beperk aantal verwerkte afbeeldingen indien nodig
-        resources = response['resources']
-        if limit:
-            resources = resources[:limit]
+    De resources worden per pagina uit de bron opgehaald (zie asset_source) en
+    meteen verwerkt; bij Cloudinary met --listing search in één Search API-opvraging.
 
-        # Verwerk elke afbeelding
-        for resource in resources:
-            result = process_image(resource['secure_url'], resource['public_id'], api_key, previous_results)
-            results.append(result)
+    Args:
+        main_folder: Naam van de hoofdfolder in Cloudinary (bij MinIO de prefix in de bucket)
+        api_key: Anthropic API sleutel
+        previous_results: Dictionary met eerder gevonden labelnummers
+        limit_per_folder: Optionele limiet voor het aantal te verwerken afbeeldingen per folder
+        decode_mode: 'full' of 'reduced' (zie process_image)
 
-        return results
+    Returns:
+        Lijst met resultaten van alle afbeeldingen
+    """
+    resources = image_source.iter_resources(main_folder, limit_per_folder)
+    try:
+        return process_resources(resources, api_key, previous_results, decode_mode)
     except Exception as e:
-        print(f"Fout bij verwerken van folder {folder_path}: {str(e)}")
+        print(f"Fout bij verwerken van {main_folder}: {str(e)}")
         return []
 
-def process_all_folders(main_folder="Tom van As Kunst", api_key=None, previous_results=None, limit_per_folder=None):
+def ask_packed(group, api_key):
     """
-    Verwerk alle subfolders in de opgegeven hoofdfolder.
+    Vraag Claude in één request naar de labels van een groep uit pack_requests.
+
+    Labels waarvoor het antwoord onduidelijk is (zie parse_packed_response)
+    worden nog een keer los gevraagd.
+
+    Returns:
+        Dict van public_id naar resultaat
+    """
+    client = claude_client.get_client(api_key)
+    started = time.perf_counter()
+    results = {}
+
+    try:
+        message = client.create_message(build_packed_request([block for _, block in group]))
+    except ClaudeAPIError as e:
+        print(f"Fout bij API aanroep voor {len(group)} labels: {str(e)}")
+        for public_id, _ in group:
+            results[public_id] = {
+                "public_id": public_id,
+                "label_number": None,
+                "success": False,
+                "error": str(e),
+                "source": "error"
+            }
+        return results
+
+    answers = parse_packed_response(message, len(group))
+    for i, (public_id, block) in enumerate(group, 1):
+        source = "claude_packed"
+        if i in answers:
+            label_number = answers[i]
+        else:
+            print(f"Onduidelijk antwoord voor {public_id}, label los opnieuw vragen")
+            source = "claude_api"
+            try:
+                label_number = parse_label_response(client.create_message(build_block_request(block)))
+            except ClaudeAPIError as e:
+                print(f"Fout bij API aanroep voor {public_id}: {str(e)}")
+                results[public_id] = {
+                    "public_id": public_id,
+                    "label_number": None,
+                    "success": False,
+                    "error": str(e),
+                    "source": "error"
+                }
+                continue
+
+        results[public_id] = {
+            "public_id": public_id,
+            "label_number": label_number,
+            "success": label_number is not None,
+            "source": source
+        }
+
+    elapsed = time.perf_counter() - started
+    for _ in group:
+        route_stats.record('claude_packed', elapsed / len(group))
+    print(f"{len(group)} labels in één request: {len(answers)} direct beantwoord")
+    return results
+
+def resolve_packed(results, api_key):
+    """
+    Stuur de met --pack verzamelde labels in groepen van pack_size naar Claude
+    en voeg de antwoorden samen met de resultaten.
 
     Args:
-        main_folder: Naam van de hoofdfolder in Cloudinary
+        results: Lijst met resultaten, met 'pack_pending' voor de verzamelde labels
         api_key: Anthropic API sleutel
-        previous_results: Dictionary met eerder gevonden labelnummers
-        limit_per_folder: Optionele limiet voor het aantal te verwerken afbeeldingen per folder
 
     Returns:
-        Lijst met resultaten van alle afbeeldingen
+        De bijgewerkte lijst met resultaten
     """
-    all_results = []
+    groups = [pack_requests[i:i + pack_size] for i in range(0, len(pack_requests), pack_size)]
+    print(f"Versturen van {len(pack_requests)} labels in {len(groups)} requests")
+
+    pending = {r['public_id']: r for r in results if r.get('source') == 'pack_pending'}
+    packed_results = {}
+    with ThreadPoolExecutor(max_workers=api_concurrency) as executor:
+        for group_results in executor.map(lambda group: ask_packed(group, api_key), groups):
+            for public_id, result in group_results.items():
+                store_result(dict(pending.get(public_id, {}), **result))
+            packed_results.update(group_results)
+
+    # Eigen velden van het voorlopige resultaat (zoals image_hash) blijven behouden
+    merged = [dict(r, **packed_results.pop(r['public_id'], {})) if r.get('source') == 'pack_pending' else r
+              for r in results]
+    merged.extend(packed_results.values())
+    return merged
+
+def save_batch_state(state, state_file):
+    """Schrijf de batchstatus atomair weg, zodat een onderbreking nooit een half bestand achterlaat."""
+    tmp_path = f"{state_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_file)
+
+def find_submitted_batch(client, state):
+    """
+    Zoek de batch van een verzending waarvan niet bekend is of hij gelukt is
+    (time-out of verbroken verbinding tijdens create_batch).
+
+    Een batch telt als de onze als hij na het begin van de verzending is
+    aangemaakt (met wat speling voor een verschil in klok) en evenveel
+    requests bevat.
 
+    Returns:
+        De batch-ID, of None als er geen passende batch is
+    """
+    submitted_at = datetime.fromisoformat(state['submitted_at']) - timedelta(minutes=5)
+    for batch in client.list_batches():
+        created_at = batch.get('created_at')
+        if not created_at or datetime.fromisoformat(created_at.replace('Z', '+00:00')) < submitted_at:
+            continue
+        if sum(batch.get('request_counts', {}).values()) == state['request_count']:
+            return batch['id']
+    return None
+
+def load_batch_state(api_key, state_file):
+    """
+    Laad een lopende batch uit een eerdere run.
+
+    Was de verzending onderbroken voordat de batch-ID binnen was, dan wordt de
+    batch eerst in de recente batches gezocht; staat hij daar niet, dan is er
+    niets verstuurd en wordt het state-bestand verwijderd, zodat de afbeeldingen
+    opnieuw verzameld worden.
+
+    Returns:
+        De batchstatus, of None als er geen lopende batch is
+    """
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('batch_id') is None:
+        state['batch_id'] = find_submitted_batch(claude_client.get_client(api_key), state)
+        if state['batch_id'] is None:
+            print("Geen batch gevonden bij de onderbroken verzending; de afbeeldingen worden opnieuw verzameld")
+            os.remove(state_file)
+            return None
+        print(f"Batch {state['batch_id']} van de onderbroken verzending teruggevonden")
+        save_batch_state(state, state_file)
+    return state
+
+def submit_batch(results, api_key, state_file):
+    """
+    Verstuur de verzamelde requests als één batch en leg de batch vast.
+
+    De batch-ID, de koppeling van custom_id naar public_id en de voorlopige
+    resultaten (met source 'batch_pending') worden in state_file bewaard, zodat
+    een afgebroken run met --batch hervat kan worden. Dat gebeurt al vóór de
+    verzending: is na een time-out onbekend of de batch is aangemaakt, dan wordt
+    hij in de recente batches gezocht in plaats van nog een keer (betaald)
+    verstuurd.
+
+    Returns:
+        De vastgelegde batchstatus, of None als er niets verstuurd is of nog
+        onbekend is welke batch het werd
+    """
+    if not batch_requests:
+        print("Geen afbeeldingen om in een batch te versturen")
+        return None
+
+    # custom_id mag alleen letters, cijfers, - en _ bevatten; public_ids bevatten spaties en /
+    custom_ids = {f"label-{i}": public_id for i, (public_id, _) in enumerate(batch_requests)}
+    requests_body = [{"custom_id": f"label-{i}", "params": params} for i, (_, params) in enumerate(batch_requests)]
+
+    state = {
+        "batch_id": None,
+        "submitted_at": datetime.now(timezone.utc).isoformat(),
+        "request_count": len(requests_body),
+        "custom_ids": custom_ids,
+        "results": results,
+    }
+    save_batch_state(state, state_file)
+
+    client = claude_client.get_client(api_key)
     try:
-        # Haal alle subfolders op
-        print(f"Ophalen van subfolders in {main_folder}...")
-        folders_response = cloudinary.api.subfolders(main_folder)
+        state['batch_id'] = client.create_batch(requests_body)['id']
+    except ClaudeAPIError as e:
+        if not e.transient:
+            # De API heeft de batch geweigerd, er is dus niets aangemaakt
+            os.remove(state_file)
+            raise
+        print(f"Onbekend of de batch is aangemaakt ({e}), zoeken in de recente batches")
+        state['batch_id'] = find_submitted_batch(client, state)
+        if state['batch_id'] is None:
+            print("Batch (nog) niet gevonden; de volgende run met --batch zoekt opnieuw voordat er iets verstuurd wordt")
+            return None
+    save_batch_state(state, state_file)
 
-        # Verwerk elke subfolder
-        for folder in folders_response['folders']:
-            folder_results = process_folder(folder['path'], api_key, previous_results, limit_per_folder)
-            all_results.extend(folder_results)
+    print(f"Batch {state['batch_id']} verstuurd met {len(requests_body)} afbeeldingen")
+    return state
 
-        # Verwerk ook de hoofdfolder zelf als er afbeeldingen direct in zitten
-        main_folder_results = process_folder(main_folder, api_key, previous_results, limit_per_folder)
-        all_results.extend(main_folder_results)
+def collect_batch(results, api_key, state, state_file, poll_interval=claude_client.DEFAULT_POLL_INTERVAL):
+    """
+    Wacht tot de batch klaar is en voeg de antwoorden samen met de resultaten.
 
-        return all_results
-    except Exception as e:
-        print(f"Fout bij ophalen van folders: {str(e)}")
+    Args:
+        results: Lijst met resultaten, met 'batch_pending' voor de afbeeldingen in de batch
+        api_key: Anthropic API sleutel
+        state: Batchstatus uit submit_batch (of het state-bestand)
+        state_file: Wordt verwijderd zodra de resultaten binnen zijn
+        poll_interval: Seconden tussen twee statuscontroles
 
-        # Fallback: probeer alleen de hoofdfolder
-        try:
-            print("Fallback: verwerken van alleen de hoofdfolder...")
-            return process_folder(main_folder, api_key, previous_results, limit_per_folder)
-        except Exception as fallback_error:
-            print(f"Fallback fout: {str(fallback_error)}")
-            return []
+    Returns:
+        De bijgewerkte lijst met resultaten
+    """
+    client = claude_client.get_client(api_key)
+    batch = client.wait_for_batch(state['batch_id'], poll_interval)
+
+    batch_results = {}
+    for entry in client.iter_batch_results(batch):
+        public_id = state['custom_ids'].get(entry['custom_id'])
+        if public_id is None:
+            continue
+        result = entry['result']
+        if result['type'] == 'succeeded':
+            label_number = parse_label_response(result['message'])
+            batch_results[public_id] = {
+                "public_id": public_id,
+                "label_number": label_number,
+                "success": label_number is not None,
+                "source": "claude_batch"
+            }
+        else:
+            batch_results[public_id] = {
+                "public_id": public_id,
+                "label_number": None,
+                "success": False,
+                "error": json.dumps(result.get('error', result['type'])),
+                "source": "error"
+            }
+
+    pending = {r['public_id']: r for r in results if r.get('source') == 'batch_pending'}
+    for public_id, result in batch_results.items():
+        store_result(dict(pending.get(public_id, {}), **result))
+
+    # Eigen velden van het voorlopige resultaat (zoals image_hash) blijven behouden
+    merged = [dict(r, **batch_results.pop(r['public_id'], {})) if r.get('source') == 'batch_pending' else r
+              for r in results]
+    # Afbeeldingen die niet (meer) in de resultatenlijst stonden, toch opnemen
+    merged.extend(batch_results.values())
+
+    os.remove(state_file)
+    print(f"Batch {state['batch_id']} afgerond")
+    return merged
 
-def update_cloudinary_metadata(results):
+def update_cloudinary_metadata(results, write_workers=DEFAULT_WRITE_WORKERS):
     """
-    Update de metadata van de afbeeldingen in Cloudinary met de gevonden labelnummers.
+    Update de metadata van de afbeeldingen in de bron met de gevonden labelnummers.
+
+    Bij Cloudinary wordt het labelnummer als label_number en als caption in de
+    context gezet. Afbeeldingen met hetzelfde nummer worden in één
+    add_context-aanroep bijgewerkt, en afbeeldingen waarvan de context al klopt
+    (volgens context_index) worden overgeslagen; zie metadata_writer. Bij MinIO
+    gaan de labels naar de galerijdatabase.
 
     Args:
         results: Lijst met resultaten van de verwerking
+        write_workers: Maximum aantal gelijktijdige Cloudinary-aanroepen
     """
-    updated_count = 0
-
-    # Zorg dat de cloudinary modules correct zijn geïmporteerd
-    import cloudinary
-    import cloudinary.uploader
-    import cloudinary.api
+    writer = image_source.writer(context_index, max_workers=write_workers)
 
     for result in results:
         if result['success'] and result['label_number']:
             # Als de bron cloudinary_metadata is, hoeven we niet opnieuw bij te werken
             if result.get('source') == 'cloudinary_metadata':
                 continue
+            writer.add(result['public_id'], {'label_number': result['label_number'], 'caption': result['label_number']})
 
-            try:
-                # Voeg het labelnummer toe als contextual metadata
-                cloudinary.uploader.add_context(
-                    f'label_number={result["label_number"]}',
-                    public_ids=[result['public_id']]
-                )
-
-                # Update ook de titel (caption) met het labelnummer
-                cloudinary.uploader.explicit(
-                    result['public_id'],
-                    type="upload",
-                    caption=f"{result['label_number']}"
-                )
-
-                updated_count += 1
-                print(f"Metadata en titel bijgewerkt voor {result['public_id']}")
-            except Exception as e:
-                print(f"Fout bij updaten metadata voor {result['public_id']}: {str(e)}")
-                print(f"Details: {type(e).__name__}")
-
-                # Alternatieve methode proberen als de eerste methode faalt
-                try:
-                    print("Alternatieve methode proberen via cloudinary.api...")
-                    # Gebruik cloudinary.api.update in plaats van uploader.add_context
-                    cloudinary.api.update(
-                        result['public_id'],
-                        context=f'label_number={result["label_number"]}',
-                        metadata=True
-                    )
-
-                    # Probeer ook de titel bij te werken met alternatieve methode
-                    cloudinary.api.update(
-                        result['public_id'],
-                        display_name=f"Schilderij #{result['label_number']}",
-                        metadata=True
-                    )
-
-                    updated_count += 1
-                    print(f"Metadata en titel bijgewerkt voor {result['public_id']} via alternatieve methode")
-                except Exception as alt_error:
-                    print(f"Ook alternatieve methode faalde: {str(alt_error)}")
-
-    print(f"Totaal {updated_count} afbeeldingen bijgewerkt in Cloudinary")
+    stats = writer.flush()
+    print(f"Totaal {stats['written']} afbeeldingen bijgewerkt in {image_source.name} "
+          f"({stats['skipped']} waren al actueel, {stats['failed']} mislukt)")
 
 def check_required_packages():
     """
@@ -521,41 +1126,163 @@ def main():
     """Hoofdfunctie van het script."""
     parser = argparse.ArgumentParser(description='Extraheer labelnummers uit afbeeldingen in Cloudinary met Claude API.')
     parser.add_argument('--folder', default='Tom van As Kunst', help='Cloudinary folder om te verwerken')
-    parser.add_argument('--output', default='label_extraction_results.json', help='Output JSON bestand')
-    parser.add_argument('--update-cloudinary', action='store_true', help='Update Cloudinary metadata met gevonden labels')
+    parser.add_argument('--output', default='label_extraction_results.json',
+                        help='Output JSON bestand (export van de resultatenopslag, wordt eenmalig geïmporteerd)')
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE,
+                        help='SQLite-bestand waarin elk resultaat direct wordt opgeslagen, met de geschiedenis per poging')
+    parser.add_argument('--update-cloudinary', '--update-labels', dest='update_cloudinary', action='store_true',
+                        help='Schrijf de gevonden labels terug naar de bron (Cloudinary metadata, of bij --source minio de galerijdatabase)')
     parser.add_argument('--single-image', help='Verwerk alleen de opgegeven public_id')
     parser.add_argument('--limit', type=int, help='Limiteer het aantal te verwerken afbeeldingen per folder')
+    parser.add_argument('--source', choices=asset_source.SOURCES, default='cloudinary',
+                        help="'minio' leest de afbeeldingen uit de MinIO-bucket en schrijft de labels naar de galerijdatabase")
+    parser.add_argument('--db-path', default=DEFAULT_DB_PATH,
+                        help='SQLite-database van de galerij, voor --source minio (standaard DB_PATH of data/database.sqlite)')
+    parser.add_argument('--listing', choices=cloudinary_listing.LISTING_MODES, default='folders',
+                        help="'search' haalt de hele boom op met één Search API-expressie in plaats van map voor map")
+    parser.add_argument('--search-expression',
+                        help='Eigen Search API-expressie voor --listing search (standaard de folder en alle submappen)')
     parser.add_argument('--force-reprocess', action='store_true', help='Forceer het opnieuw verwerken van alle afbeeldingen')
+    parser.add_argument('--decode-mode', choices=DECODE_MODES, default='full',
+                        help="'reduced' stuurt eerst een verkleinde afbeelding en valt terug op 'full' als er geen label gevonden wordt")
+    parser.add_argument('--download-workers', type=int, default=image_fetcher.DEFAULT_WORKERS,
+                        help='Aantal gelijktijdige downloads')
+    parser.add_argument('--download-rate', type=float,
+                        help='Maximum aantal downloads per seconde per host (standaard onbeperkt)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Map voor de lokale afbeeldingscache')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_MB,
+                        help='Maximale grootte van de afbeeldingscache in MB')
+    parser.add_argument('--no-cache', action='store_true', help='Gebruik geen lokale afbeeldingscache')
+    parser.add_argument('--engine', choices=ENGINES, default='claude',
+                        help="'hybrid' leest eerst met lokale OCR en stuurt alleen onzekere afbeeldingen naar Claude")
+    parser.add_argument('--ocr-confidence', type=float, default=DEFAULT_OCR_CONFIDENCE,
+                        help='Minimale OCR-betrouwbaarheid (0-100) waarmee de hybride engine Claude overslaat')
+    parser.add_argument('--batch', action='store_true',
+                        help='Verstuur alle nieuwe afbeeldingen als één Message Batch en wacht op de resultaten '
+                             '(hervat een lopende batch als die er is)')
+    parser.add_argument('--batch-state', default=BATCH_STATE_FILE, help='Bestand voor de lopende batch')
+    parser.add_argument('--poll-interval', type=int, default=claude_client.DEFAULT_POLL_INTERVAL,
+                        help='Seconden tussen statuscontroles van de batch')
+    parser.add_argument('--api-base-url',
+                        help='Basis-URL van de Anthropic API, bijvoorbeeld een lokale mock (standaard ANTHROPIC_BASE_URL of api.anthropic.com)')
+    parser.add_argument('--write-workers', type=int, default=DEFAULT_WRITE_WORKERS,
+                        help='Maximum aantal gelijktijdige Cloudinary-aanroepen bij het bijwerken van de metadata')
+    parser.add_argument('--concurrency', type=int, default=claude_client.DEFAULT_CONCURRENCY,
+                        help='Aantal gelijktijdige Claude-requests')
+    parser.add_argument('--api-rate', type=float, default=claude_client.DEFAULT_RATE,
+                        help='Maximum aantal Claude-requests per seconde (wordt automatisch verlaagd bij 429/529)')
+    parser.add_argument('--max-retries', type=int, default=claude_client.DEFAULT_RETRIES,
+                        help='Aantal herhaalpogingen bij tijdelijke API-fouten (429, 5xx, verbindingsfouten)')
+    parser.add_argument('--max-long-edge', type=int, default=DEFAULT_MAX_LONG_EDGE,
+                        help='Verklein de afbeeldingen voor Claude tot deze lange zijde in pixels')
+    parser.add_argument('--token-budget', type=int,
+                        help='Verklein de afbeeldingen voor Claude verder tot ze naar schatting hoogstens zoveel input-tokens kosten')
+    parser.add_argument('--dedupe', choices=DEDUPE_MODES, default='off',
+                        help="Herken bijna-identieke foto's: 'candidate' gebruikt hun label als Claude niets vindt, "
+                             "'skip' neemt het label over zonder Claude")
+    parser.add_argument('--dedupe-hash', choices=perceptual_hash.HASH_METHODS, default=perceptual_hash.DEFAULT_HASH_METHOD,
+                        help='Perceptuele hash voor --dedupe')
+    parser.add_argument('--dedupe-distance', type=int, default=perceptual_hash.DEFAULT_MAX_DISTANCE,
+                        help='Maximale Hamming-afstand (van 64 bits) waarbij foto\'s als dezelfde gelden')
+    parser.add_argument('--pack', type=int, default=1,
+                        help='Aantal labels per Claude-request; onduidelijke antwoorden worden los opnieuw gevraagd')
+    parser.add_argument('--no-label-detection', action='store_true',
+                        help='Zoek het label niet, maar stuur altijd de bovenste 30%% van de afbeelding')
 
     args = parser.parse_args()
+    if args.pack > 1 and args.batch:
+        parser.error('--pack en --batch kunnen niet samen gebruikt worden')
+
+    global locate_label, engine, ocr_confidence_threshold, batch_requests, api_concurrency, pack_size, pack_requests
+    global max_long_edge, token_budget, dedupe_mode, dedupe_distance, hash_index, result_store
+    global image_source
+    max_long_edge = args.max_long_edge
+    token_budget = args.token_budget
+    dedupe_mode = args.dedupe
+    dedupe_distance = args.dedupe_distance
+    if dedupe_mode != 'off':
+        # De index staat naast het resultatenbestand
+        index_path = os.path.join(os.path.dirname(os.path.abspath(args.output)), HASH_INDEX_FILE)
+        hash_index = perceptual_hash.HashIndex(index_path, args.dedupe_hash)
+        print(f"Hash-index geladen: {len(hash_index)} afbeeldingen")
+    locate_label = not args.no_label_detection
+    engine = args.engine
+    ocr_confidence_threshold = args.ocr_confidence
+    api_concurrency = max(1, args.concurrency)
+    claude_client.configure(base_url=args.api_base_url, concurrency=api_concurrency, rate=args.api_rate,
+                            retries=args.max_retries)
+    local_ocr.configure_preprocessing(local_ocr.DEFAULT_PREPROCESS._replace(locate_label=locate_label))
+    if engine == 'hybrid' and not local_ocr.ocr_engine.tesseract_available():
+        print("Fout: Tesseract OCR niet gevonden, nodig voor --engine hybrid.")
+        sys.exit(1)
+
+    cache = None if args.no_cache else ImageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    image_source = asset_source.create_source(args.source, args.db_path, args.listing, args.search_expression)
+    image_fetcher.configure(max_workers=args.download_workers, per_host_rate=args.download_rate, cache=cache,
+                            handlers=image_source.handlers)
 
     print("Start extractie van labelnummers met Claude...")
 
     # Controleer en installeer ontbrekende packages
     check_required_packages()
 
-    setup_cloudinary()
+    if image_source.name == 'cloudinary':
+        setup_cloudinary()
+    else:
+        load_dotenv()
     api_key = check_anthropic_api_key()
 
-    # Laad eerdere resultaten indien niet geforceerd herverwerken
-    previous_results = {} if args.force_reprocess else load_previous_results(args.output)
+    result_store = ResultStore(args.store)
+    imported = result_store.import_json(args.output)
+    if imported:
+        print(f"{imported} resultaten uit {args.output} geïmporteerd in {args.store}")
 
-    # Verwerk afbeeldingen
-    if args.single_image:
-        # Verwerk een enkele afbeelding
-        try:
-            resource = cloudinary.api.resource(args.single_image)
-            results = [process_image(resource['secure_url'], resource['public_id'], api_key, previous_results)]
-        except Exception as e:
-            print(f"Fout bij ophalen van afbeelding {args.single_image}: {str(e)}")
-            results = []
+    # Maak eerst een lopende batch uit een eerdere run af
+    batch_state = load_batch_state(api_key, args.batch_state) if args.batch else None
+    if batch_state is not None:
+        results = batch_state.get('results', [])
+        print(f"Hervatten van batch {batch_state['batch_id']}")
     else:
-        # Verwerk alle folders
-        results = process_all_folders(args.folder, api_key, previous_results, args.limit)
+        # Laad eerdere resultaten indien niet geforceerd herverwerken
+        previous_results = {} if args.force_reprocess else load_previous_results(result_store)
+
+        if args.batch:
+            batch_requests = []
+        elif args.pack > 1:
+            pack_size = args.pack
+            pack_requests = []
+
+        # Verwerk afbeeldingen
+        if args.single_image:
+            # Verwerk een enkele afbeelding
+            try:
+                resource = image_source.get_resource(args.single_image, args.folder)
+                index_context([resource])
+                results = [store_result(process_image(resource['secure_url'], resource['public_id'], api_key,
+                                                      previous_results, args.decode_mode))]
+            except Exception as e:
+                print(f"Fout bij ophalen van afbeelding {args.single_image}: {str(e)}")
+                results = []
+        else:
+            # Verwerk alle folders
+            results = process_all_folders(args.folder, api_key, previous_results, args.limit, args.decode_mode)
+
+        if args.batch:
+            batch_state = submit_batch(results, api_key, args.batch_state)
 
-    # Sla resultaten op in een JSON-bestand
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+    if batch_state is not None:
+        results = collect_batch(results, api_key, batch_state, args.batch_state, args.poll_interval)
+    elif pack_requests:
+        results = resolve_packed(results, api_key)
+
+    # Exporteer alle laatste resultaten ook als JSON-bestand
+    result_store.export_json(args.output)
+
+    if hash_index is not None:
+        # Labels uit --pack en --batch komen pas na het samenvoegen binnen
+        for result in results:
+            index_result(result)
+        hash_index.save()
 
     print(f"Resultaten opgeslagen in {args.output}")
 
@@ -566,7 +1293,9 @@ def main():
     # Statistieken per bron
     from_cloudinary = sum(1 for r in results if r.get('source') == 'cloudinary_metadata')
     from_previous = sum(1 for r in results if r.get('source') == 'previous_run')
-    from_claude = sum(1 for r in results if r.get('source') == 'claude_api')
+    from_claude = sum(1 for r in results if r.get('source') in ('claude_api', 'claude_batch', 'claude_packed'))
+    from_ocr = sum(1 for r in results if r.get('source') == 'local_ocr')
+    from_duplicates = sum(1 for r in results if r.get('source') == 'duplicate')
 
     print(f"Totaal verwerkt: {total}")
     print(f"Succesvol geïdentificeerd: {successful}")
@@ -577,15 +1306,22 @@ def main():
     print(f"  - Uit Cloudinary metadata: {from_cloudinary}")
     print(f"  - Uit vorige resultaten: {from_previous}")
     print(f"  - Nieuw geanalyseerd door Claude: {from_claude}")
-
-    # Update Cloudinary metadata indien gewenst
+    print(f"  - Nieuw gelezen met lokale OCR: {from_ocr}")
+    print(f"  - Overgenomen van bijna-identieke foto's: {from_duplicates}")
+    route_stats.print_summary()
+    usage = claude_client.get_client(api_key).usage
+    if usage['requests']:
+        print(f"Claude: {usage['requests']} requests, {usage['input_tokens']} input- en "
+              f"{usage['output_tokens']} output-tokens")
+
+    # Update de metadata in de bron indien gewenst
     if args.update_cloudinary:
-        print("Bijwerken van Cloudinary metadata...")
-        update_cloudinary_metadata(results)
+        print(f"Bijwerken van de labels in {image_source.name}...")
+        update_cloudinary_metadata(results, args.write_workers)
     elif successful > 0 and not args.single_image:
-        answer = input("Wil je de metadata bijwerken in Cloudinary? (j/n): ").lower()
+        answer = input(f"Wil je de labels bijwerken in {image_source.name}? (j/n): ").lower()
         if answer == 'j':
-            update_cloudinary_metadata(results)
+            update_cloudinary_metadata(results, args.write_workers)
 
 if __name__ == "__main__":
     main()
@@ -7,6 +7,7 @@ Inclusief ondersteuning voor HEIC bestandsformaat.
 Vereisten:
 - Python 3.7+
 - pip install cloudinary pytesseract pillow requests numpy opencv-python-headless pyheif pillow-heif
+- Optioneel: pip install tesserocr (Tesseract via de C API, zonder apart proces per aanroep)
 - Tesseract OCR moet geïnstalleerd zijn op het systeem
   - Ubuntu/Debian: sudo apt-get install tesseract-ocr libheif-dev
   - macOS: brew install tesseract libheif
@@ -18,49 +19,117 @@ import re
 import io
 import sys
 import time
-import requests
 import cloudinary
 import cloudinary.api
 import cloudinary.uploader
 from PIL import Image, UnidentifiedImageError
 import numpy as np
 import cv2
-import pytesseract
 from pathlib import Path
 import argparse
 import logging
-
-# Configuratie logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("cloudinary_ocr.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import threading
+from urllib.parse import urlsplit
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from image_decoding import open_image, DECODE_MODES
+from image_cache import ImageCache, cache_key, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+from rate_limit import TokenBucket
+from result_store import ResultStore, DEFAULT_STORE_FILE, FINAL_SOURCES
+from metadata_writer import DEFAULT_WORKERS as DEFAULT_WRITE_WORKERS
+from gallery_db import DEFAULT_DB_PATH
+import image_fetcher
+import asset_source
+import cloudinary_listing
+import label_detector
+import ocr_engine
+
+# De logging wordt pas in main() ingesteld (configure_logging), zodat het
+# importeren van deze module door extract_labels_claude.py en de benchmarks
+# geen logbestand aanmaakt
 logger = logging.getLogger("cloudinary_ocr")
 
-# Probeer de HEIF/HEIC ondersteuning te laden
+# Deel van de afbeelding (vanaf onderkant) waarin het label gezocht wordt
+LABEL_CROP_PERCENTAGE = 0.15
+
+# Een OCR-kandidaat met minstens deze betrouwbaarheid wordt direct gekozen
+EARLY_EXIT_CONFIDENCE = 80
+
+# Standaard minimale betrouwbaarheid (0-100) om een nummer als caption te gebruiken
+DEFAULT_MIN_CONFIDENCE = 60
+
+# Minimale betrouwbaarheid van dit proces (zie --min-confidence)
+min_confidence = DEFAULT_MIN_CONFIDENCE
+
+# Hoofdmap van de schilderijen in Cloudinary
+PAINTINGS_FOLDER = "Tom van As Kunst"
+
+# Standaard maximum aantal Cloudinary API-aanroepen per seconde
+DEFAULT_API_RATE = 2.0
+
+# De captions worden tijdens de run weggeschreven zodra er zoveel klaarstaan (zie --flush-every)
+DEFAULT_FLUSH_EVERY = 50
+
+# Token bucket voor de Cloudinary API-aanroepen (zie --api-rate); downloads en
+# OCR worden hier niet door afgeremd
+cloudinary_rate_limiter = None
+
+# Resultatenopslag, gedeeld met extract_labels_claude.py (zie --store); None = niets opslaan
+result_store = None
+
+# Bron van de schilderijen en bestemming van de captions (zie --source)
+image_source = None
+
+def record_result(public_id, number, confidence=None, error=None):
+    """Schrijf het OCR-resultaat van een schilderij direct weg in de resultatenopslag."""
+    if result_store is None:
+        return
+    result = {"public_id": public_id, "label_number": number, "success": number is not None, "source": "local_ocr"}
+    if confidence is not None:
+        result["ocr_confidence"] = confidence
+    if error is not None:
+        result["error"] = error
+    result_store.record(result, 'tesseract', 'extract_numbers_and_update_captions')
+
+def throttle_cloudinary():
+    """Wacht tot er weer een Cloudinary API-aanroep gedaan mag worden."""
+    if cloudinary_rate_limiter is not None:
+        cloudinary_rate_limiter.acquire()
+
+# Probeer de HEIF/HEIC ondersteuning te laden (zie log_heif_support)
 try:
     import pyheif
     has_pyheif = True
-    logger.info("pyheif bibliotheek succesvol geladen voor HEIC ondersteuning")
 except ImportError:
     has_pyheif = False
-    logger.warning("pyheif bibliotheek niet gevonden. HEIC-bestanden worden mogelijk niet ondersteund.")
-    logger.warning("Installeer het met: pip install pyheif")
 
 try:
     from pillow_heif import register_heif_opener
     register_heif_opener()
     has_pillow_heif = True
-    logger.info("pillow_heif bibliotheek succesvol geladen voor HEIC ondersteuning")
 except ImportError:
     has_pillow_heif = False
-    if not has_pyheif:
-        logger.warning("pillow_heif bibliotheek niet gevonden. HEIC-bestanden worden mogelijk niet ondersteund.")
-        logger.warning("Installeer het met: pip install pillow-heif")
+
+def configure_logging():
+    """Log naar cloudinary_ocr.log en stdout; alleen voor het script zelf, niet bij importeren."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("cloudinary_ocr.log"),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+def log_heif_support():
+    """Meld welke HEIC-bibliotheek gebruikt wordt, of waarschuw als er geen is."""
+    if has_pillow_heif:
+        logger.info("pillow_heif bibliotheek succesvol geladen voor HEIC ondersteuning")
+    elif has_pyheif:
+        logger.info("pyheif bibliotheek succesvol geladen voor HEIC ondersteuning")
+    else:
+        logger.warning("Geen HEIC-bibliotheek gevonden. HEIC-bestanden worden mogelijk niet ondersteund.")
+        logger.warning("Installeer er een met: pip install pillow-heif (of pip install pyheif)")
 
 def setup_cloudinary():
     """Configureer Cloudinary met credentials uit omgevingsvariabelen of .env bestand."""
@@ -84,12 +153,14 @@ def setup_cloudinary():
 
     logger.info(f"Cloudinary geconfigureerd voor cloud: {cloudinary.config().cloud_name}")
 
-def read_heic_image(content):
+def read_heic_image(content, decode_mode='full'):
     """
     Leest HEIC afbeeldingsgegevens en converteert naar PIL Image.
 
     Args:
         content: Binaire inhoud van de HEIC afbeelding
+        decode_mode: 'full' of 'reduced' (zie image_decoding); pyheif kan
+            alleen volledig decoderen
 
     Returns:
         PIL Image object of None bij fout
@@ -97,9 +168,8 @@ def read_heic_image(content):
     # Probeer eerst pillow_heif als het beschikbaar is
     if has_pillow_heif:
         try:
-            logger.debug("HEIC afbeelding laden met pillow_heif")
-            with io.BytesIO(content) as f:
-                return Image.open(f)
+            logger.debug(f"HEIC afbeelding laden met pillow_heif ({decode_mode})")
+            return open_image(content, decode_mode)
         except Exception as e:
             logger.warning(f"Fout bij het laden van HEIC met pillow_heif: {e}")
 
@@ -123,24 +193,54 @@ def read_heic_image(content):
     logger.error("Kan HEIC afbeelding niet laden. Geen werkende HEIC bibliotheek gevonden.")
     return None
 
-def download_image(url):
+def fetch_image_content(url):
+    """
+    Download een afbeelding van een URL via de gedeelde fetcher.
+
+    Returns:
+        Tuple (content, content_type), of (None, None) bij fout
+    """
+    return unpack_fetch_result(image_fetcher.get_fetcher().fetch(url))
+
+def unpack_fetch_result(result):
+    """Log een FetchResult en geef (content, content_type) terug, of (None, None) bij fout."""
+    if result.error:
+        logger.error(f"Fout bij downloaden van afbeelding: {result.error}")
+        return None, None
+
+    # Debug informatie
+    logger.debug(f"Content-Type header: {result.content_type}")
+    logger.debug(f"Content lengte: {len(result.content)} bytes")
+    return result.content, result.content_type
+
+def download_image(url, decode_mode='full'):
     """Download een afbeelding van een URL en geef deze terug als een PIL Image object."""
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        content = response.content
+    content, content_type = fetch_image_content(url)
+    if content is None:
+        return None
+    return decode_image_content(content, url, content_type, decode_mode)
+
+def decode_image_content(content, url, content_type, decode_mode='full'):
+    """
+    Decodeer gedownloade afbeeldingsgegevens naar een PIL Image object.
 
-        # Debug informatie
-        content_type = response.headers.get('Content-Type', 'Niet beschikbaar')
-        logger.debug(f"Content-Type header: {content_type}")
-        logger.debug(f"Content lengte: {len(content)} bytes")
+    Args:
+        content: Binaire inhoud van de afbeelding
+        url: URL van de afbeelding (voor detectie op extensie)
+        content_type: Content-Type header van de download
+        decode_mode: 'full' of 'reduced' (zie image_decoding)
 
-        # Controleer of het een HEIC afbeelding is
-        is_heic = content_type.lower() in ['image/heic', 'image/heif'] or url.lower().endswith(('.heic', '.heif'))
+    Returns:
+        PIL Image object of None bij fout
+    """
+    try:
+        # Controleer of het een HEIC afbeelding is (op het pad: minio://-URL's hebben een ?etag= achter de extensie)
+        has_heic_extension = urlsplit(url).path.lower().endswith(('.heic', '.heif'))
+        is_heic = content_type.lower() in ['image/heic', 'image/heif'] or has_heic_extension
 
         if is_heic:
             logger.info("HEIC afbeeldingsformaat gedetecteerd")
-            image = read_heic_image(content)
+            image = read_heic_image(content, decode_mode)
             if image:
                 return image
             # Als het niet lukt met specifieke HEIC handlers, ga door naar algemene methoden
@@ -152,16 +252,16 @@ def download_image(url):
             image.verify()  # Dit sluit het bestand
 
             # Heropen na verify
-            image = Image.open(io.BytesIO(content))
+            image = open_image(content, decode_mode)
             logger.debug(f"Afbeelding succesvol geladen: {image.format} {image.size}")
             return image
         except UnidentifiedImageError as e:
             logger.error(f"Kan bestandsformaat niet identificeren: {e}")
 
             # Als het een HEIC is en we hebben het nog niet geprobeerd met de HEIC handlers
-            if not is_heic and (url.lower().endswith(('.heic', '.heif')) or b'ftypheic' in content[:100]):
+            if not is_heic and (has_heic_extension or b'ftypheic' in content[:100]):
                 logger.info("Probeer HEIC formaat te detecteren op basis van inhoud")
-                image = read_heic_image(content)
+                image = read_heic_image(content, decode_mode)
                 if image:
                     return image
 
@@ -195,21 +295,214 @@ def download_image(url):
             logger.error(f"Algemene fout bij openen afbeelding: {e}")
             return None
     except Exception as e:
-        logger.error(f"Fout bij downloaden van afbeelding: {e}")
+        logger.error(f"Fout bij decoderen van afbeelding: {e}")
         return None
 
-def preprocess_image_for_ocr(image, crop_percentage=0.15):
+def label_crop_cache_key(url, decode_mode):
+    """Cachesleutel voor het bijgesneden labelgebied van een afbeelding."""
+    region = 'label' if preprocess_config.locate_label else f"bottom{int(LABEL_CROP_PERCENTAGE * 100)}"
+    return f"{cache_key(url)}#ocr-{region}-{decode_mode}"
+
+def crop_label_region(image, crop_percentage=LABEL_CROP_PERCENTAGE):
+    """Snijd het onderste deel van de afbeelding bij, waar het label waarschijnlijk zit."""
+    width, height = image.size
+    crop_height = max(1, int(height * crop_percentage))  # Tenminste 1 pixel
+    return image.crop((0, height - crop_height, width, height))
+
+def locate_label_region(image):
+    """
+    Snijd het label uit met de labeldetector, of val terug op de vaste
+    uitsnede onderaan als er geen label gevonden wordt (of detectie uit staat).
+    """
+    if preprocess_config.locate_label:
+        crop = label_detector.crop_label(image)
+        if crop is not None:
+            logger.debug(f"Label gevonden: {crop.size[0]}x{crop.size[1]} van {image.size[0]}x{image.size[1]}")
+            return crop
+        logger.debug("Geen label gevonden, gebruik vaste uitsnede onderaan")
+    return crop_label_region(image)
+
+def recognize_label(url, decode_mode, content=None, content_type=None, crop_content=None, keep_crop=False):
+    """
+    Decodeer de afbeelding, snijd het labelgebied bij en lees het nummer.
+
+    Deze functie doet al het CPU-werk voor één afbeelding en draait in de
+    pipeline in een apart proces; ze gebruikt daarom geen cache of netwerk.
+
+    Args:
+        url: URL van de afbeelding (voor detectie op extensie)
+        decode_mode: 'full' of 'reduced' (zie image_decoding)
+        content, content_type: Gedownloade afbeelding
+        crop_content: PNG van een eerder bijgesneden labelgebied (in plaats van content)
+        keep_crop: Geef het nieuw bijgesneden labelgebied als PNG terug
+
+    Returns:
+        Tuple (nummer of None, betrouwbaarheid 0-100, True als gedecodeerd,
+        PNG van het labelgebied of None)
+    """
+    if crop_content is not None:
+        crop = Image.open(io.BytesIO(crop_content))
+        crop_png = None
+    else:
+        image = decode_image_content(content, url, content_type, decode_mode)
+        if image is None:
+            return None, 0.0, False, None
+        crop = locate_label_region(image)
+        crop_png = None
+        if keep_crop:
+            buffer = io.BytesIO()
+            crop.save(buffer, format='PNG')
+            crop_png = buffer.getvalue()
+
+    # Het labelgebied is al bijgesneden, dus de voorbewerking gebruikt het geheel
+    number, confidence = extract_number_from_image(crop, crop_percentage=1.0)
+    return number, confidence, True, crop_png
+
+def is_confident(image_id, number, confidence):
+    """
+    Geeft True als het nummer betrouwbaar genoeg is om als caption te gebruiken
+    (zie --min-confidence). image_id (public_id of URL) dient alleen voor de log.
+    """
+    if not number:
+        return False
+    if confidence < min_confidence:
+        logger.warning(f"Nummer {number} voor {image_id} verworpen: betrouwbaarheid {confidence:.0f} < {min_confidence:g}")
+        return False
+    return True
+
+def fallback_modes(decode_mode):
+    """Decodeermodi in volgorde van proberen: 'reduced' valt terug op 'full'."""
+    return [decode_mode] if decode_mode == 'full' else [decode_mode, 'full']
+
+def extract_number_with_fallback(url, decode_mode='full', fetched=None):
+    """
+    Extraheer het nummer uit het labelgebied, eerst in de gevraagde resolutie
+    en alleen als er niets (betrouwbaars) gevonden wordt opnieuw in volledige
+    resolutie. Nummers onder de minimale betrouwbaarheid tellen als niet gevonden.
+
+    Bijgesneden labelgebieden worden in de afbeeldingscache bewaard (indien
+    ingesteld), zodat een volgende run de afbeelding niet opnieuw hoeft te
+    downloaden en decoderen.
+
+    Args:
+        url: URL van de afbeelding
+        decode_mode: 'full' of 'reduced' (zie image_decoding)
+        fetched: Optioneel FetchResult van een eerdere download
+
+    Returns:
+        Tuple (nummer of None, OCR-betrouwbaarheid 0-100 of None als er niets gelezen is,
+        True als de afbeelding gedecodeerd kon worden)
+    """
+    fetcher = image_fetcher.get_fetcher()
+    cache = fetcher.cache
+    decoded = False
+    confidence = None
+
+    for mode in fallback_modes(decode_mode):
+        if mode != decode_mode:
+            logger.info("Geen nummer in gereduceerde afbeelding, opnieuw met volledige resolutie")
+
+        key = label_crop_cache_key(url, mode)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            logger.debug(f"Labelgebied uit cache: {key}")
+            number, confidence, ok, _ = recognize_label(url, mode, crop_content=cached.content)
+        else:
+            if fetched is None or fetched.url is None:
+                fetched = fetcher.fetch(url)
+            content, content_type = unpack_fetch_result(fetched)
+            if content is None:
+                return None, confidence, decoded
+            number, confidence, ok, crop_png = recognize_label(url, mode, content, content_type,
+                                                               keep_crop=cache is not None)
+            if crop_png is not None:
+                cache.put(key, crop_png, 'image/png')
+
+        if not ok:
+            return None, None, decoded
+        decoded = True
+        if is_confident(url, number, confidence):
+            return number, confidence, True
+
+    return None, confidence, decoded
+
+# Kernel voor dilatatie en erosie, gedeeld door alle aanroepen
+OCR_KERNEL = np.ones((1, 1), np.uint8)
+
+# CLAHE-object per proces en thread (de hybride Claude-engine draait OCR in meerdere
+# threads); cv2-objecten zijn niet te pickelen en worden daarom lui aangemaakt
+_clahe_local = threading.local()
+
+def get_clahe():
+    """Geef het CLAHE-object van deze thread terug."""
+    clahe = getattr(_clahe_local, 'clahe', None)
+    if clahe is None:
+        clahe = _clahe_local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe
+
+def denoise_downscaled_nlmeans(gray):
+    """Non-local means op halve resolutie: ongeveer vier keer minder werk."""
+    small = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+    small = cv2.fastNlMeansDenoising(small, None, 10, 7, 21)
+    return cv2.resize(small, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_LINEAR)
+
+# Beschikbare methodes voor de ruisonderdrukking, van langzaam naar snel
+DENOISE_METHODS = {
+    'nlmeans': lambda gray: cv2.fastNlMeansDenoising(gray, None, 10, 7, 21),
+    'downscale-nlmeans': denoise_downscaled_nlmeans,
+    'bilateral': lambda gray: cv2.bilateralFilter(gray, 5, 50, 50),
+    'median': lambda gray: cv2.medianBlur(gray, 3),
+    'none': lambda gray: gray,
+}
+
+# Instellingen voor de voorbewerking:
+# - denoise: een van DENOISE_METHODS
+# - skip_denoise_contrast: sla de ruisonderdrukking over als de standaardafwijking
+#   van de grijswaarden na CLAHE minstens deze waarde is (None = nooit overslaan)
+# - locate_label: zoek het label met label_detector in plaats van de vaste uitsnede
+PreprocessConfig = namedtuple('PreprocessConfig', ['denoise', 'skip_denoise_contrast', 'locate_label'],
+                              defaults=(None, True))
+DEFAULT_PREPROCESS = PreprocessConfig('nlmeans')
+
+# Voorbewerking van dit proces, in te stellen met configure_preprocessing
+preprocess_config = DEFAULT_PREPROCESS
+
+def configure_preprocessing(config):
+    """Stel de voorbewerking in voor dit proces."""
+    global preprocess_config
+    if config.denoise not in DENOISE_METHODS:
+        raise ValueError(f"Onbekende denoise methode: {config.denoise}")
+    preprocess_config = config
+
+def init_ocr_worker(config=DEFAULT_PREPROCESS):
+    """Initializer voor OCR-processen: Tesseract-engine en voorbewerking instellen."""
+    ocr_engine.init_worker()
+    configure_preprocessing(config)
+
+def record_timing(timings, stage, started):
+    """Tel de tijd sinds `started` op bij `stage` in timings (indien gegeven) en geef het huidige tijdstip terug."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - started)
+    return now
+
+def preprocess_image_for_ocr(image, crop_percentage=LABEL_CROP_PERCENTAGE, config=None, timings=None):
     """
     Voorbewerkt de afbeelding voor OCR door te focussen op het label gebied.
 
     Args:
         image: PIL Image object
         crop_percentage: Percentage van de afbeelding (vanaf onderkant) om te analyseren
+        config: PreprocessConfig, standaard die van dit proces
+        timings: Optionele dict waarin de tijd per stap (in seconden) wordt opgeteld
 
     Returns:
         Een voor OCR geoptimaliseerde numpy array afbeelding
     """
+    config = config or preprocess_config
     try:
+        started = time.perf_counter()
+
         # Controleer of afbeelding geldig is
         if image is None:
             logger.error("Ongeldige afbeelding voor voorverwerking")
@@ -254,22 +547,28 @@ def preprocess_image_for_ocr(image, crop_percentage=0.15):
             gray = cv2.cvtColor(cropped_img, cv2.COLOR_BGR2GRAY)
         else:
             gray = cropped_img
+        started = record_timing(timings, 'convert', started)
 
         # Verbeter het contrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
+        enhanced = get_clahe().apply(gray)
+        started = record_timing(timings, 'clahe', started)
 
-        # Ruis verminderen
-        denoised = cv2.fastNlMeansDenoising(enhanced, None, 10, 7, 21)
+        # Ruis verminderen, behalve als het contrast al hoog genoeg is
+        if config.skip_denoise_contrast is not None and float(enhanced.std()) >= config.skip_denoise_contrast:
+            denoised = enhanced
+        else:
+            denoised = DENOISE_METHODS[config.denoise](enhanced)
+        started = record_timing(timings, 'denoise', started)
 
         # Binarisatie met adaptieve drempelwaarde
         binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                       cv2.THRESH_BINARY_INV, 11, 2)
+        started = record_timing(timings, 'threshold', started)
 
         # Dilatatie en erosie om tekst te verbeteren
-        kernel = np.ones((1, 1), np.uint8)
-        dilated = cv2.dilate(binary, kernel, iterations=1)
-        eroded = cv2.erode(dilated, kernel, iterations=1)
+        dilated = cv2.dilate(binary, OCR_KERNEL, iterations=1)
+        eroded = cv2.erode(dilated, OCR_KERNEL, iterations=1)
+        record_timing(timings, 'morph', started)
 
         # Sla voorbewerkte afbeelding op voor debugging (optioneel)
         # cv2.imwrite("preprocessed.png", eroded)
@@ -279,173 +578,361 @@ def preprocess_image_for_ocr(image, crop_percentage=0.15):
         logger.error(f"Fout tijdens voorverwerking van afbeelding: {e}")
         return None
 
-def extract_number_from_image(image):
+def extract_number_from_image(image, crop_percentage=LABEL_CROP_PERCENTAGE):
     """
     Extraheert een nummer uit de afbeelding met OCR.
 
     Args:
         image: PIL Image object
+        crop_percentage: Deel van de afbeelding (vanaf onderkant) om te analyseren
 
     Returns:
-        Geëxtraheerd nummer als string, of None als er niets gevonden is
+        Tuple (nummer als string of None, betrouwbaarheid 0-100)
     """
     if image is None:
-        return None
+        return None, 0.0
 
     # Voorverwerk de afbeelding
-    processed_img = preprocess_image_for_ocr(image)
+    processed_img = preprocess_image_for_ocr(image, crop_percentage)
 
     if processed_img is None:
         logger.error("Voorverwerking van afbeelding mislukt")
+        return None, 0.0
+
+    return read_number_from_processed(processed_img)
+
+def tight_ink_crop(processed_img, padding=8):
+    """
+    Snijd een voorbewerkt labelgebied bij tot de inkt (de witte pixels na
+    binarisatie), of geef None als dat nauwelijks kleiner is dan het geheel.
+    """
+    points = cv2.findNonZero(processed_img)
+    if points is None:
         return None
+    x, y, w, h = cv2.boundingRect(points)
+    height, width = processed_img.shape[:2]
+    if w * h >= 0.9 * width * height:
+        return None
+    return processed_img[max(0, y - padding):min(height, y + h + padding),
+                         max(0, x - padding):min(width, x + w + padding)]
+
+def ocr_candidates(processed_img):
+    """
+    Geef de OCR-kandidaten (naam, afbeelding, psm, whitelist) in volgorde van
+    waarschijnlijkheid: eerst één regel cijfers, dan strakkere uitsneden,
+    andere segmentatie, gedraaide labels en tot slot vrije tekst.
+    """
+    digits = ocr_engine.DIGITS
+    yield 'regel', processed_img, 7, digits
+    tight = tight_ink_crop(processed_img)
+    if tight is not None:
+        yield 'inkt-regel', tight, 7, digits
+        yield 'inkt-woord', tight, 8, digits
+    yield 'blok', processed_img, 6, digits
+    for name, rotation in (('90', cv2.ROTATE_90_CLOCKWISE),
+                           ('270', cv2.ROTATE_90_COUNTERCLOCKWISE),
+                           ('180', cv2.ROTATE_180)):
+        yield f'rotatie-{name}', cv2.rotate(processed_img, rotation), 7, digits
+    yield 'vrij', processed_img, 3, None
+
+def read_number_from_processed(processed_img):
+    """
+    Lees het nummer uit een voorbewerkt labelgebied.
+
+    De kandidaten uit ocr_candidates worden op volgorde geprobeerd; zodra er
+    één minstens EARLY_EXIT_CONFIDENCE haalt worden de rest overgeslagen.
+    Anders wint de kandidaat met de hoogste betrouwbaarheid.
 
-    # OCR configuratie voor getallen
-    custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789'
+    Args:
+        processed_img: Uitvoer van preprocess_image_for_ocr
 
-    # OCR uitvoeren met pytesseract
+    Returns:
+        Tuple (nummer als string of None, betrouwbaarheid 0-100)
+    """
+    # OCR uitvoeren met de Tesseract-engine van dit proces
     try:
-        # Eerst probeer getallen te extraheren
-        text = pytesseract.image_to_string(processed_img, config=custom_config).strip()
+        engine = ocr_engine.get_engine()
+        best_number, best_confidence = None, 0.0
 
-        # Als dat niet werkt, probeer algemene tekst extractie
-        if not text:
-            text = pytesseract.image_to_string(processed_img).strip()
+        for name, candidate, psm, whitelist in ocr_candidates(processed_img):
+            text, confidence = engine.read_text(candidate, psm=psm, whitelist=whitelist)
 
-        # Zoek alleen naar nummers in de geëxtraheerde tekst
-        numbers = re.findall(r'\d+', text)
+            # Zoek alleen naar nummers in de geëxtraheerde tekst en neem het langste
+            numbers = re.findall(r'\d+', text)
+            if not numbers:
+                continue
+            number = max(numbers, key=len)
+            logger.debug(f"OCR kandidaat {name}: {number} (betrouwbaarheid {confidence:.0f})")
 
-        if numbers:
-            # Neem het langste gevonden nummer
-            return max(numbers, key=len)
-        else:
+            if best_number is None or confidence > best_confidence:
+                best_number, best_confidence = number, confidence
+            if confidence >= EARLY_EXIT_CONFIDENCE:
+                break
+
+        if best_number is None:
             logger.warning("Geen nummer gevonden in de OCR-tekst")
-            return None
+        return best_number, best_confidence
     except Exception as e:
         logger.error(f"OCR fout: {e}")
-        return None
+        return None, 0.0
 
 def get_all_paintings():
-    """Haalt alle schilderijen op uit de 'Tom van As Kunst' map in Cloudinary."""
-    try:
-        # Eerst alle submappen ophalen
-        folders_result = cloudinary.api.subfolders("Tom van As Kunst")
-        folders = folders_result.get('folders', [])
-
-        all_paintings = []
-
-        # Voor elke submap, haal de resources op
-        for folder in folders:
-            folder_path = folder['path']
-            logger.info(f"Resources ophalen uit map: {folder_path}")
+    """
+    Geeft alle schilderijen in de 'Tom van As Kunst' map van de bron (Cloudinary
+    of MinIO) en zijn submappen, pagina voor pagina zodra ze binnenkomen (zie asset_source).
+    """
+    return image_source.iter_resources(PAINTINGS_FOLDER)
 
-            try:
-                result = cloudinary.api.resources_by_asset_folder(
-                    folder_path,
-                    type="upload",
-                    max_results=500,
-                    context=True
-                )
+# Verzamelt de nieuwe captions; process_paintings schrijft ze aan het eind gebundeld weg
+metadata_writer = None
 
-                resources = result.get('resources', [])
-                logger.info(f"Aantal resources gevonden in {folder_path}: {len(resources)}")
+def apply_label(public_id, number, dry_run):
+    """Zet het gevonden nummer klaar als caption, of log alleen bij een dry run. Geeft True bij succes."""
+    logger.info(f"Gevonden nummer voor {public_id}: {number}")
+    if dry_run:
+        logger.info(f"DRY RUN: Zou caption bijwerken voor {public_id} naar: {number}")
+        return True
+    metadata_writer.add(public_id, {'caption': number})
+    return True
 
-                for resource in resources:
-                    all_paintings.append(resource)
-            except Exception as e:
-                logger.error(f"Fout bij ophalen van resources in map {folder_path}: {e}")
+class LabelPipeline:
+    """
+    Verwerkt schilderijen in drie overlappende stappen: downloaden (threads),
+    decoderen + voorbewerken + OCR (processen) en de caption bijwerken
+    (threads, afgeremd door de Cloudinary token bucket). De update-threads
+    zetten de caption klaar en schrijven de klaarstaande captions weg zodra
+    het er flush_every zijn (zie metadata_writer), zodat de OCR daar niet op
+    hoeft te wachten.
+
+    Er zijn nooit meer dan max_in_flight schilderijen tegelijk onderweg, zodat
+    het geheugengebruik begrensd blijft als de downloads voorlopen op de OCR.
+    """
 
-        logger.info(f"Totaal aantal schilderijen opgehaald: {len(all_paintings)}")
-        return all_paintings
+    def __init__(self, workers, io_threads, max_in_flight, decode_mode='full', dry_run=False):
+        self.decode_mode = decode_mode
+        self.dry_run = dry_run
+        self.fetcher = image_fetcher.get_fetcher()
+        self.cache = self.fetcher.cache
+        self.updated = 0
+        self.errors = 0
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+        self._downloads = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='download')
+        self._updates = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='update')
+        # Elke worker laadt bij het starten zijn eigen Tesseract-engine en voorbewerking
+        self._ocr = ProcessPoolExecutor(max_workers=workers, initializer=init_ocr_worker,
+                                        initargs=(preprocess_config,))
+
+    def submit(self, painting):
+        # Blokkeert zolang er max_in_flight schilderijen in verwerking zijn
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+        self._downloads.submit(self._download_stage, painting, self.decode_mode, None)
+
+    def join(self):
+        with self._idle:
+            while self._pending:
+                self._idle.wait()
+        self._downloads.shutdown()
+        self._updates.shutdown()
+        self._ocr.shutdown()
+
+    def _finish(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+        self._slots.release()
+
+    def _fail(self, public_id, error):
+        logger.error(f"Fout bij verwerken van {public_id}: {error}")
+        self._finish('errors')
+
+    def _download_stage(self, painting, mode, fetched):
+        public_id = painting.get('public_id')
+        url = painting.get('secure_url')
+        try:
+            key = label_crop_cache_key(url, mode)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                logger.debug(f"Labelgebied uit cache: {key}")
+                future = self._ocr.submit(recognize_label, url, mode, crop_content=cached.content)
+            else:
+                if fetched is None:
+                    logger.info(f"Downloaden van schilderij: {public_id}")
+                    fetched = self.fetcher.fetch(url)
+                content, content_type = unpack_fetch_result(fetched)
+                if content is None:
+                    logger.error(f"Kon afbeelding niet downloaden voor {public_id}")
+                    self._finish('errors')
+                    return
+                future = self._ocr.submit(recognize_label, url, mode, content, content_type,
+                                          keep_crop=self.cache is not None)
+            future.add_done_callback(lambda f: self._ocr_done(f, painting, mode, fetched))
+        except Exception as e:
+            self._fail(public_id, e)
 
-    except Exception as e:
-        logger.error(f"Fout bij ophalen van mappen of resources: {e}")
-        return []
+    def _ocr_done(self, future, painting, mode, fetched):
+        public_id = painting.get('public_id')
+        try:
+            number, confidence, decoded, crop_png = future.result()
+            if crop_png is not None:
+                self.cache.put(label_crop_cache_key(painting.get('secure_url'), mode), crop_png, 'image/png')
+
+            if not is_confident(public_id, number, confidence):
+                number = None
+
+            if decoded and not number and mode != 'full':
+                logger.info(f"Geen nummer in gereduceerde afbeelding van {public_id}, opnieuw met volledige resolutie")
+                self._downloads.submit(self._download_stage, painting, 'full', fetched)
+                return
+
+            if not decoded and mode == self.decode_mode:
+                logger.error(f"Kon afbeelding niet decoderen voor {public_id}")
+                record_result(public_id, None, error="Kon de afbeelding niet decoderen")
+                self._finish('errors')
+            elif not number:
+                logger.warning(f"Geen nummer gevonden voor {public_id}")
+                record_result(public_id, None, confidence)
+                self._finish('errors')
+            else:
+                record_result(public_id, number, confidence)
+                self._updates.submit(self._update_stage, public_id, number)
+        except Exception as e:
+            self._fail(public_id, e)
 
-def update_caption(public_id, caption):
-    """Update de caption (context) van een Cloudinary resource."""
-    try:
-        result = cloudinary.uploader.explicit(
-            public_id,
-            type="upload",
-            context=f"caption={caption}"
-        )
-        logger.info(f"Caption bijgewerkt voor {public_id}: {caption}")
-        return True
-    except Exception as e:
-        logger.error(f"Fout bij bijwerken caption voor {public_id}: {e}")
-        return False
+    def _update_stage(self, public_id, number):
+        try:
+            self._finish('updated' if apply_label(public_id, number, self.dry_run) else 'errors')
+        except Exception as e:
+            self._fail(public_id, e)
 
-def process_paintings(dry_run=False, force_update=False):
+def process_paintings(dry_run=False, force_update=False, decode_mode='full', workers=1, max_in_flight=None,
+                      write_workers=DEFAULT_WRITE_WORKERS, stored_labels=None, flush_every=DEFAULT_FLUSH_EVERY):
     """
     Verwerk alle schilderijen, haal nummers op en update captions.
 
     Args:
         dry_run: Als True, worden geen wijzigingen aangebracht in Cloudinary
         force_update: Als True, worden alle captions bijgewerkt, ook als ze al bestaan
+        decode_mode: 'reduced' om eerst op lagere resolutie te zoeken, 'full' voor volledige resolutie
+        workers: Aantal OCR-processen (1 = alles in dit proces, één schilderij tegelijk)
+        max_in_flight: Maximum aantal schilderijen tegelijk in de pipeline (standaard 2 x workers)
+        write_workers: Maximum aantal gelijktijdige Cloudinary-aanroepen bij het wegschrijven van de captions
+        stored_labels: Nummers uit de resultatenopslag (public_id -> nummer); die schilderijen krijgen
+            hun caption zonder opnieuw door OCR te gaan, zodat een afgebroken run hervat kan worden
+        flush_every: Schrijf de captions weg zodra er zoveel klaarstaan, in plaats van pas aan het eind
     """
-    paintings = get_all_paintings()
-
-    if not paintings:
-        logger.error("Geen schilderijen gevonden om te verwerken.")
-        return
+    global metadata_writer
+    # De huidige context van elk schilderij wordt bij binnenkomst bijgehouden,
+    # om captions die al kloppen niet opnieuw te schrijven
+    # Alleen met --force worden bestaande labels in de galerijdatabase overschreven
+    metadata_writer = image_source.writer({}, max_workers=write_workers, throttle=throttle_cloudinary,
+                                          flush_every=flush_every, overwrite=force_update)
 
-    logger.info(f"Start verwerking van {len(paintings)} schilderijen...")
-
-    processed_count = 0
     updated_count = 0
     error_count = 0
     skipped_count = 0
+    processed_count = 0
+    resumed_count = 0
+    stored_labels = stored_labels or {}
+
+    def paintings_to_process():
+        nonlocal skipped_count, processed_count, resumed_count, updated_count
+        for painting in get_all_paintings():
+            public_id = painting.get('public_id')
+            custom = (painting.get('context') or {}).get('custom', {})
+            metadata_writer.current[public_id] = custom
+
+            # Sla over als er al een caption is en force_update niet is ingeschakeld
+            current_caption = custom.get('caption')
+            if current_caption and not force_update:
+                logger.info(f"Overgeslagen {public_id}: heeft al caption '{current_caption}'")
+                skipped_count += 1
+                continue
+
+            # Een eerdere run vond het nummer al; alleen de caption moet nog geschreven worden
+            if public_id in stored_labels:
+                logger.info(f"Nummer voor {public_id} uit de resultatenopslag: {stored_labels[public_id]}")
+                resumed_count += 1
+                if apply_label(public_id, stored_labels[public_id], dry_run):
+                    updated_count += 1
+                continue
 
-    for painting in paintings:
-        public_id = painting.get('public_id')
-        current_caption = None
+            processed_count += 1
+            yield painting
 
-        # Controleer of er al een caption bestaat
-        if 'context' in painting and painting['context'] and 'custom' in painting['context']:
-            current_caption = painting['context']['custom'].get('caption')
+    logger.info("Start verwerking van de schilderijen...")
+    to_process = paintings_to_process()
 
-        # Sla over als er al een caption is en force_update niet is ingeschakeld
-        if current_caption and not force_update:
-            logger.info(f"Overgeslagen {public_id}: heeft al caption '{current_caption}'")
-            skipped_count += 1
-            continue
+    fetcher = image_fetcher.get_fetcher()
 
-        logger.info(f"Verwerken van schilderij: {public_id}")
+    if workers > 1:
+        pipeline = LabelPipeline(
+            workers=workers,
+            io_threads=fetcher.max_workers,
+            max_in_flight=max_in_flight or workers * 2,
+            decode_mode=decode_mode,
+            dry_run=dry_run,
+        )
+        for painting in to_process:
+            pipeline.submit(painting)
+        pipeline.join()
+        updated_count += pipeline.updated
+        error_count += pipeline.errors
+    else:
+        # Download de afbeeldingen gelijktijdig, de verwerking blijft in volgorde.
+        # Afbeeldingen waarvan het labelgebied al in de cache staat worden niet gedownload.
+        def url_to_fetch(painting):
+            url = painting.get('secure_url')
+            if fetcher.cache is not None and fetcher.cache.contains(label_crop_cache_key(url, decode_mode)):
+                return None
+            return url
 
-        # Download de afbeelding
-        image_url = painting.get('secure_url')
-        logger.info(f"Downloaden van afbeelding: {image_url}")
-        image = download_image(image_url)
+        for painting, fetched in fetcher.fetch_many(to_process, url_of=url_to_fetch):
+            public_id = painting.get('public_id')
+            image_url = painting.get('secure_url')
+            logger.info(f"Verwerken van schilderij: {public_id}")
+            logger.info(f"Gedownload: {image_url}")
 
-        if image:
             # Extraheer nummer met OCR
-            number = extract_number_from_image(image)
-
-            if number:
-                logger.info(f"Gevonden nummer voor {public_id}: {number}")
+            number, confidence, decoded = extract_number_with_fallback(image_url, decode_mode, fetched)
 
-                if dry_run:
-                    logger.info(f"DRY RUN: Zou caption bijwerken voor {public_id} naar: {number}")
-                    updated_count += 1
-                else:
-                    # Update caption in Cloudinary
-                    if update_caption(public_id, number):
+            if decoded:
+                record_result(public_id, number, confidence)
+                if number:
+                    if apply_label(public_id, number, dry_run):
                         updated_count += 1
                     else:
                         error_count += 1
+                else:
+                    logger.warning(f"Geen nummer gevonden voor {public_id}")
+                    error_count += 1
             else:
-                logger.warning(f"Geen nummer gevonden voor {public_id}")
+                logger.error(f"Kon afbeelding niet downloaden voor {public_id}")
+                record_result(public_id, None, error="Kon de afbeelding niet laden")
                 error_count += 1
-        else:
-            logger.error(f"Kon afbeelding niet downloaden voor {public_id}")
-            error_count += 1
 
-        processed_count += 1
+    if not processed_count and not skipped_count and not resumed_count:
+        logger.error("Geen schilderijen gevonden om te verwerken.")
+        return
 
-        # Wacht even om API rate limits te respecteren
-        time.sleep(0.5)
+    if not dry_run:
+        # De laatste captions; totals telt ook de tussentijds geschreven groepen mee
+        metadata_writer.flush()
+        stats = metadata_writer.totals
+        logger.info(f"Captions geschreven: {stats['written']}, al actueel: {stats['skipped']}, mislukt: {stats['failed']}")
+        updated_count -= stats['failed']
+        error_count += stats['failed']
 
-    logger.info(f"Verwerking voltooid. Totaal verwerkt: {processed_count}, Bijgewerkt: {updated_count}, Fouten: {error_count}, Overgeslagen: {skipped_count}")
+    logger.info(f"Verwerking voltooid. Totaal verwerkt: {processed_count}, Uit de resultatenopslag: {resumed_count}, "
+                f"Bijgewerkt: {updated_count}, Fouten: {error_count}, Overgeslagen: {skipped_count}")
 
 def main():
     """Hoofdfunctie voor het script."""
@@ -453,7 +940,63 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Voer een proefbewerking uit zonder wijzigingen aan te brengen")
     parser.add_argument("--force", action="store_true", help="Update alle captions, ook als ze al bestaan")
     parser.add_argument("--debug", action="store_true", help="Toon debug informatie")
+    parser.add_argument("--decode-mode", choices=DECODE_MODES, default="full",
+                        help="'reduced' decodeert eerst een verkleinde versie en valt terug op 'full' als er geen nummer gevonden wordt")
+    parser.add_argument("--download-workers", type=int, default=image_fetcher.DEFAULT_WORKERS,
+                        help="Aantal gelijktijdige downloads")
+    parser.add_argument("--download-rate", type=float,
+                        help="Maximum aantal downloads per seconde per host (standaard onbeperkt)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Map voor de lokale afbeeldingscache")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_MB,
+                        help="Maximale grootte van de afbeeldingscache in MB")
+    parser.add_argument("--no-cache", action="store_true", help="Gebruik geen lokale afbeeldingscache")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Aantal processen voor decoderen en OCR (1 = één schilderij tegelijk)")
+    parser.add_argument("--max-in-flight", type=int,
+                        help="Maximum aantal schilderijen tegelijk in verwerking (standaard 2 x workers)")
+    parser.add_argument("--api-rate", type=float, default=DEFAULT_API_RATE,
+                        help="Maximum aantal Cloudinary API-aanroepen per seconde")
+    parser.add_argument("--denoise", choices=sorted(DENOISE_METHODS), default=DEFAULT_PREPROCESS.denoise,
+                        help="Methode voor ruisonderdrukking in de voorbewerking")
+    parser.add_argument("--skip-denoise-contrast", type=float,
+                        help="Sla ruisonderdrukking over als het contrast (standaardafwijking na CLAHE) minstens deze waarde is")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help="Minimale OCR-betrouwbaarheid (0-100) om een nummer als caption te gebruiken")
+    parser.add_argument("--no-label-detection", action="store_true",
+                        help="Zoek het label niet, maar gebruik altijd de onderste 15%% van de afbeelding")
+    parser.add_argument("--source", choices=asset_source.SOURCES, default="cloudinary",
+                        help="'minio' leest de schilderijen uit de MinIO-bucket en schrijft de labels naar de galerijdatabase")
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH,
+                        help="SQLite-database van de galerij, voor --source minio (standaard DB_PATH of data/database.sqlite)")
+    parser.add_argument("--listing", choices=cloudinary_listing.LISTING_MODES, default="folders",
+                        help="'search' haalt alle schilderijen op met één Search API-expressie in plaats van map voor map")
+    parser.add_argument("--search-expression",
+                        help="Eigen Search API-expressie voor --listing search (standaard de map en alle submappen)")
+    parser.add_argument("--write-workers", type=int, default=DEFAULT_WRITE_WORKERS,
+                        help="Maximum aantal gelijktijdige Cloudinary-aanroepen bij het wegschrijven van de captions")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY,
+                        help="Schrijf de captions weg zodra er zoveel klaarstaan (0 = pas aan het eind)")
+    parser.add_argument("--store", default=DEFAULT_STORE_FILE,
+                        help="SQLite-bestand waarin elk resultaat direct wordt opgeslagen (gedeeld met extract_labels_claude.py)")
+    parser.add_argument("--no-store", action="store_true", help="Sla de resultaten niet op")
+    parser.add_argument("--force-reprocess", action="store_true",
+                        help="Lees ook schilderijen opnieuw met OCR waarvoor de resultatenopslag al een nummer heeft")
     args = parser.parse_args()
+    configure_logging()
+
+    configure_preprocessing(PreprocessConfig(args.denoise, args.skip_denoise_contrast, not args.no_label_detection))
+
+    global cloudinary_rate_limiter, min_confidence, result_store, image_source
+    cloudinary_rate_limiter = TokenBucket(args.api_rate)
+    min_confidence = args.min_confidence
+    result_store = None if args.no_store else ResultStore(args.store)
+
+    cache = None if args.no_cache else ImageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    image_source = asset_source.create_source(args.source, args.db_path, args.listing, args.search_expression,
+                                              throttle=throttle_cloudinary, log=logger.info)
+    image_fetcher.configure(max_workers=args.download_workers, per_host_rate=args.download_rate, cache=cache,
+                            handlers=image_source.handlers)
 
     # Stel debug niveau in als flag aanwezig is
     if args.debug:
@@ -461,19 +1004,29 @@ def main():
         logger.debug("Debug logging ingeschakeld")
 
     logger.info("Start OCR script voor handgeschreven nummers in schilderijen")
+    log_heif_support()
 
-    # Configureer Cloudinary
-    setup_cloudinary()
+    # Configureer Cloudinary (niet nodig als de afbeeldingen en labels uit MinIO en de galerijdatabase komen)
+    if image_source.name == 'cloudinary':
+        setup_cloudinary()
 
     # Controleer of Tesseract geïnstalleerd is
-    try:
-        pytesseract.get_tesseract_version()
-    except pytesseract.TesseractNotFoundError:
+    logger.info(f"OCR backend: {ocr_engine.get_engine().backend}")
+    if not ocr_engine.tesseract_available():
         logger.error("Tesseract OCR niet gevonden. Installeer Tesseract OCR op je systeem.")
         sys.exit(1)
 
     # Verwerk schilderijen
-    process_paintings(dry_run=args.dry_run, force_update=args.force)
+    # Hervat een afgebroken run: nummers die al in de opslag staan worden niet opnieuw gelezen,
+    # met dezelfde filter als extract_labels_claude.py (OCR-nummers alleen als ze zeker genoeg waren)
+    stored_labels = {}
+    if result_store is not None and not args.force_reprocess:
+        stored_labels = result_store.labels(sources=FINAL_SOURCES, min_ocr_confidence=min_confidence)
+    if stored_labels:
+        logger.info(f"{len(stored_labels)} nummers in de resultatenopslag {args.store}")
+    process_paintings(dry_run=args.dry_run, force_update=args.force, decode_mode=args.decode_mode,
+                      workers=args.workers, max_in_flight=args.max_in_flight, write_workers=args.write_workers,
+                      stored_labels=stored_labels, flush_every=args.flush_every)
 
     logger.info("Script voltooid")
 
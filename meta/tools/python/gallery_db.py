@@ -0,0 +1,170 @@
+"""
+Toegang tot de SQLite-database van de galerij (de tabel 'images' die de
+Nuxt-server leest via server/utils/databaseService.js).
+
+De labelscripts gebruiken dit om bij een MinIO-bron de bestaande labels op te
+halen en nieuwe labels direct in de database te zetten, in plaats van in de
+Cloudinary-context; sync_labels_to_gallery.py zet alle labels uit de
+resultatenopslag in één keer over.
+
+Labels worden eerst vergeleken met de bestaande rijen, zodat alleen
+gewijzigde rijen geschreven worden, en dan met één executemany in één
+transactie bijgewerkt. De database staat in WAL-modus: de Nuxt-server kan
+tijdens het schrijven gewoon blijven lezen.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+# Zelfde standaard als de Nuxt-server (DB_PATH, anders ./data/database.sqlite vanaf de projectmap)
+DEFAULT_DB_PATH = os.getenv('DB_PATH') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'data', 'database.sqlite')
+
+
+class GalleryDatabase:
+    """
+    De tabel 'images' van de galerij.
+
+    Args:
+        path: SQLite-bestand van de galerij
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Galerijdatabase niet gevonden: {path}")
+        self.path = path
+        self._lock = threading.Lock()
+        # isolation_level None: transacties worden hieronder expliciet gestart
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Wacht op een schrijfactie van de Nuxt-server in plaats van direct te falen
+        self._conn.execute('PRAGMA busy_timeout=5000')
+
+    def labels(self):
+        """Dictionary van publicId naar labelNumber (None als er nog geen label is)."""
+        with self._lock:
+            return dict(self._conn.execute('SELECT publicId, labelNumber FROM images').fetchall())
+
+    @staticmethod
+    def diff_labels(current, labels, overwrite=True):
+        """
+        Vergelijk nieuwe labels met de bestaande.
+
+        Args:
+            current: Dictionary van publicId naar het huidige labelNumber (zie labels())
+            labels: Dictionary van publicId naar het nieuwe labelnummer
+            overwrite: Bij False blijft een bestaand (niet-leeg) label altijd staan
+
+        Returns:
+            Tuple (dict met alleen de gewijzigde labels, aantal ongewijzigde, lijst met publicIds die niet bestaan,
+            dict van publicId naar het afwijkende nieuwe label dat niet geschreven is omdat er al een label stond)
+        """
+        changed, unchanged, missing, kept = {}, 0, [], {}
+        for public_id, label_number in labels.items():
+            if public_id not in current:
+                missing.append(public_id)
+            elif current[public_id] == str(label_number):
+                unchanged += 1
+            elif not overwrite and (current[public_id] or '').strip():
+                kept[public_id] = str(label_number)
+            else:
+                changed[public_id] = str(label_number)
+        return changed, unchanged, missing, kept
+
+    def update_labels(self, labels, dry_run=False, overwrite=True):
+        """
+        Zet de labelnummers van bestaande afbeeldingen.
+
+        Binnen één schrijftransactie worden de labels vergeleken met de
+        bestaande rijen en alleen de gewijzigde met één executemany
+        bijgewerkt.
+
+        Args:
+            labels: Dictionary van publicId naar labelnummer
+            dry_run: Alleen vergelijken, niets schrijven
+            overwrite: Bij False worden alleen rijen zonder labelNumber (NULL of leeg) gevuld
+
+        Returns:
+            Dict met 'updated' (de gewijzigde labels), 'unchanged' (aantal),
+            'missing' (publicIds die niet in de database staan), 'kept' (afwijkende
+            labels die niet geschreven zijn omdat er al een label stond) en 'lock_seconds'
+        """
+        with self._lock:
+            started = time.perf_counter()
+            # IMMEDIATE: neem de schrijflock vóór het vergelijken, zodat er tussendoor niets verandert
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                current = dict(self._conn.execute('SELECT publicId, labelNumber FROM images').fetchall())
+                changed, unchanged, missing, kept = self.diff_labels(current, labels, overwrite)
+                if changed and not dry_run:
+                    self._conn.executemany(
+                        'UPDATE images SET labelNumber = ?, updatedAt = CURRENT_TIMESTAMP WHERE publicId = ?',
+                        [(label_number, public_id) for public_id, label_number in changed.items()]
+                    )
+                self._conn.execute('ROLLBACK' if dry_run else 'COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            lock_seconds = time.perf_counter() - started
+        return {"updated": changed, "unchanged": unchanged, "missing": missing, "kept": kept,
+                "lock_seconds": lock_seconds}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GalleryLabelWriter:
+    """
+    Verzamelt labels en schrijft ze in één keer naar de galerijdatabase, met
+    dezelfde interface als metadata_writer.MetadataWriter (add, flush en totals).
+
+    Args:
+        database: GalleryDatabase om naar te schrijven
+        log: Functie voor voortgangsberichten, bijvoorbeeld print of logger.info
+        flush_every: Schrijf zodra er zoveel labels klaarstaan (standaard alleen bij flush())
+        overwrite: Overschrijf ook bestaande labels; standaard worden, net als in
+            sync_labels_to_gallery.py, alleen lege labelNumbers gevuld
+    """
+
+    def __init__(self, database, log=print, flush_every=None, overwrite=False):
+        self.database = database
+        self.log = log
+        self.flush_every = flush_every
+        self.overwrite = overwrite
+        self.totals = {"written": 0, "skipped": 0, "failed": 0}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, public_id, context):
+        """Zet een label klaar; context is een dict met 'label_number' en/of 'caption'."""
+        label_number = context.get('label_number', context.get('caption'))
+        with self._lock:
+            self._pending[public_id] = str(label_number)
+            due = self.flush_every and len(self._pending) >= self.flush_every
+        if due:
+            self.flush(final=False)
+
+    def flush(self, final=True):
+        """
+        Schrijf alle klaargezette labels (final doet hier niets: er is geen voortgangsbestand).
+
+        Returns:
+            Dict met het aantal 'written', 'skipped' (ook bestaande labels die
+            blijven staan) en 'failed' afbeeldingen
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        stats = self.database.update_labels(pending, overwrite=self.overwrite)
+        for public_id in stats['missing']:
+            self.log(f"Niet in de galerijdatabase: {public_id}")
+        for public_id, label_number in stats['kept'].items():
+            self.log(f"Bestaand label van {public_id} blijft staan (gevonden: {label_number})")
+        result = {"written": len(stats['updated']), "skipped": stats['unchanged'] + len(stats['kept']),
+                  "failed": len(stats['missing'])}
+        with self._lock:
+            for key, value in result.items():
+                self.totals[key] += value
+        return result
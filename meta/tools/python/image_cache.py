@@ -0,0 +1,140 @@
+"""
+Lokale, content-addressed cache voor afbeeldingen, gedeeld door de OCR- en
+Claude-labelscripts.
+
+Afbeeldingen worden opgeslagen onder de SHA-256 van hun inhoud; een kleine
+SQLite-index koppelt cachesleutels daaraan. Voor Cloudinary-URL's is de
+sleutel public_id + versie (het 'v1741632935' deel van secure_url), zodat een
+nieuwe upload automatisch een nieuwe sleutel krijgt. Naast de originele
+downloads kunnen ook afgeleide varianten (bijvoorbeeld een al bijgesneden
+labelgebied) bewaard worden onder '<sleutel>#<variant>'.
+
+De cache heeft een maximale grootte; bij overschrijding worden de minst
+recent gebruikte items verwijderd (LRU).
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+
+DEFAULT_CACHE_DIR = '.image_cache'
+DEFAULT_MAX_MB = 5000
+
+CachedImage = namedtuple('CachedImage', ['content', 'content_type'])
+
+# .../image/upload/[transformaties/]v1741632935/IMG_6839_y5xzqa.heic
+CLOUDINARY_URL_RE = re.compile(r'/upload/(?:(?P<transformation>.+?)/)?v(?P<version>\d+)/(?P<public_id>.+?)(?:\.\w+)?$')
+
+
+def cache_key(url):
+    """
+    Bepaal de cachesleutel voor een URL.
+
+    Cloudinary-URL's worden herleid tot public_id@vversie (plus eventuele
+    transformaties), andere URL's worden als geheel gebruikt.
+    """
+    match = CLOUDINARY_URL_RE.search(url)
+    if not match:
+        return url
+    key = f"{match.group('public_id')}@v{match.group('version')}"
+    if match.group('transformation'):
+        key += f"/{match.group('transformation')}"
+    return key
+
+
+class ImageCache:
+    """
+    Thread-safe afbeeldingscache op schijf met LRU-verwijdering.
+
+    Args:
+        cache_dir: Map voor de cache (wordt aangemaakt indien nodig)
+        max_bytes: Maximale totale grootte van de opgeslagen bestanden
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                content_type TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self._conn.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, 'blobs', digest[:2], digest)
+
+    def contains(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM entries WHERE key = ?', (key,)).fetchone()
+        return row is not None
+
+    def get(self, key):
+        """Geef een CachedImage terug, of None als de sleutel niet (meer) in de cache staat."""
+        with self._lock:
+            row = self._conn.execute('SELECT digest, content_type FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            digest, content_type = row
+            try:
+                with open(self._blob_path(digest), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                # Bestand is buiten de cache om verwijderd
+                self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+        return CachedImage(content, content_type)
+
+    def put(self, key, content, content_type=None):
+        """Sla inhoud op onder een sleutel en verwijder zo nodig oude items."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, digest, content_type, size, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, digest, content_type, len(content), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT key, digest, size FROM entries ORDER BY last_access').fetchall()
+        for key, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            still_used = self._conn.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+            if not still_used and os.path.exists(self._blob_path(digest)):
+                os.remove(self._blob_path(digest))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
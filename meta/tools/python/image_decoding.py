@@ -0,0 +1,65 @@
+"""
+Gedeelde hulpfuncties voor het decoderen van afbeeldingen (inclusief HEIC)
+voor de labeldetectie-scripts.
+
+Voor het lezen van een labelnummer is de volledige 12 MP foto meestal niet
+nodig. In de 'reduced' modus wordt daarom zo klein mogelijk gedecodeerd:
+
+- JPEG: via Image.draft, dat de DCT-schaling van libjpeg gebruikt en dus
+  echt minder pixels decodeert.
+- HEIC: via de embedded HEIF-thumbnail als die groot genoeg is (pillow-heif
+  ondersteunt Image.draft); anders volledig decoderen en direct verkleinen
+  met Image.reduce, zodat bijsnijden en OCR op minder pixels werken.
+
+De scripts vallen terug op 'full' als er in de gereduceerde afbeelding geen
+label gevonden wordt.
+"""
+
+import io
+from PIL import Image
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+# Beschikbare decodeermodi
+DECODE_MODES = ('reduced', 'full')
+
+# Doelbreedte in pixels voor de 'reduced' modus; ruim genoeg om een
+# handgeschreven nummer op een kaartje of stuk tape te lezen
+REDUCED_WIDTH = 1600
+
+
+def open_image(content, decode_mode='full', target_width=REDUCED_WIDTH):
+    """
+    Open afbeeldingsbytes als PIL Image in de gevraagde resolutie.
+
+    Args:
+        content: Binaire inhoud van de afbeelding (HEIC, JPEG, PNG, ...)
+        decode_mode: 'full' voor de volledige resolutie, 'reduced' voor
+            ongeveer target_width pixels breed
+        target_width: Gewenste breedte in de 'reduced' modus
+
+    Returns:
+        PIL Image object
+
+    Raises:
+        PIL.UnidentifiedImageError als het formaat niet herkend wordt
+    """
+    image = Image.open(io.BytesIO(content))
+    if decode_mode != 'reduced':
+        return image
+
+    width, height = image.size
+    if width <= target_width:
+        return image
+
+    # JPEG: DCT-schaling, HEIC: kleinste embedded thumbnail die groot genoeg is
+    image.draft('RGB', (target_width, max(1, height * target_width // width)))
+
+    factor = image.size[0] // target_width
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image
@@ -0,0 +1,165 @@
+"""
+Gedeelde downloadlaag voor de labeldetectie-scripts.
+
+Alle downloads lopen via één requests.Session met een connection pool, zodat
+verbindingen (en TLS-handshakes) hergebruikt worden. Mislukte downloads
+worden met exponentiële backoff opnieuw geprobeerd, per host kan een
+maximale snelheid ingesteld worden, en fetch_many downloadt meerdere
+afbeeldingen tegelijk terwijl de resultaten in de oorspronkelijke volgorde
+terugkomen. Met een ImageCache worden eerder gedownloade afbeeldingen van
+schijf gelezen in plaats van opnieuw opgehaald.
+
+URL's met een ander schema dan http(s), zoals minio://, worden doorgegeven aan
+een handler voor dat schema (zie asset_source).
+"""
+
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limit import TokenBucket
+from image_cache import cache_key
+
+# Resultaat van een download; content is None als de download mislukt is
+FetchResult = namedtuple('FetchResult', ['url', 'content', 'content_type', 'error'])
+
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30
+
+
+class ImageFetcher:
+    """
+    Downloadt afbeeldingen via een gedeelde, gepoolde HTTP-sessie.
+
+    Args:
+        max_workers: Aantal gelijktijdige downloads in fetch_many
+        retries: Aantal herhaalpogingen bij verbindingsfouten, 429 en 5xx
+        backoff: Backoff-factor in seconden (0.5 -> 0.5s, 1s, 2s, ...)
+        timeout: Timeout per request in seconden
+        per_host_rate: Optioneel maximum aantal requests per seconde per host
+        cache: Optionele ImageCache voor gedownloade afbeeldingen
+        handlers: Optioneel dict van URL-schema naar een functie die (content, content_type)
+            voor zo'n URL teruggeeft, bijvoorbeeld {'minio': MinioSource.fetch}
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 timeout=DEFAULT_TIMEOUT, per_host_rate=None, cache=None, handlers=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.per_host_rate = per_host_rate
+        self.cache = cache
+        self.handlers = handlers or {}
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._executor = None
+
+    def _throttle(self, url):
+        if not self.per_host_rate:
+            return
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.per_host_rate)
+        bucket.acquire()
+
+    def fetch(self, url):
+        """Download één URL. Geeft altijd een FetchResult terug, ook bij fouten."""
+        try:
+            if self.cache is not None:
+                cached = self.cache.get(cache_key(url))
+                if cached is not None:
+                    return FetchResult(url, cached.content, cached.content_type, None)
+
+            self._throttle(url)
+            handler = self.handlers.get(urlsplit(url).scheme)
+            if handler is not None:
+                content, content_type = handler(url)
+            else:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code != 200:
+                    return FetchResult(url, None, None, f"status code {response.status_code}")
+                content, content_type = response.content, response.headers.get('Content-Type', 'Niet beschikbaar')
+            if self.cache is not None:
+                self.cache.put(cache_key(url), content, content_type)
+            return FetchResult(url, content, content_type, None)
+        except Exception as e:
+            return FetchResult(url, None, None, str(e))
+
+    def fetch_many(self, items, url_of=lambda item: item):
+        """
+        Download de URL's van `items` gelijktijdig en geef (item, FetchResult)
+        terug in de volgorde van `items`.
+
+        Er staan nooit meer dan 2 x max_workers downloads tegelijk uit, zodat
+        het geheugengebruik begrensd blijft als de verwerking achterloopt.
+        Items waarvoor url_of None teruggeeft worden niet gedownload en komen
+        terug met een FetchResult zonder content en zonder fout.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch')
+
+        window = deque()
+        for item in items:
+            url = url_of(item)
+            if url is None:
+                future = Future()
+                future.set_result(FetchResult(None, None, None, None))
+            else:
+                future = self._executor.submit(self.fetch, url)
+            window.append((item, future))
+            if len(window) >= self.max_workers * 2:
+                item, future = window.popleft()
+                yield item, future.result()
+        while window:
+            item, future = window.popleft()
+            yield item, future.result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_default_fetcher = None
+
+
+def configure(**kwargs):
+    """Stel de gedeelde fetcher in (zie ImageFetcher voor de opties)."""
+    global _default_fetcher
+    if _default_fetcher is not None:
+        _default_fetcher.close()
+    _default_fetcher = ImageFetcher(**kwargs)
+    return _default_fetcher
+
+
+def get_fetcher():
+    """Geef de gedeelde fetcher terug, met standaardinstellingen als configure niet is aangeroepen."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = ImageFetcher()
+    return _default_fetcher
@@ -0,0 +1,170 @@
+"""
+Gebundeld terugschrijven van labels naar de context van Cloudinary-resources,
+gedeeld door de OCR- en Claude-labelscripts.
+
+add_context accepteert een lijst public_ids en zet dezelfde context op al die
+resources in één aanroep. De writer groepeert de updates daarom op hun
+waarden (foto's van hetzelfde schilderij krijgen hetzelfde nummer) en stuurt
+per groep één add_context, met een begrensd aantal aanroepen tegelijk. Alleen
+als zo'n aanroep faalt, wordt per resource teruggevallen op api.update.
+
+Updates waarvan de waarden al in Cloudinary staan (volgens de meegegeven
+huidige context) worden overgeslagen. Elke geslaagde aanroep wordt in een
+voortgangsbestand bijgeschreven, zodat een afgebroken sync bij de volgende
+run alleen de rest hoeft te doen; na een volledige sync wordt het bestand
+verwijderd. Met flush_every wordt al tijdens de run geschreven zodra er zoveel
+updates klaarstaan, zodat een crash hoogstens die laatste groep kost.
+"""
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.api
+import cloudinary.uploader
+
+DEFAULT_PROGRESS_FILE = 'metadata_sync_progress.jsonl'
+DEFAULT_WORKERS = 4
+
+# Maximum aantal public_ids per add_context-aanroep (limiet van de Cloudinary API)
+MAX_IDS_PER_CALL = 1000
+
+
+class MetadataWriter:
+    """
+    Verzamelt context-updates en schrijft ze gebundeld naar Cloudinary.
+
+    Args:
+        current: Optioneel dict van public_id naar de huidige custom context,
+            om updates zonder effect over te slaan
+        progress_file: JSONL-bestand met de al geschreven updates
+        max_workers: Maximum aantal gelijktijdige API-aanroepen
+        throttle: Optionele functie die vóór elke API-aanroep wordt aangeroepen (rate limiting)
+        log: Functie voor voortgangsberichten, bijvoorbeeld print of logger.info
+        flush_every: Schrijf zodra er zoveel updates klaarstaan (standaard alleen bij flush())
+    """
+
+    def __init__(self, current=None, progress_file=DEFAULT_PROGRESS_FILE, max_workers=DEFAULT_WORKERS,
+                 throttle=None, log=print, flush_every=None):
+        self.current = current if current is not None else {}
+        self.progress_file = progress_file
+        self.max_workers = max_workers
+        self.throttle = throttle
+        self.log = log
+        self.flush_every = flush_every
+        # Opgeteld over alle flushes, ook de tussentijdse
+        self.totals = {"written": 0, "skipped": 0, "failed": 0}
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._done = {}
+        if progress_file and os.path.exists(progress_file):
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        for public_id in entry['public_ids']:
+                            self._done[public_id] = entry['context']
+
+    def add(self, public_id, context):
+        """
+        Zet een update klaar; context is een dict zoals {'label_number': '12', 'caption': '12'}.
+        Staan er daarmee flush_every updates klaar, dan worden ze direct geschreven.
+        """
+        context = {key: str(value) for key, value in context.items()}
+        with self._lock:
+            self._pending[public_id] = context
+            due = self.flush_every and len(self._pending) >= self.flush_every
+        if due:
+            self.flush(final=False)
+
+    def _is_noop(self, public_id, context):
+        # De huidige context gaat voor: het voortgangsbestand zegt alleen wat een eerdere run
+        # schreef, en telt dus alleen als de huidige context van de resource onbekend is
+        stored = self.current.get(public_id)
+        if stored is None:
+            stored = self._done.get(public_id)
+        return bool(stored) and all(stored.get(key) == value for key, value in context.items())
+
+    def _call(self, function, *args, **kwargs):
+        if self.throttle is not None:
+            self.throttle()
+        return function(*args, **kwargs)
+
+    def _record_progress(self, public_ids, context):
+        if not self.progress_file:
+            return
+        with self._progress_lock:
+            with open(self.progress_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"public_ids": public_ids, "context": context}) + '\n')
+
+    def _write_group(self, public_ids, context):
+        """Schrijf één groep met add_context; geeft de public_ids terug die mislukt zijn."""
+        try:
+            self._call(cloudinary.uploader.add_context, context, public_ids)
+        except Exception as e:
+            self.log(f"add_context mislukt voor {len(public_ids)} resources ({e}), per resource opnieuw")
+            return public_ids
+        self._record_progress(public_ids, context)
+        return []
+
+    def _write_single(self, public_id, context):
+        try:
+            self._call(cloudinary.api.update, public_id, context=context)
+        except Exception as e:
+            self.log(f"Fout bij bijwerken metadata voor {public_id}: {e}")
+            return False
+        self._record_progress([public_id], context)
+        return True
+
+    def flush(self, final=True):
+        """
+        Schrijf alle klaargezette updates.
+
+        Args:
+            final: Laatste flush van de run; alleen dan wordt het voortgangsbestand
+                verwijderd (na een tussentijdse flush is het nog nodig om een
+                afgebroken run, ook een eerdere, te hervatten)
+
+        Returns:
+            Dict met het aantal 'written', 'skipped' en 'failed' resources
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        groups = {}
+        skipped = 0
+        for public_id, context in pending.items():
+            if self._is_noop(public_id, context):
+                skipped += 1
+                continue
+            groups.setdefault(tuple(sorted(context.items())), []).append(public_id)
+
+        calls = []
+        for items, public_ids in groups.items():
+            for start in range(0, len(public_ids), MAX_IDS_PER_CALL):
+                calls.append((public_ids[start:start + MAX_IDS_PER_CALL], dict(items)))
+        to_write = sum(len(public_ids) for public_ids, _ in calls)
+        self.log(f"Metadata schrijven: {to_write} resources in {len(calls)} aanroepen, {skipped} al actueel")
+
+        failed = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            group_failures = executor.map(lambda call: self._write_group(*call), calls)
+            retries = [(public_id, context) for (_, context), public_ids in zip(calls, group_failures)
+                       for public_id in public_ids]
+            for (public_id, _), ok in zip(retries, executor.map(lambda retry: self._write_single(*retry), retries)):
+                if not ok:
+                    failed.add(public_id)
+
+        for public_id, context in pending.items():
+            if public_id not in failed:
+                self.current.setdefault(public_id, {}).update(context)
+        if final and not failed and self.progress_file and os.path.exists(self.progress_file):
+            os.remove(self.progress_file)
+        stats = {"written": to_write - len(failed), "skipped": skipped, "failed": len(failed)}
+        with self._lock:
+            for key, value in stats.items():
+                self.totals[key] += value
+        return stats
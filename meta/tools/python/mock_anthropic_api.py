@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Lokale mock van de Anthropic API om de Claude-labelscripts zonder kosten te
+testen, met /v1/messages en de Message Batches API.
+
+Het 'labelnummer' in een antwoord wordt afgeleid van een hash van de
+meegestuurde afbeelding, zodat dezelfde afbeelding altijd hetzelfde nummer
+oplevert. Een batch is na --batch-delay seconden klaar.
+
+Met --requests-per-minute stuurt de mock anthropic-ratelimit-* headers mee en
+antwoordt hij met 429 en retry-after zodra de limiet bereikt is; met
+--overload-rate geeft een deel van de berichten een 529 (overloaded), om de
+retry- en rate-limitlogica van claude_client te testen.
+
+Een request met meerdere afbeeldingen (--pack in extract_labels_claude.py)
+krijgt een JSON-object van volgnummer naar nummer terug; met --unclear-rate
+wordt een deel van die nummers onleesbaar beantwoord, zodat de scripts ze los
+opnieuw moeten vragen.
+
+Met --drop-batch-responses wordt een batch wel aangemaakt maar zonder antwoord
+verbroken, om te testen dat de scripts hem terugvinden in plaats van een
+tweede batch te versturen.
+
+Gebruik:
+    python mock_anthropic_api.py --port 8080
+    python extract_labels_claude.py --api-base-url http://127.0.0.1:8080 --batch --poll-interval 1
+"""
+
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockState:
+    def __init__(self, batch_delay, no_label_rate, requests_per_minute=None, overload_rate=0.0, unclear_rate=0.0,
+                 dropped_batch_responses=0):
+        self.batch_delay = batch_delay
+        self.dropped_batch_responses = dropped_batch_responses
+        self.no_label_rate = no_label_rate
+        self.unclear_rate = unclear_rate
+        self.requests_per_minute = requests_per_minute
+        self.overload_rate = overload_rate
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.window_count = 0
+
+    def take_request(self):
+        """
+        Tel een request mee in het huidige venster van een minuut.
+
+        Returns:
+            Tuple (toegestaan, resterend, reset-tijdstip als epoch)
+        """
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= 60:
+                self.window_start, self.window_count = now, 0
+            reset = self.window_start + 60
+            if self.requests_per_minute is None:
+                return True, None, reset
+            if self.window_count >= self.requests_per_minute:
+                return False, 0, reset
+            self.window_count += 1
+            return True, self.requests_per_minute - self.window_count, reset
+
+
+def image_blocks(params):
+    for message in params.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, list):
+            for block in content:
+                if block.get('type') == 'image':
+                    yield block['source']['data']
+
+
+def label_for(data, state):
+    """Het vaste 'labelnummer' van een afbeelding, of None voor 'geen label'."""
+    digest = hashlib.sha256(data.encode('ascii')).digest()
+    if random.Random(digest).random() < state.no_label_rate:
+        return None
+    return str(100 + int.from_bytes(digest[:4], 'big') % 900)
+
+
+def answer(params, state):
+    """Bouw een /v1/messages-antwoord voor de gegeven request body."""
+    images = list(image_blocks(params))
+    if len(images) == 1:
+        text = label_for(images[0], state) or 'Geen label gevonden'
+    else:
+        mapping = {}
+        for i, data in enumerate(images, 1):
+            mapping[str(i)] = 'onleesbaar' if random.random() < state.unclear_rate else label_for(data, state)
+        text = json.dumps(mapping)
+
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get('model'),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {
+            # Grove schatting: afbeeldingen tellen naar hun base64-grootte
+            "input_tokens": len(json.dumps(params)) // 4,
+            "output_tokens": len(text) // 3 + 1,
+        },
+    }
+
+
+def batch_object(batch, host):
+    ended = time.time() - batch['created'] >= batch['delay']
+    total = len(batch['requests'])
+    return {
+        "id": batch['id'],
+        "type": "message_batch",
+        "processing_status": "ended" if ended else "in_progress",
+        "created_at": datetime.fromtimestamp(batch['created'], timezone.utc).isoformat().replace('+00:00', 'Z'),
+        "request_counts": {
+            "processing": 0 if ended else total,
+            "succeeded": total if ended else 0,
+            "errored": 0,
+            "canceled": 0,
+            "expired": 0,
+        },
+        "results_url": f"http://{host}/v1/messages/batches/{batch['id']}/results" if ended else None,
+    }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_message(self):
+            params = self._read_json()
+            allowed, remaining, reset = state.take_request()
+            headers = {}
+            if state.requests_per_minute is not None:
+                headers = {
+                    'anthropic-ratelimit-requests-limit': str(state.requests_per_minute),
+                    'anthropic-ratelimit-requests-remaining': str(remaining),
+                    'anthropic-ratelimit-requests-reset':
+                        datetime.fromtimestamp(reset, timezone.utc).isoformat().replace('+00:00', 'Z'),
+                }
+            if not allowed:
+                headers['retry-after'] = str(max(1, int(reset - time.time() + 0.999)))
+                self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error",
+                                                                  "message": "Rate limit bereikt"}}, headers)
+            elif random.random() < state.overload_rate:
+                self._send_json(529, {"type": "error", "error": {"type": "overloaded_error",
+                                                                  "message": "Overloaded"}})
+            else:
+                self._send_json(200, answer(params, state), headers)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _authorized(self):
+            if not self.headers.get('x-api-key'):
+                self._send_json(401, {"type": "error", "error": {"type": "authentication_error",
+                                                                  "message": "x-api-key ontbreekt"}})
+                return False
+            return True
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if self.path == '/v1/messages':
+                self._send_message()
+            elif self.path == '/v1/messages/batches':
+                body = self._read_json()
+                batch = {
+                    'id': f"msgbatch_{uuid.uuid4().hex[:24]}",
+                    'created': time.time(),
+                    'delay': state.batch_delay,
+                    'requests': body.get('requests', []),
+                }
+                with state.lock:
+                    state.batches[batch['id']] = batch
+                    drop = state.dropped_batch_responses > 0
+                    state.dropped_batch_responses -= drop
+                if drop:
+                    # De batch bestaat, maar de client krijgt geen antwoord (zoals bij een time-out)
+                    self.close_connection = True
+                    return
+                self._send_json(200, batch_object(batch, self.headers.get('Host')))
+            else:
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            parts = urlsplit(self.path).path.strip('/').split('/')
+            if parts == ['v1', 'messages', 'batches']:
+                # Lijst van batches, nieuwste eerst (zonder paginering)
+                with state.lock:
+                    batches = sorted(state.batches.values(), key=lambda b: b['created'], reverse=True)
+                limit = int(parse_qs(urlsplit(self.path).query).get('limit', ['20'])[0])
+                data = [batch_object(b, self.headers.get('Host')) for b in batches[:limit]]
+                self._send_json(200, {"data": data, "has_more": len(batches) > limit,
+                                      "first_id": data[0]['id'] if data else None,
+                                      "last_id": data[-1]['id'] if data else None})
+                return
+
+            batch = None
+            if len(parts) >= 4 and parts[:3] == ['v1', 'messages', 'batches']:
+                with state.lock:
+                    batch = state.batches.get(parts[3])
+            if batch is None:
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                return
+
+            if len(parts) == 4:
+                self._send_json(200, batch_object(batch, self.headers.get('Host')))
+                return
+
+            lines = [
+                json.dumps({
+                    "custom_id": request['custom_id'],
+                    "result": {"type": "succeeded", "message": answer(request['params'], state)},
+                })
+                for request in batch['requests']
+            ]
+            payload = ('\n'.join(lines) + '\n').encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/binary')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lokale mock van de Anthropic API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--batch-delay', type=float, default=3.0, help='Seconden tot een batch klaar is')
+    parser.add_argument('--no-label-rate', type=float, default=0.1,
+                        help="Fractie van de afbeeldingen waarvoor 'Geen label gevonden' wordt geantwoord")
+    parser.add_argument('--requests-per-minute', type=int,
+                        help='Stuur rate-limit headers mee en antwoord met 429 boven dit aantal berichten per minuut')
+    parser.add_argument('--overload-rate', type=float, default=0.0,
+                        help='Fractie van de berichten die met 529 (overloaded) beantwoord wordt')
+    parser.add_argument('--unclear-rate', type=float, default=0.0,
+                        help='Fractie van de labels in een request met meerdere afbeeldingen die onleesbaar beantwoord wordt')
+    parser.add_argument('--drop-batch-responses', type=int, default=0,
+                        help='Maak de eerste N batches wel aan, maar verbreek de verbinding zonder antwoord')
+    args = parser.parse_args()
+
+    state = MockState(args.batch_delay, args.no_label_rate, args.requests_per_minute, args.overload_rate,
+                      args.unclear_rate, args.drop_batch_responses)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Mock Anthropic API op http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+OCR-laag voor de labeldetectie, met één Tesseract-instantie per proces (of
+per thread, als meerdere threads OCR doen).
+
+Als tesserocr geïnstalleerd is wordt Tesseract via de C API aangesproken: het
+taalmodel wordt één keer per proces geladen en elke aanroep werkt direct op
+de afbeelding in het geheugen. Zonder tesserocr valt de engine terug op
+pytesseract, dat per aanroep een tesseract-proces start en tijdelijke
+bestanden schrijft.
+
+In een ProcessPoolExecutor geef je init_worker mee als initializer, zodat
+elke worker zijn engine al klaar heeft voordat het eerste werk binnenkomt.
+"""
+
+import threading
+
+import numpy as np
+from PIL import Image
+
+try:
+    import tesserocr
+    has_tesserocr = True
+except ImportError:
+    has_tesserocr = False
+
+import pytesseract
+
+DIGITS = '0123456789'
+DEFAULT_LANG = 'eng'
+
+
+class TesseractEngine:
+    """
+    Herbruikbare Tesseract-engine.
+
+    Per page segmentation mode (psm) wordt één tesserocr-API aangemaakt en
+    bewaard; instellen van een whitelist gebeurt per aanroep.
+    """
+
+    def __init__(self, lang=DEFAULT_LANG, backend=None):
+        self.lang = lang
+        self.backend = backend or ('tesserocr' if has_tesserocr else 'pytesseract')
+        self._apis = {}
+
+    def _api(self, psm):
+        api = self._apis.get(psm)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=psm, oem=tesserocr.OEM.DEFAULT)
+            self._apis[psm] = api
+        return api
+
+    def _prepare(self, image, psm, whitelist):
+        """Zet de afbeelding klaar in de tesserocr-API voor deze psm en geef de API terug."""
+        api = self._api(psm)
+        api.SetVariable('tessedit_char_whitelist', whitelist or '')
+        api.SetImage(image if isinstance(image, Image.Image) else Image.fromarray(np.asarray(image)))
+        return api
+
+    @staticmethod
+    def _config(psm, whitelist):
+        config = f'--oem 3 --psm {psm}'
+        if whitelist:
+            config += f' -c tessedit_char_whitelist={whitelist}'
+        return config
+
+    def image_to_string(self, image, psm=3, whitelist=None):
+        """
+        Lees tekst uit een afbeelding.
+
+        Args:
+            image: PIL Image of numpy array (grijswaarden of binair)
+            psm: Tesseract page segmentation mode (3 = automatisch, 7 = één regel)
+            whitelist: Optioneel de toegestane tekens, bijvoorbeeld DIGITS
+
+        Returns:
+            Herkende tekst
+        """
+        if self.backend == 'tesserocr':
+            return self._prepare(image, psm, whitelist).GetUTF8Text()
+        return pytesseract.image_to_string(image, config=self._config(psm, whitelist))
+
+    def read_text(self, image, psm=3, whitelist=None):
+        """
+        Lees tekst met de gemiddelde woordbetrouwbaarheid van Tesseract
+        (argumenten als bij image_to_string).
+
+        Returns:
+            Tuple (tekst, betrouwbaarheid 0-100); 0 als er geen woorden herkend zijn
+        """
+        if self.backend == 'tesserocr':
+            api = self._prepare(image, psm, whitelist)
+            text = api.GetUTF8Text()
+            confidences = api.AllWordConfidences()
+        else:
+            data = pytesseract.image_to_data(image, config=self._config(psm, whitelist),
+                                             output_type=pytesseract.Output.DICT)
+            words = [(word, float(conf)) for word, conf in zip(data['text'], data['conf'])
+                     if word.strip() and float(conf) >= 0]
+            text = ' '.join(word for word, _ in words)
+            confidences = [conf for _, conf in words]
+
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, confidence
+
+    def close(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis = {}
+
+
+# Eén engine per thread: een tesserocr-API mag niet door meerdere threads tegelijk gebruikt worden
+_local = threading.local()
+_engine_args = (DEFAULT_LANG, None)
+
+
+def init_worker(lang=DEFAULT_LANG, backend=None):
+    """Initializer voor worker-processen: maak de engine van dit proces aan."""
+    global _engine_args
+    _engine_args = (lang, backend)
+    _local.engine = TesseractEngine(lang, backend)
+
+
+def get_engine():
+    """Geef de engine van deze thread terug en maak hem zo nodig aan."""
+    engine = getattr(_local, 'engine', None)
+    if engine is None:
+        engine = _local.engine = TesseractEngine(*_engine_args)
+    return engine
+
+
+def tesseract_available():
+    """Controleer of de gekozen backend Tesseract kan vinden."""
+    if get_engine().backend == 'tesserocr':
+        return True
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except pytesseract.TesseractNotFoundError:
+        return False
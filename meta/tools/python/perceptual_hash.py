@@ -0,0 +1,218 @@
+"""
+Perceptuele hashes en een index om bijna-identieke foto's te herkennen.
+
+Van hetzelfde schilderij zijn vaak meerdere foto's kort na elkaar gemaakt
+(opeenvolgende IMG_68xx-bestanden). Een perceptuele hash (pHash of dHash) van
+de verkleinde afbeelding verandert nauwelijks tussen zulke foto's, zodat een
+kleine Hamming-afstand tussen twee hashes betekent dat het (vrijwel) dezelfde
+foto is. De HashIndex bewaart de hashes van gelabelde afbeeldingen in een
+BK-tree, zodat het zoeken naar buren binnen een afstand ook bij tienduizenden
+foto's maar een klein deel van de index bekijkt.
+"""
+
+import os
+import json
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+HASH_METHODS = ('phash', 'dhash')
+DEFAULT_HASH_METHOD = 'phash'
+
+# Maximale Hamming-afstand (van 64 bits) waarbij twee foto's als dezelfde gelden
+DEFAULT_MAX_DISTANCE = 6
+
+# De index wordt na zoveel nieuwe afbeeldingen weggeschreven, zodat een
+# afgebroken run niet alle hashes kwijt is
+DEFAULT_SAVE_EVERY = 25
+
+
+def phash(image):
+    """
+    pHash: de laagste 8x8 frequenties van de DCT van een 32x32 grijswaardenversie,
+    vergeleken met hun mediaan.
+
+    Returns:
+        64-bits hash als int
+    """
+    small = image.convert('L').resize((32, 32), Image.BOX, reducing_gap=3.0)
+    dct = cv2.dct(np.asarray(small, dtype=np.float32))[:8, :8]
+    # De DC-component zegt alleen iets over de helderheid en telt niet mee voor de mediaan
+    bits = (dct > np.median(dct.flatten()[1:])).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def dhash(image):
+    """
+    dHash: per rij van een 9x8 grijswaardenversie of elke pixel lichter is dan
+    zijn rechterbuur.
+
+    Returns:
+        64-bits hash als int
+    """
+    small = np.asarray(image.convert('L').resize((9, 8), Image.BOX, reducing_gap=3.0), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def image_hash(image, method=DEFAULT_HASH_METHOD):
+    return phash(image) if method == 'phash' else dhash(image)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    BK-tree over Hamming-afstand: elk kind hangt onder zijn ouder op de afstand
+    tot die ouder, zodat bij een zoekopdracht met straal r alleen de kinderen
+    op afstand d-r tot d+r bekeken hoeven te worden.
+    """
+
+    def __init__(self):
+        self._root = None
+
+    def add(self, value, item):
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """Geef (afstand, item) terug voor alle items binnen max_distance, dichtstbijzijnde eerst."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, item) for item in node[1])
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found, key=lambda entry: entry[0])
+
+
+class HashIndex:
+    """
+    Thread-safe index van perceptuele hashes van gelabelde afbeeldingen,
+    bewaard als JSON-bestand.
+
+    Args:
+        path: JSON-bestand van de index (wordt bij save() geschreven)
+        method: 'phash' of 'dhash'; een index bevat alleen hashes van één methode
+        save_every: Schrijf de index na zoveel nieuwe afbeeldingen weg (0 = alleen bij save())
+    """
+
+    def __init__(self, path, method=DEFAULT_HASH_METHOD, save_every=DEFAULT_SAVE_EVERY):
+        self.path = path
+        self.method = method
+        self.save_every = save_every
+        self._entries = {}
+        self._tree = BKTree()
+        self._unsaved = 0
+        # Afbeeldingen die nu verwerkt worden: public_id -> (hash, Event dat gezet wordt als ze klaar zijn)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('method') == method:
+                for entry in data.get('entries', []):
+                    self._add(int(entry['hash'], 16), entry['public_id'], entry['label_number'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, value, public_id, label_number):
+        self._entries[public_id] = (value, label_number)
+        self._tree.add(value, public_id)
+
+    def hash(self, image):
+        return image_hash(image, self.method)
+
+    def add(self, value, public_id, label_number):
+        """Voeg een gelabelde afbeelding toe; een public_id die er al in staat wordt overgeslagen."""
+        with self._lock:
+            if public_id in self._entries:
+                return
+            self._add(value, public_id, label_number)
+            self._unsaved += 1
+            due = self.save_every and self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def nearest(self, value, max_distance=DEFAULT_MAX_DISTANCE, exclude=None):
+        """
+        Zoek de dichtstbijzijnde gelabelde afbeelding.
+
+        Returns:
+            Tuple (public_id, labelnummer, afstand), of None als er niets binnen max_distance ligt
+        """
+        with self._lock:
+            return self._nearest(value, max_distance, exclude)
+
+    def _nearest(self, value, max_distance, exclude):
+        for distance, public_id in self._tree.search(value, max_distance):
+            if public_id != exclude:
+                return public_id, self._entries[public_id][1], distance
+        return None
+
+    def nearest_or_claim(self, value, public_id, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Zoek de dichtstbijzijnde gelabelde afbeelding, zoals nearest(), maar wacht
+        eerst op bijna-identieke afbeeldingen die op dit moment verwerkt worden.
+
+        Foto's uit een serie staan in de listing naast elkaar en worden dus vaak
+        tegelijk verwerkt; zonder wachten gaan ze allemaal naar Claude. Is er
+        niets gelabeld en ook niets onderweg, dan wordt de afbeelding zelf als
+        onderweg geclaimd; geef hem met release() vrij als hij klaar is.
+
+        Returns:
+            Tuple (public_id, labelnummer, afstand), of None (de afbeelding is dan geclaimd)
+        """
+        while True:
+            with self._lock:
+                found = self._nearest(value, max_distance, public_id)
+                if found is not None:
+                    return found
+                busy = next((event for other, (other_value, event) in self._in_flight.items()
+                             if other != public_id and hamming(value, other_value) <= max_distance), None)
+                if busy is None:
+                    self._in_flight[public_id] = (value, threading.Event())
+                    return None
+            busy.wait()
+
+    def release(self, public_id):
+        """Geef een met nearest_or_claim geclaimde afbeelding vrij; wachtende buren zoeken dan opnieuw."""
+        with self._lock:
+            entry = self._in_flight.pop(public_id, None)
+        if entry is not None:
+            entry[1].set()
+
+    def save(self):
+        # _save_lock: twee threads mogen niet tegelijk hetzelfde tijdelijke bestand schrijven
+        with self._save_lock:
+            with self._lock:
+                entries = [{"public_id": public_id, "hash": f"{value:016x}", "label_number": label_number}
+                           for public_id, (value, label_number) in self._entries.items()]
+                self._unsaved = 0
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"method": self.method, "entries": entries}, f)
+            os.replace(tmp_path, self.path)
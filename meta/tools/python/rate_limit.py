@@ -0,0 +1,45 @@
+"""
+Token bucket rate limiter, gedeeld door de download- en API-lagen van de
+labeldetectie-scripts.
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: gemiddeld `rate` aanvragen per seconde, met
+    pieken tot `capacity` aanvragen achter elkaar.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate moet groter dan 0 zijn")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Blokkeer tot er `tokens` beschikbaar zijn en neem ze dan af."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        """Pas de snelheid aan, bijvoorbeeld op basis van rate-limit headers."""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
@@ -0,0 +1,211 @@
+"""
+SQLite-opslag voor de resultaten van de labelscripts, gedeeld door de OCR- en
+Claude-labelscripts.
+
+Elk resultaat wordt direct bij binnenkomst weggeschreven, zodat een run op
+elk moment afgebroken en opnieuw gestart kan worden zonder resultaten kwijt
+te raken. De tabel 'attempts' bewaart elke poging (met bron, model, script en
+tijdstip) en wordt alleen aangevuld; 'latest' wijst per public_id naar de
+laatste poging en is via de primaire sleutel direct op te zoeken. Een
+mislukte poging vervangt daar geen eerder gevonden label, zodat bijvoorbeeld
+een mislukte OCR-poging een label van Claude niet ongedaan maakt.
+
+label_extraction_results.json wordt eenmalig geïmporteerd en aan het eind
+van een Claude-run opnieuw geëxporteerd, voor de scripts en benchmarks die
+dat bestand lezen.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DEFAULT_STORE_FILE = 'label_results.sqlite'
+
+# Velden met een eigen kolom; de rest van een resultaat gaat als JSON in 'extra'
+COLUMNS = ('public_id', 'label_number', 'success', 'source', 'error')
+
+# Bronnen waarvan een opgeslagen label als definitief geldt bij het hervatten
+# (met labels(sources=FINAL_SOURCES)); 'previous_run' is de bron van de labels
+# die uit label_extraction_results.json geïmporteerd zijn
+FINAL_SOURCES = ('claude_api', 'claude_packed', 'claude_batch', 'duplicate', 'cloudinary_metadata',
+                 'previous_run', 'local_ocr')
+
+
+class ResultStore:
+    """
+    Thread-safe resultatenopslag.
+
+    Args:
+        path: SQLite-bestand (wordt aangemaakt indien nodig)
+    """
+
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL: schrijven blokkeert lezers niet, en elke commit is één append aan het log
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                public_id TEXT NOT NULL,
+                label_number TEXT,
+                success INTEGER NOT NULL,
+                source TEXT,
+                model TEXT,
+                script TEXT,
+                error TEXT,
+                extra TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS attempts_public_id ON attempts (public_id);
+            CREATE TABLE IF NOT EXISTS latest (
+                public_id TEXT PRIMARY KEY,
+                attempt_id INTEGER NOT NULL REFERENCES attempts (id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM latest').fetchone()[0]
+
+    def _insert(self, result, model, script, created_at):
+        extra = {key: value for key, value in result.items() if key not in COLUMNS}
+        cursor = self._conn.execute(
+            'INSERT INTO attempts (public_id, label_number, success, source, model, script, error, extra, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (result['public_id'], result.get('label_number'), int(bool(result.get('success'))), result.get('source'),
+             model, script, result.get('error'), json.dumps(extra) if extra else None, created_at)
+        )
+        if not result.get('success'):
+            current = self._conn.execute(
+                'SELECT a.success FROM latest l JOIN attempts a ON a.id = l.attempt_id WHERE l.public_id = ?',
+                (result['public_id'],)
+            ).fetchone()
+            if current is not None and current[0]:
+                return
+        self._conn.execute('INSERT OR REPLACE INTO latest (public_id, attempt_id) VALUES (?, ?)',
+                           (result['public_id'], cursor.lastrowid))
+
+    def record(self, result, model=None, script=None):
+        """
+        Sla één resultaat op als nieuwe poging en maak het de laatste voor zijn
+        public_id, tenzij het mislukt is en er al een gelukte poging is.
+
+        Args:
+            result: Resultaat-dict zoals de scripts die maken (public_id, label_number, success, source, ...)
+            model: Het gebruikte model, bijvoorbeeld het Claude-model of 'tesseract'
+            script: Naam van het script dat het resultaat maakte
+        """
+        with self._lock:
+            self._insert(result, model, script, time.time())
+            self._conn.commit()
+
+    @staticmethod
+    def _row_to_result(row):
+        public_id, label_number, success, source, error, extra = row
+        result = {"public_id": public_id, "label_number": label_number, "success": bool(success), "source": source}
+        if error is not None:
+            result["error"] = error
+        if extra:
+            result.update(json.loads(extra))
+        return result
+
+    def get(self, public_id):
+        """Geef het laatste resultaat voor een public_id, of None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT a.public_id, a.label_number, a.success, a.source, a.error, a.extra '
+                'FROM latest l JOIN attempts a ON a.id = l.attempt_id WHERE l.public_id = ?',
+                (public_id,)
+            ).fetchone()
+        return self._row_to_result(row) if row else None
+
+    def latest_results(self):
+        """Geef de laatste resultaten van alle public_ids, in volgorde van binnenkomst."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT a.public_id, a.label_number, a.success, a.source, a.error, a.extra '
+                'FROM latest l JOIN attempts a ON a.id = l.attempt_id ORDER BY a.id'
+            ).fetchall()
+        return [self._row_to_result(row) for row in rows]
+
+    def labels(self, sources=None, models=None, min_ocr_confidence=None):
+        """
+        Dictionary van public_id naar labelnummer voor alle public_ids met een gelukte laatste poging.
+
+        Args:
+            sources: Alleen resultaten met een van deze bronnen (standaard alle)
+            models: Alleen resultaten van een van deze modellen (standaard alle)
+            min_ocr_confidence: Resultaten van lokale OCR alleen als hun ocr_confidence minstens zo
+                hoog is; zonder opgeslagen betrouwbaarheid vallen ze dan af
+        """
+        query = ('SELECT a.public_id, a.label_number, a.source, a.extra FROM latest l '
+                 'JOIN attempts a ON a.id = l.attempt_id WHERE a.success = 1 AND a.label_number IS NOT NULL')
+        params = []
+        for column, values in (('source', sources), ('model', models)):
+            if values is not None:
+                query += f" AND a.{column} IN ({', '.join('?' * len(values))})"
+                params.extend(values)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        labels = {}
+        for public_id, label_number, source, extra in rows:
+            if min_ocr_confidence is not None and source == 'local_ocr':
+                confidence = json.loads(extra).get('ocr_confidence') if extra else None
+                if confidence is None or confidence < min_ocr_confidence:
+                    continue
+            labels[public_id] = label_number
+        return labels
+
+    def history(self, public_id):
+        """Alle pogingen voor een public_id, oudste eerst, met model, script en tijdstip."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT public_id, label_number, success, source, error, extra, model, script, created_at '
+                'FROM attempts WHERE public_id = ? ORDER BY id',
+                (public_id,)
+            ).fetchall()
+        history = []
+        for row in rows:
+            result = self._row_to_result(row[:6])
+            result.update({"model": row[6], "script": row[7], "created_at": row[8]})
+            history.append(result)
+        return history
+
+    def import_json(self, path, model=None):
+        """
+        Importeer een bestaand resultatenbestand (zoals label_extraction_results.json)
+        in één transactie, als de opslag nog leeg is.
+
+        Returns:
+            Het aantal geïmporteerde resultaten
+        """
+        if len(self) or not os.path.exists(path):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+        created_at = os.path.getmtime(path)
+        with self._lock:
+            for result in results:
+                self._insert(result, model, 'import', created_at)
+            self._conn.commit()
+        return len(results)
+
+    def export_json(self, path):
+        """Schrijf de laatste resultaten als JSON-lijst, in het formaat van label_extraction_results.json."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.latest_results(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Zet de gevonden labelnummers in de SQLite-database van de galerij, zodat de
+site ze direct toont zonder losse aanroepen naar /api/admin/update-label.
+
+De labels komen uit de resultatenopslag van de labelscripts
+(label_results.sqlite) of, als die er niet is, uit
+label_extraction_results.json. Standaard worden alleen afbeeldingen zonder
+labelNumber gevuld: labels die in de beheeromgeving zijn ingevoerd of
+verbeterd blijven staan, tenzij --overwrite. OCR-labels tellen alleen mee
+met minstens --min-ocr-confidence betrouwbaarheid, en met --from-source en
+--model is te kiezen welke resultaten meedoen. Alleen rijen waarvan het label
+verandert worden geschreven, met één executemany in één transactie (zie
+gallery_db); de tijd dat de database daarbij op slot zit wordt getoond.
+
+Gebruik:
+    python sync_labels_to_gallery.py --dry-run
+    python sync_labels_to_gallery.py --db-path ../../../data/database.sqlite
+    python sync_labels_to_gallery.py --from-source claude_api --from-source claude_batch --overwrite
+"""
+
+import os
+import json
+import argparse
+
+from gallery_db import GalleryDatabase, DEFAULT_DB_PATH
+from result_store import ResultStore, DEFAULT_STORE_FILE
+
+DEFAULT_RESULTS_FILE = 'label_extraction_results.json'
+
+# Zelfde standaard als --ocr-confidence van extract_labels_claude.py
+DEFAULT_MIN_OCR_CONFIDENCE = 80
+
+
+def load_labels(store_path=DEFAULT_STORE_FILE, results_path=DEFAULT_RESULTS_FILE, sources=None, models=None,
+                min_ocr_confidence=DEFAULT_MIN_OCR_CONFIDENCE):
+    """
+    Laad de labels van alle afbeeldingen met een gelukt resultaat.
+
+    Args:
+        store_path: Resultatenopslag van de labelscripts
+        results_path: JSON-resultatenbestand, gebruikt als de opslag niet bestaat
+        sources: Alleen resultaten met een van deze bronnen (standaard alle)
+        models: Alleen resultaten van een van deze modellen (standaard alle; het JSON-bestand heeft geen model)
+        min_ocr_confidence: Minimale betrouwbaarheid van labels van lokale OCR (None = alle)
+
+    Returns:
+        Tuple (dictionary van public_id naar labelnummer, naam van de bron)
+    """
+    if os.path.exists(store_path):
+        store = ResultStore(store_path)
+        try:
+            return store.labels(sources, models, min_ocr_confidence), store_path
+        finally:
+            store.close()
+
+    if os.path.exists(results_path):
+        with open(results_path, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+        labels = {}
+        for r in results:
+            if not r.get('success') or not r.get('label_number'):
+                continue
+            if sources is not None and r.get('source') not in sources:
+                continue
+            if models is not None and r.get('model') not in models:
+                continue
+            if (min_ocr_confidence is not None and r.get('source') == 'local_ocr'
+                    and (r.get('ocr_confidence') is None or r['ocr_confidence'] < min_ocr_confidence)):
+                continue
+            labels[r['public_id']] = r['label_number']
+        return labels, results_path
+
+    return {}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Zet gevonden labelnummers in de galerijdatabase.')
+    parser.add_argument('--db-path', default=DEFAULT_DB_PATH,
+                        help='SQLite-database van de galerij (standaard DB_PATH of data/database.sqlite)')
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE, help='Resultatenopslag van de labelscripts')
+    parser.add_argument('--results', default=DEFAULT_RESULTS_FILE,
+                        help='JSON-resultatenbestand, gebruikt als de resultatenopslag niet bestaat')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Overschrijf ook bestaande labels (standaard worden alleen lege labelNumbers gevuld)')
+    parser.add_argument('--from-source', action='append', dest='sources', metavar='SOURCE',
+                        help="Alleen resultaten met deze bron, bijvoorbeeld claude_api of local_ocr (herhaalbaar)")
+    parser.add_argument('--model', action='append', dest='models', metavar='MODEL',
+                        help="Alleen resultaten van dit model, bijvoorbeeld tesseract (herhaalbaar)")
+    parser.add_argument('--min-ocr-confidence', type=float, default=DEFAULT_MIN_OCR_CONFIDENCE,
+                        help='Minimale betrouwbaarheid (0-100) van labels van lokale OCR; lagere worden niet gesynchroniseerd')
+    parser.add_argument('--dry-run', action='store_true', help='Toon alleen wat er zou veranderen')
+    parser.add_argument('--verbose', action='store_true', help='Toon elk gewijzigd label')
+    args = parser.parse_args()
+
+    labels, source = load_labels(args.store, args.results, args.sources, args.models, args.min_ocr_confidence)
+    if not labels:
+        print("Geen labels gevonden om te synchroniseren.")
+        return
+    print(f"{len(labels)} labels geladen uit {source}")
+
+    database = GalleryDatabase(args.db_path)
+    try:
+        current = database.labels()
+        stats = database.update_labels(labels, dry_run=args.dry_run, overwrite=args.overwrite)
+    finally:
+        database.close()
+
+    if args.verbose:
+        for public_id, label_number in sorted(stats['updated'].items()):
+            print(f"  {public_id}: {current.get(public_id)} -> {label_number}")
+        for public_id, label_number in sorted(stats['kept'].items()):
+            print(f"  {public_id}: {current.get(public_id)} blijft staan (gevonden: {label_number})")
+
+    prefix = "DRY RUN: zou bijwerken" if args.dry_run else "Bijgewerkt"
+    print(f"{prefix}: {len(stats['updated'])}, ongewijzigd: {stats['unchanged']}, "
+          f"bestaand label behouden: {len(stats['kept'])}, niet in de database: {len(stats['missing'])}")
+    if stats['kept'] and not args.overwrite:
+        print("Gebruik --overwrite om ook bestaande labels te vervangen (--verbose toont welke)")
+    print(f"Database op slot: {stats['lock_seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()